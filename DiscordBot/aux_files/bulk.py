@@ -0,0 +1,187 @@
+import asyncio
+from typing import Awaitable, Callable
+
+import discord
+
+from DiscordBot.aux_files.journal import journal
+from DiscordBot.aux_files.progress import ProgressMessage
+from DiscordBot.aux_files.ratelimit import limiter
+from ressources.settings import BULK_CONCURRENCY, MEMBER_CACHE
+
+
+def _kick(guild: discord.Guild, reason: str):
+    def kickable(member: discord.Member) -> bool:
+        # checked again on the member itself : the member list may come from an outdated snapshot
+        return not member.bot and not member.guild_permissions.administrator  # the owner has every permission
+
+    return (lambda member: member.kick(reason=reason)), 'member_kick', kickable
+
+
+def _remove_role(guild: discord.Guild, role: int, reason: str):
+    role_id, role = role, guild.get_role(role)
+    if role is None:  # deleted since the operation was recorded : no member would ever need the action
+        raise ValueError(f"Le rôle {role_id} n'existe plus")
+    return ((lambda member: member.remove_roles(role, reason=reason)), 'member_role',
+            (lambda member: role in member.roles))
+
+
+def _strip_roles(guild: discord.Guild, roles: list[int], reason: str):
+    stripped = set(roles)
+
+    def strip(member: discord.Member):
+        # a single request for all the roles, instead of one per removed role
+        kept = [role for role in member.roles if not role.is_default() and role.id not in stripped]
+        return member.edit(roles=kept, reason=reason)
+
+    return strip, 'member_edit', (lambda member: any(role.id in stripped for role in member.roles))
+
+
+# name -> function(guild, **params) returning the operation, its rate limit route,
+# and a predicate telling if a member still needs the operation (checked before each member)
+BULK_ACTIONS = {
+    'kick': _kick,
+    'remove_role': _remove_role,
+    'strip_roles': _strip_roles,
+}
+
+
+class BulkOperation:
+    """
+    An operation applied to a snapshot of members of a guild, with bounded concurrency
+    and under the rate limits of discord.
+    The progress is shown in a single message edited along the way, and the operation
+    can be cancelled with the `@cancel` command.
+    The operations built by `from_action` are written to the journal, so that they can be resumed after a crash,
+    and skip the members which no longer need the action when their turn comes.
+
+    Example: ::
+        ids = [member.id for member in role.members]
+        operation = BulkOperation(ctx, "Retrait du rôle", ids, lambda m: m.remove_roles(role), 'member_role')
+        await operation.run()
+    """
+
+    def __init__(self, ctx, title: str, member_ids: list[int],
+                 operation: Callable[[discord.Member], Awaitable], route: str,
+                 concurrency: int = BULK_CONCURRENCY):
+        """
+        :param ctx: the discord context of the command
+        :param title: the title of the progress message
+        :param member_ids: the ids of the members to apply the operation to
+        :param operation: the coroutine function to apply to each member
+        :param route: the rate limit route of the operation (see `DiscordBot.aux_files.ratelimit`)
+        :param concurrency: the maximum number of members handled at the same time
+        """
+        self.ctx = ctx
+        self.guild: discord.Guild = ctx.guild
+        self.title: str = title
+        self.member_ids: list[int] = list(member_ids)
+        self.operation = operation
+        self.route: str = route
+        self.concurrency: int = concurrency
+        self.succeeded: int = 0
+        self.failures: list[tuple[int, Exception]] = []
+        self.missing: int = 0
+        self.skipped: int = 0
+        self.cancelled: bool = False
+        self.pending: Callable[[discord.Member], bool] | None = None
+        self.action: tuple[str, dict] | None = None
+        self.resumes: str | None = None
+        self._op: str | None = None
+
+    @classmethod
+    def from_action(cls, ctx, title: str, member_ids: list[int], action: str, resumes: str | None = None,
+                    **params) -> 'BulkOperation':
+        """
+        Build an operation from one of the `BULK_ACTIONS`, which can be written to the journal.
+        Example: ::
+            operation = BulkOperation.from_action(ctx, "Expulsion", ids, 'kick', reason="Commande kickAll")
+        :param ctx: the discord context of the command
+        :param title: the title of the progress message
+        :param member_ids: the ids of the members to apply the operation to
+        :param action: the name of the action, a key of BULK_ACTIONS
+        :param resumes: the id of the interrupted operation of the journal this one resumes
+        :param params: the JSON serializable parameters of the action
+        :raise ValueError: if the action cannot be applied, e.g. its role was deleted
+        """
+        operation, route, pending = BULK_ACTIONS[action](ctx.guild, **params)
+        bulk = cls(ctx, title, member_ids, operation, route)
+        bulk.pending = pending
+        bulk.action = (action, params)
+        bulk.resumes = resumes
+        return bulk
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def summary(self) -> str:
+        text = f"{self.succeeded} réussi(s), {len(self.failures)} échec(s), {self.missing} membre(s) parti(s)"
+        if self.skipped:
+            text += f", {self.skipped} membre(s) ignoré(s)"
+        if self.cancelled:
+            remaining = len(self.member_ids) - self.succeeded - len(self.failures) - self.missing - self.skipped
+            text = f":stop_sign: Opération annulée, {remaining} membre(s) non traité(s). " + text
+        return text
+
+    async def _fetch(self, member_id: int) -> discord.Member | None:
+        # with the compact member cache, the members are not in the cache of discord.py
+        await limiter.acquire('member_fetch', self.guild.id)
+        try:
+            return await self.guild.fetch_member(member_id)
+        except discord.NotFound:
+            return None
+
+    async def _worker(self, member_ids, progress: ProgressMessage) -> None:
+        for member_id in member_ids:
+            if self.cancelled:
+                return
+            try:
+                member = self.guild.get_member(member_id)
+                if member is None and MEMBER_CACHE == 'compact':
+                    member = await self._fetch(member_id)
+                if member is None:  # the member left the server since the snapshot
+                    self.missing += 1
+                    progress.advance()
+                    continue
+                if self.pending is not None and not self.pending(member):  # e.g. became an admin since the snapshot
+                    self.skipped += 1
+                    progress.advance()
+                    continue
+                await limiter.acquire(self.route, self.guild.id)
+                await self.operation(member)
+                self.succeeded += 1
+                if self._op is not None:
+                    journal.done(self._op, member_id)
+                progress.advance()
+            except discord.HTTPException as error:
+                self.failures.append((member_id, error))
+                progress.advance(failed=True)
+
+    async def run(self) -> None:
+        """
+        Apply the operation to every member of the snapshot, then send the summary.
+        """
+        if self.action is not None:
+            name, params = self.action
+            payload = {'action': name, 'params': params, 'member_ids': self.member_ids}
+            self._op = await journal.begin(self.guild.id, self.title, 'bulk', payload, self.resumes)
+        progress = ProgressMessage(self.ctx, self.title, len(self.member_ids))
+        _running.setdefault(self.guild.id, []).append(self)
+        try:
+            await progress.start()
+            member_ids = iter(self.member_ids)  # shared by the workers
+            await asyncio.gather(*(self._worker(member_ids, progress) for _ in range(self.concurrency)))
+        finally:
+            _running[self.guild.id].remove(self)
+        if self._op is not None:
+            journal.end(self._op)  # a cancelled operation is finished too : it must not be resumed
+        await progress.finish(self.summary())
+
+
+_running: dict[int, list[BulkOperation]] = {}
+
+
+def running_operations(guild_id: int) -> list[BulkOperation]:
+    """
+    Return the bulk operations currently running in a guild.
+    """
+    return list(_running.get(guild_id, []))
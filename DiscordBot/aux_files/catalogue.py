@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from DiscordBot.aux_files.guild_index import normalize
+from ressources.paths import UES_PATH
+
+
+class UeCatalogue:
+    """
+    In-memory copy of the UE file (`ressources/ues.json`).
+    The file is loaded and validated once, then reloaded only when its modification time changes,
+    which is checked at most once every `check_interval` seconds.
+    The catalogue keeps both the category -> UEs and the UE -> categories indexes.
+    Lookups by name are case-insensitive.
+
+    Example: ::
+        catalogue.ues('TC')  # ['CM03', 'EN01', ...]
+        catalogue.categories_of('lo07r')  # ['A2I', 'ISI']
+        catalogue.canonical('ge21')  # 'GE21'
+    """
+
+    def __init__(self, path: Path, check_interval: float = 1.0):
+        self.path: Path = path
+        self.check_interval: float = check_interval
+        self._mtime: float | None = None
+        self._checked_at: float | None = None
+        self._by_category: dict[str, list[str]] = {}
+        self._category_names: dict[str, str] = {}
+        self._by_ue: dict[str, list[str]] = {}
+        self._ue_names: dict[str, str] = {}
+
+    @staticmethod
+    def validate(data) -> dict[str, list[str]]:
+        """
+        Check that the content of the UE file is a dict mapping category names to lists of UE names.
+        :param data: the decoded content of the file
+        :return: the data, if it is valid
+        :raise ValueError: if the data is not valid
+        """
+        if not isinstance(data, dict):
+            raise ValueError("le fichier des UEs doit contenir un objet {catégorie: [UEs]}")
+        for category, ues in data.items():
+            if not category.strip():
+                raise ValueError("une catégorie n'a pas de nom")
+            if not isinstance(ues, list):
+                raise ValueError(f"les UEs de la catégorie {category} doivent être une liste")
+            for ue in ues:
+                if not isinstance(ue, str) or not ue.strip():
+                    raise ValueError(f"la catégorie {category} contient une UE invalide : {ue!r}")
+        return data
+
+    def _load(self) -> None:
+        with open(self.path, 'r') as f:
+            data = self.validate(json.load(f))
+        by_ue, ue_names = {}, {}
+        for category, ues in data.items():
+            for ue in ues:
+                categories = by_ue.setdefault(normalize(ue), [])
+                if category not in categories:
+                    categories.append(category)
+                ue_names.setdefault(normalize(ue), ue)
+        self._by_category = data
+        self._category_names = {normalize(category): category for category in data}
+        self._by_ue = by_ue
+        self._ue_names = ue_names
+
+    def refresh(self) -> None:
+        """
+        Reload the file if it has been modified since the last load.
+        If the new content is invalid, or the file cannot be read, keep the previous one.
+        :raise ValueError: if the file is invalid and has never been loaded
+        :raise OSError: if the file cannot be read and has never been loaded
+        """
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            self._load()
+        except OSError as error:  # removed or being replaced : checked again at the next interval
+            if self._mtime is None:
+                raise
+            print(f"{self.path} illisible, l'ancienne version est conservée : {error}", file=sys.stderr)
+            return
+        except ValueError as error:  # json.JSONDecodeError is a ValueError too
+            if self._mtime is None:
+                raise
+            print(f"{self.path} invalide, l'ancienne version est conservée : {error}", file=sys.stderr)
+        self._mtime = mtime
+
+    def as_dict(self) -> dict[str, list[str]]:
+        self.refresh()
+        return {category: list(ues) for category, ues in self._by_category.items()}
+
+    def categories(self) -> list[str]:
+        self.refresh()
+        return list(self._by_category)
+
+    def category(self, name: str) -> str | None:
+        """
+        Return the name of the category as written in the file, or None if it is not in the catalogue.
+        """
+        self.refresh()
+        return self._category_names.get(normalize(name))
+
+    def ues(self, category: str) -> list[str] | None:
+        """
+        Return the UEs of a category, or None if the category is not in the catalogue.
+        """
+        name = self.category(category)
+        return None if name is None else list(self._by_category[name])
+
+    def all_ues(self) -> list[str]:
+        """
+        Return every UE of the catalogue once, even the UEs taught in several categories.
+        """
+        self.refresh()
+        return list(self._ue_names.values())
+
+    def categories_of(self, ue: str) -> list[str]:
+        """
+        Return the categories an UE belongs to (an UE can be taught in several branches).
+        """
+        self.refresh()
+        return list(self._by_ue.get(normalize(ue), []))
+
+    def canonical(self, ue: str) -> str | None:
+        """
+        Return the name of the UE as written in the file, or None if it is not in the catalogue.
+        """
+        self.refresh()
+        return self._ue_names.get(normalize(ue))
+
+    def __contains__(self, ue: str) -> bool:
+        return self.canonical(ue) is not None
+
+
+catalogue = UeCatalogue(UES_PATH)
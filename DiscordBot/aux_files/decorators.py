@@ -1,11 +1,15 @@
+import time
+
 from discord.ext import commands
-from ressources.env import ADMIN_CHANNEL_ID
+
+from DiscordBot.aux_files.guild_config import get_config
+from DiscordBot.aux_files.metrics import metrics
 
 
 def admin_command():
     """
     Decorator for a bot command.
-    Make the command usable only in the admin channel
+    Make the command usable only in the admin channel of the server (see `DiscordBot.aux_files.guild_config`)
 
     Example:
     ::
@@ -15,6 +19,9 @@ def admin_command():
             await ctx.send("If you can use this command, it means you are on the admin channel")
     """
     def predicate(ctx):
-        return ctx.channel.id == ADMIN_CHANNEL_ID
+        start = time.perf_counter()
+        allowed = ctx.guild is not None and ctx.channel.id == get_config(ctx.guild).admin_channel_id
+        metrics.admin_check.observe(time.perf_counter() - start)
+        return allowed
     return commands.check(predicate)
 
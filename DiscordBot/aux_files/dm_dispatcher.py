@@ -0,0 +1,120 @@
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+
+import discord
+
+from DiscordBot.aux_files.firewall import get_monitor
+from DiscordBot.aux_files.guild_config import get_config
+from DiscordBot.aux_files.guild_index import get_index
+from DiscordBot.aux_files.metrics import metrics
+from DiscordBot.aux_files.ratelimit import limiter
+from ressources.settings import DM_DEDUPE_WINDOW, DM_QUEUE_SIZE
+
+
+class DmRequest:
+    """
+    A private message waiting to be sent.
+    """
+    __slots__ = ('member', 'content', 'fallback', 'submitted_at')
+
+    def __init__(self, member: discord.Member, content: str, fallback: str):
+        self.member: discord.Member = member
+        self.content: str = content
+        self.fallback: str = fallback
+        self.submitted_at: float = time.monotonic()
+
+
+class DmDispatcher:
+    """
+    Queue of the private messages sent by the bot, sent one after the other by a single worker
+    paced by the `dm_send` rate limit bucket, so that a burst of joins never floods the DM route.
+    A member already sent a message less than `DM_DEDUPE_WINDOW` seconds ago is not sent another one.
+    When the private messages of a member are closed, the member is mentioned with the fallback text
+    in the welcome channel of the guild instead (see `GuildConfig.welcome_channel`).
+    When `DM_QUEUE_SIZE` messages are already waiting, the new ones are dropped.
+    While the guild of a member is locked down by the firewall, neither the message nor its fallback is sent.
+
+    Example: ::
+        dm_dispatcher.submit(member, "Bienvenue !", "vos messages privés sont fermés")
+    """
+
+    def __init__(self, maxsize: int = DM_QUEUE_SIZE, dedupe_window: float = DM_DEDUPE_WINDOW):
+        self.maxsize: int = maxsize
+        self.dedupe_window: float = dedupe_window
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        # user id -> time of the last message, oldest first
+        self._recent: OrderedDict[int, float] = OrderedDict()
+
+    def _forget_old(self, now: float) -> None:
+        while self._recent and now - next(iter(self._recent.values())) >= self.dedupe_window:
+            self._recent.popitem(last=False)
+
+    def submit(self, member: discord.Member, content: str, fallback: str) -> bool:
+        """
+        Queue a private message to a member.
+        :param member: the member to send the message to
+        :param content: the text of the private message
+        :param fallback: the text following the mention of the member if the private messages are closed
+        :return: True if the message was queued, False if it was deduplicated or dropped
+        """
+        now = time.monotonic()
+        self._forget_old(now)
+        if member.id in self._recent:
+            metrics.dm_results['deduplicated'] += 1
+            return False
+        if self._queue is None or self._queue.qsize() >= self.maxsize:
+            metrics.dm_results['dropped'] += 1
+            return False
+        self._recent[member.id] = now  # counted from the submission, so that a queued message is not queued twice
+        self._queue.put_nowait(DmRequest(member, content, fallback))
+        metrics.dm_queue_depth = self._queue.qsize()
+        return True
+
+    def __len__(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _send_fallback(self, request: DmRequest) -> None:
+        guild = request.member.guild
+        channel = get_index(guild).channel(get_config(guild).welcome_channel)
+        if not isinstance(channel, discord.TextChannel):
+            metrics.dm_results['forbidden'] += 1
+            return
+        await limiter.acquire('message_send', channel.id)
+        await channel.send(f"{request.member.mention}, {request.fallback}")
+        metrics.dm_results['fallback'] += 1
+
+    async def _work(self) -> None:
+        while True:
+            request = await self._queue.get()
+            metrics.dm_queue_depth = self._queue.qsize()
+            try:
+                if get_monitor(request.member.guild).locked:  # the member is probably part of a raid
+                    metrics.dm_results['locked'] += 1
+                    continue
+                await limiter.acquire('dm_send')
+                try:
+                    await request.member.send(request.content)
+                    metrics.dm_results['sent'] += 1
+                except discord.Forbidden:  # private messages closed, or member already gone
+                    await self._send_fallback(request)
+                metrics.dm_latency.observe(time.monotonic() - request.submitted_at)
+            except Exception as error:  # a failed message must not stop the worker
+                metrics.dm_results['failed'] += 1
+                print(f"Échec du message privé à {request.member} : {error}", file=sys.stderr)
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        """
+        Start the worker, if it is not already running.
+        """
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._work())
+
+
+dm_dispatcher = DmDispatcher()
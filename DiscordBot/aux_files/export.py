@@ -0,0 +1,153 @@
+import csv
+import gzip
+import io
+import json
+import re
+import zlib
+from typing import Iterable, Iterator
+
+import discord
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+FIELDS = ('id', 'username', 'nickname', 'first_name', 'last_name', 'branch', 'semester', 'roles')
+# bytes kept free in each part for the gzip trailer and the deflate block headers
+SIZE_MARGIN = 1024
+
+# format of `EtuMember.get_nickname` : "Jean DUPONT - ISI3"
+# the last name is the trailing run of words without lowercase letters
+NICKNAME_PATTERN = re.compile(r"^(?P<first_name>.+?) (?P<last_name>[^a-z]+) - (?P<branch>.+?)(?P<semester>\d*)$")
+
+
+def parse_nickname(nickname: str | None) -> dict[str, str]:
+    """
+    Split a nickname given by the etu site into its parts.
+    Example: ::
+        parse_nickname("Jean Marc DUPONT - A2I3")
+        # {'first_name': 'Jean Marc', 'last_name': 'DUPONT', 'branch': 'A2I', 'semester': '3'}
+    :param nickname: the nickname of a member
+    :return: the parts of the nickname, or an empty dict if it was not given by the etu site
+    """
+    match = NICKNAME_PATTERN.match(nickname or '')
+    return match.groupdict() if match else {}
+
+
+def member_rows(members: Iterable[discord.Member]) -> Iterator[dict]:
+    """
+    Yield the exported row of each member, one at a time.
+    """
+    for member in members:
+        row = dict.fromkeys(FIELDS, '')
+        row.update(parse_nickname(member.nick))
+        row['id'] = member.id
+        row['username'] = str(member)
+        row['nickname'] = member.nick or ''
+        row['roles'] = [role.name for role in member.roles if not role.is_default()]
+        yield row
+
+
+def _encoder(export_format: str):
+    """
+    Return the header line of a format and the function encoding a row into a line.
+    """
+    if export_format == 'jsonl':
+        return b'', (lambda row: (json.dumps(row, ensure_ascii=False) + '\n').encode())
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def encode(values) -> bytes:
+        line.seek(0)
+        line.truncate()
+        writer.writerow(values)
+        return line.getvalue().encode()
+
+    return encode(FIELDS), (lambda row: encode([';'.join(row[field]) if field == 'roles' else row[field]
+                                                for field in FIELDS]))
+
+
+class GzipParts:
+    """
+    Writer of rows into gzip files of at most `max_size` bytes each, for the exports whose rows
+    are produced asynchronously (see `gzip_parts` for the others).
+    Only the part being written is held in memory.
+    In the CSV format, every part starts with the header line, so that each file can be read alone.
+
+    Example: ::
+        parts = GzipParts('csv', guild.filesize_limit)
+        async for member in guild.fetch_members(limit=None):
+            for row in member_rows((member,)):
+                part = parts.write(row)
+                if part is not None:
+                    await ctx.send(file=discord.File(io.BytesIO(part), filename="export.csv.gz"))
+        last_part = parts.close()
+    """
+
+    def __init__(self, export_format: str, max_size: int):
+        """
+        :param export_format: one of EXPORT_FORMATS
+        :param max_size: the maximum size of a part, in bytes
+        """
+        self.limit: int = max_size - SIZE_MARGIN
+        self.header, self._encode = _encoder(export_format)
+        self._buffer: io.BytesIO | None = None
+        self._gzip_file: gzip.GzipFile | None = None
+        self._pending: int = 0  # bytes written since the last flush, whose compressed size is not known yet
+
+    def _open(self) -> None:
+        self._buffer = io.BytesIO()
+        self._gzip_file = gzip.GzipFile(fileobj=self._buffer, mode='wb')
+        self._gzip_file.write(self.header)
+        self._pending = len(self.header)
+
+    def _finish(self) -> bytes:
+        self._gzip_file.close()
+        self._gzip_file = None
+        return self._buffer.getvalue()
+
+    def write(self, row: dict) -> bytes | None:
+        """
+        Write a row, as yielded by `member_rows`.
+        :return: the previous part if it was full and the row starts a new one, else None
+        """
+        line = self._encode(row)
+        part = None
+        if self._gzip_file is not None and self._buffer.tell() + self._pending + len(line) > self.limit:
+            # deflate never grows its input by more than a few bytes per block,
+            # so the part is flushed and measured only when it may be close to the limit
+            self._gzip_file.flush(zlib.Z_SYNC_FLUSH)
+            self._pending = 0
+            if self._buffer.tell() + len(line) > self.limit:
+                part = self._finish()
+        if self._gzip_file is None:
+            self._open()
+        self._gzip_file.write(line)
+        self._pending += len(line)
+        return part
+
+    def close(self) -> bytes:
+        """
+        Return the last part, with the header only if no row was written.
+        """
+        if self._gzip_file is None:
+            self._open()
+        return self._finish()
+
+
+def gzip_parts(rows: Iterable[dict], export_format: str, max_size: int) -> Iterator[bytes]:
+    """
+    Encode the rows and compress them into gzip files of at most `max_size` bytes each.
+    The rows are consumed lazily : only the part being written is held in memory.
+    In the CSV format, every part starts with the header line, so that each file can be read alone.
+    Example: ::
+        for part in gzip_parts(member_rows(role.members), 'csv', guild.filesize_limit):
+            await ctx.send(file=discord.File(io.BytesIO(part), filename="export.csv.gz"))
+    :param rows: the rows to export, as yielded by `member_rows`
+    :param export_format: one of EXPORT_FORMATS
+    :param max_size: the maximum size of a part, in bytes
+    :return: a generator of the gzip files
+    """
+    parts = GzipParts(export_format, max_size)
+    for row in rows:
+        part = parts.write(row)
+        if part is not None:
+            yield part
+    yield parts.close()
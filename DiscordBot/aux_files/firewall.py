@@ -0,0 +1,244 @@
+import asyncio
+import sys
+import time
+from collections import deque
+
+import discord
+
+from DiscordBot.aux_files.bulk import BulkOperation
+from DiscordBot.aux_files.guild_index import get_index
+from ressources.settings import (FIREWALL_ACTION, FIREWALL_AGE_LIMITS, FIREWALL_JOIN_LIMIT, FIREWALL_LOCKDOWN_DURATION,
+                                 FIREWALL_QUARANTINE_ROLE, FIREWALL_WINDOW)
+
+FIREWALL_ACTIONS = ('kick', 'quarantine', 'report')
+ACTION_LABELS = {'kick': "expulsion", 'quarantine': f"rôle {FIREWALL_QUARANTINE_ROLE}", 'report': "signalement seul"}
+# discord epoch, in milliseconds since the unix epoch
+DISCORD_EPOCH = 1420070400000
+
+
+def account_age(user: discord.abc.User, now: float) -> float:
+    """
+    Return the age in seconds of a discord account, read from its id.
+    """
+    return now - ((user.id >> 22) + DISCORD_EPOCH) / 1000
+
+
+def _age_label(seconds: int) -> str:
+    if seconds % 86400 == 0:
+        return f"{seconds // 86400} j"
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600} h"
+    return f"{seconds} s"
+
+
+class SlidingWindow:
+    """
+    Number of events in the last `span` seconds, counted in a ring of one-second slots.
+    Adding an event and reading the count take constant time, whatever the number of events.
+    """
+
+    def __init__(self, span: int = FIREWALL_WINDOW):
+        self.span: int = span
+        self._slots: list[int] = [0] * span
+        self._second: int | None = None
+        self._total: int = 0
+
+    def _advance(self, now: float) -> None:
+        second = int(now)
+        if self._second is None:
+            self._second = second
+        elapsed = second - self._second
+        # empty the slots of the seconds which left the window, at most `span` of them
+        for past in range(self._second + 1, self._second + 1 + min(elapsed, self.span)):
+            slot = past % self.span
+            self._total -= self._slots[slot]
+            self._slots[slot] = 0
+        self._second = max(self._second, second)
+
+    def add(self, now: float) -> None:
+        self._advance(now)
+        self._slots[self._second % self.span] += 1
+        self._total += 1
+
+    def count(self, now: float) -> int:
+        self._advance(now)
+        return self._total
+
+
+class JoinMonitor:
+    """
+    Join rate of a guild : joins per window, and joins of new accounts per account age.
+    When a limit is crossed, the guild is locked down : the members joining are kicked or quarantined
+    in bulk (see `FIREWALL_ACTION`), until no limit has been crossed for `FIREWALL_LOCKDOWN_DURATION` seconds.
+    The work done per join does not depend on the number of joins.
+
+    Example: ::
+        monitor = get_monitor(member.guild)
+        reason = monitor.record(member)
+        if reason is not None:
+            await monitor.lockdown(admin_channel, reason)  # handles this member too
+        else:
+            monitor.handle(member)
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self.guild_id: int = guild.id
+        self.joins = SlidingWindow()
+        self.new_accounts: dict[int, SlidingWindow] = {age: SlidingWindow() for age in sorted(FIREWALL_AGE_LIMITS)}
+        # (time, id) of the last joins, handled too when a lockdown starts
+        recent_size = max([FIREWALL_JOIN_LIMIT, *FIREWALL_AGE_LIMITS.values()]) + 1
+        self.recent: deque[tuple[float, int]] = deque(maxlen=recent_size)
+        self.action: str = FIREWALL_ACTION
+        self.locked_since: float | None = None
+        self.last_alert: float = 0.0
+        self.handled: int = 0
+        self.channel = None
+        self._batch: list[int] = []
+        self._executor: asyncio.Task | None = None
+        self._watcher: asyncio.Task | None = None
+
+    @property
+    def locked(self) -> bool:
+        return self.locked_since is not None
+
+    def _crossed_limit(self, now: float) -> str | None:
+        joins = self.joins.count(now)
+        if joins > FIREWALL_JOIN_LIMIT:
+            return f"{joins} arrivées en {FIREWALL_WINDOW} s"
+        for age, window in self.new_accounts.items():
+            count = window.count(now)
+            if count > FIREWALL_AGE_LIMITS[age]:
+                return f"{count} comptes de moins de {_age_label(age)} arrivés en {FIREWALL_WINDOW} s"
+        return None
+
+    def record(self, member: discord.Member, now: float | None = None) -> str | None:
+        """
+        Count a join.
+        :return: the reason of the lockdown if this join crossed a limit while the guild was not locked, else None
+        """
+        now = time.time() if now is None else now
+        self.joins.add(now)
+        age = account_age(member, now)
+        for max_age, window in self.new_accounts.items():
+            if age < max_age:
+                window.add(now)
+        if not member.bot:
+            self.recent.append((now, member.id))
+        reason = self._crossed_limit(now)
+        if reason is None:
+            return None
+        self.last_alert = now
+        return None if self.locked else reason
+
+    def rates(self, now: float | None = None) -> dict[str, tuple[int, int]]:
+        """
+        Return the number of joins in the current window and its limit, for the joins and each account age.
+        """
+        now = time.time() if now is None else now
+        rates = {"arrivées": (self.joins.count(now), FIREWALL_JOIN_LIMIT)}
+        for age, window in self.new_accounts.items():
+            rates[f"comptes de moins de {_age_label(age)}"] = (window.count(now), FIREWALL_AGE_LIMITS[age])
+        return rates
+
+    async def lockdown(self, channel, reason: str, action: str | None = None) -> None:
+        """
+        Lock the guild down : report to the admin channel and handle the members who joined during the window.
+        If the guild is already locked, only the action changes.
+        :param channel: the admin channel of the guild, in which the lockdown and its progress are reported
+        :param reason: the reason of the lockdown, as returned by `record`
+        :param action: one of FIREWALL_ACTIONS, `FIREWALL_ACTION` by default
+        """
+        now = time.time()
+        self.action = action or FIREWALL_ACTION
+        if self.locked:
+            await channel.send(f"Action sur les nouveaux membres : {ACTION_LABELS[self.action]}")
+            return
+        self.locked_since = self.last_alert = now
+        self.handled = 0
+        self.channel = channel
+        await channel.send(f":rotating_light: **Verrouillage du serveur** : {reason}.\n"
+                           f"Action sur les nouveaux membres : {ACTION_LABELS[self.action]}. "
+                           f"Fin automatique après {FIREWALL_LOCKDOWN_DURATION:.0f} s de calme, ou `@lockdown off`.")
+        for joined_at, member_id in self.recent:
+            if now - joined_at < FIREWALL_WINDOW:
+                self._enqueue(member_id)
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def release(self, reason: str) -> None:
+        """
+        End the lockdown and report it to the admin channel.
+        """
+        if not self.locked:
+            return
+        self.locked_since = None
+        self._batch.clear()
+        if self._watcher is not None and self._watcher is not asyncio.current_task():
+            self._watcher.cancel()
+        await self.channel.send(f":unlock: Fin du verrouillage ({reason}), {self.handled} membre(s) traité(s)")
+
+    async def _watch(self) -> None:
+        while self.locked:
+            remaining = self.last_alert + FIREWALL_LOCKDOWN_DURATION - time.time()
+            if remaining <= 0:
+                await self.release(f"aucune alerte depuis {FIREWALL_LOCKDOWN_DURATION:.0f} s")
+                return
+            await asyncio.sleep(remaining)
+
+    def handle(self, member: discord.Member) -> None:
+        """
+        Apply the lockdown action to a member who has just joined, if the guild is locked.
+        """
+        if self.locked and not member.bot:
+            self._enqueue(member.id)
+
+    def _enqueue(self, member_id: int) -> None:
+        if self.action == 'report':
+            return
+        self._batch.append(member_id)
+        if self._executor is None or self._executor.done():
+            self._executor = asyncio.create_task(self._drain())
+
+    def _operation(self):
+        if self.action == 'kick':
+            return (lambda member: member.kick(reason="Verrouillage du serveur")), 'member_kick'
+        role = get_index(self.channel.guild).role(FIREWALL_QUARANTINE_ROLE)
+        if role is None:
+            return None, None
+        return (lambda member: member.add_roles(role, reason="Verrouillage du serveur")), 'member_role'
+
+    async def _drain(self) -> None:
+        # the members joining while a batch is handled make the next batch
+        while self._batch and self.locked:
+            member_ids, self._batch = self._batch, []
+            try:
+                await self._handle_batch(member_ids)
+            except Exception as error:
+                # the admin channel may be gone or forbidden : the next batches must still be handled
+                print(f"Échec du verrouillage pour {len(member_ids)} membre(s) : {error}", file=sys.stderr)
+
+    async def _handle_batch(self, member_ids: list[int]) -> None:
+        operation, route = self._operation()
+        if operation is None:
+            await self.channel.send(f":warning: Le rôle {FIREWALL_QUARANTINE_ROLE} n'existe pas, "
+                                    f"{len(member_ids)} membre(s) non mis en quarantaine")
+            return
+        bulk = BulkOperation(self.channel, f"Verrouillage : {ACTION_LABELS[self.action]}", member_ids,
+                             operation, route)
+        try:
+            await bulk.run()
+        finally:
+            self.handled += bulk.succeeded
+
+
+_monitors: dict[int, JoinMonitor] = {}
+
+
+def get_monitor(guild: discord.Guild) -> JoinMonitor:
+    """
+    Return the join monitor of the given guild, creating it on first use.
+    """
+    monitor = _monitors.get(guild.id)
+    if monitor is None:
+        monitor = _monitors[guild.id] = JoinMonitor(guild)
+    return monitor
@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import discord
+
+from DiscordBot.aux_files.catalogue import UeCatalogue, catalogue
+from ressources.env import ADMIN_CHANNEL_ID, BOT_URL, INVITATION_LINK
+from ressources.paths import GUILDS_PATH, UES_PATH
+from ressources.settings import WELCOME_CHANNEL
+
+# keys of a server in the configuration file, with their type
+CONFIG_KEYS = {
+    'admin_channel_id': int,
+    'ues_path': str,
+    'bot_url': str,
+    'invitation_link': str,
+    'student_role': str,
+    'alumni_role': str,
+    'welcome_channel': str,
+}
+
+
+class GuildConfig:
+    """
+    The configuration of the bot for a discord server.
+    """
+    __slots__ = ('guild_id', 'admin_channel_id', 'catalogue', 'bot_url', 'invitation_link',
+                 'student_role', 'alumni_role', 'welcome_channel')
+
+    def __init__(self, guild_id: int | None, admin_channel_id: int, catalogue: UeCatalogue, bot_url: str,
+                 invitation_link: str, student_role: str = 'Etudiant', alumni_role: str = 'Ancien',
+                 welcome_channel: str = WELCOME_CHANNEL):
+        self.guild_id: int | None = guild_id
+        self.admin_channel_id: int = admin_channel_id
+        self.catalogue: UeCatalogue = catalogue
+        self.bot_url: str = bot_url
+        self.invitation_link: str = invitation_link
+        self.student_role: str = student_role
+        self.alumni_role: str = alumni_role
+        self.welcome_channel: str = welcome_channel
+
+
+class GuildConfigStore:
+    """
+    The configuration of every server the bot is in, read once from `ressources/guilds.json` : ::
+        {"<guild id>": {"admin_channel_id": 1234, "ues_path": "ues_utt.json", "bot_url": "https://...",
+                        "invitation_link": "https://...", "student_role": "Etudiant", "alumni_role": "Ancien",
+                        "welcome_channel": "accueil"}}
+    Every key is optional, the missing ones (and the servers absent from the file) take the values
+    of `ressources/env.py`, `ressources/settings.py` and `ressources/ues.json`. A relative `ues_path` is relative to `ressources/`.
+    The configurations are kept in memory, so that a lookup is a single dict access.
+    The file is read again only by `reload` (see the `@config reload` command).
+
+    Example: ::
+        config = get_config(ctx.guild)
+        await ctx.send(config.bot_url)
+    """
+
+    def __init__(self, path: Path):
+        self.path: Path = path
+        self.default = GuildConfig(None, ADMIN_CHANNEL_ID, catalogue, BOT_URL, INVITATION_LINK)
+        self._configs: dict[int, GuildConfig] | None = None
+        self._catalogues: dict[Path, UeCatalogue] = {UES_PATH: catalogue}
+
+    @staticmethod
+    def validate(data) -> dict[str, dict]:
+        """
+        Check that the content of the configuration file maps server ids to dicts of known keys.
+        :raise ValueError: if the data is not valid
+        """
+        if not isinstance(data, dict):
+            raise ValueError("le fichier de configuration doit contenir un objet {id du serveur: configuration}")
+        for guild_id, config in data.items():
+            if not guild_id.isdigit() or not isinstance(config, dict):
+                raise ValueError(f"la configuration du serveur {guild_id!r} est invalide")
+            for key, value in config.items():
+                if key not in CONFIG_KEYS or not isinstance(value, CONFIG_KEYS[key]):
+                    raise ValueError(f"la clé {key!r} du serveur {guild_id} est invalide")
+        return data
+
+    def _catalogue(self, path: str) -> UeCatalogue:
+        full_path = (self.path.parent / path).resolve()
+        found = self._catalogues.get(full_path)
+        if found is None:
+            found = self._catalogues[full_path] = UeCatalogue(full_path)
+            found.refresh()  # raise now if the file is invalid
+        return found
+
+    def _load(self) -> dict[int, GuildConfig]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            data = self.validate(json.load(f))
+        configs = {}
+        for guild_id, values in data.items():
+            values = dict(values)
+            ues = self._catalogue(values.pop('ues_path')) if 'ues_path' in values else self.default.catalogue
+            defaults = {slot: getattr(self.default, slot) for slot in GuildConfig.__slots__}
+            configs[int(guild_id)] = GuildConfig(**{**defaults, **values, 'guild_id': int(guild_id),
+                                                    'catalogue': ues})
+        return configs
+
+    def reload(self) -> None:
+        """
+        Read the configuration file again. If it is invalid, keep the previous configuration.
+        :raise ValueError: if the file is invalid (the previous configuration is kept)
+        """
+        try:
+            self._configs = self._load()
+        except (ValueError, OSError) as error:
+            if self._configs is None:
+                self._configs = {}
+            print(f"{self.path} invalide, l'ancienne configuration est conservée : {error}", file=sys.stderr)
+            raise ValueError(str(error)) from error
+
+    def get(self, guild_id: int | None) -> GuildConfig:
+        if self._configs is None:
+            try:
+                self.reload()
+            except ValueError:
+                pass  # already reported, the servers use the default configuration
+        return self._configs.get(guild_id, self.default)
+
+
+guild_configs = GuildConfigStore(GUILDS_PATH)
+
+
+def get_config(guild: discord.Guild | None) -> GuildConfig:
+    """
+    Return the configuration of a server, or the default one for the private messages.
+    """
+    return guild_configs.get(guild.id if guild is not None else None)
@@ -0,0 +1,136 @@
+import discord
+
+
+def normalize(name: str) -> str:
+    """
+    Return the key under which a role or channel name is stored in the index.
+    Names are case-normalized, so that `parse_ue(guild, "ge21")` finds the role `GE21`
+    and `parse_channel(guild, "NF04")` finds the text channel `nf04`.
+    """
+    return name.casefold()
+
+
+class _NameTable:
+    """
+    Multimap from a normalized name to the discord objects having this name.
+    When several objects share the same name, the first one inserted is returned,
+    like `discord.utils.get` returns the first match of the cache.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return sum(len(objects) for objects in self._entries.values())
+
+    def add(self, obj) -> None:
+        objects = self._entries.setdefault(normalize(obj.name), [])
+        for i, other in enumerate(objects):
+            if other.id == obj.id:  # already indexed, keep the freshest object
+                objects[i] = obj
+                return
+        objects.append(obj)
+
+    def remove(self, obj, name: str | None = None) -> None:
+        key = normalize(obj.name if name is None else name)
+        objects = [other for other in self._entries.get(key, []) if other.id != obj.id]
+        if objects:
+            self._entries[key] = objects
+        else:
+            self._entries.pop(key, None)
+
+    def get(self, name: str):
+        objects = self._entries.get(normalize(name))
+        return objects[0] if objects else None
+
+
+class GuildIndex:
+    """
+    Name -> object index of the roles, channels and categories of a guild.
+    The index is built once from the discord cache, then kept up to date by the
+    role and channel gateway events (see `DiscordBot.events.guild_index`).
+
+    Example: ::
+        index = get_index(ctx.guild)
+        role = index.role("GE21")
+        channel = index.channel("ge21")
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self.guild_id: int = guild.id
+        self.roles = _NameTable()
+        self.channels = _NameTable()
+        self.categories = _NameTable()
+        self.hits: int = 0
+        self.misses: int = 0
+        for role in guild.roles:
+            self.add_role(role)
+        for channel in guild.channels:
+            self.add_channel(channel)
+
+    def add_role(self, role: discord.Role) -> None:
+        self.roles.add(role)
+
+    def remove_role(self, role: discord.Role, name: str | None = None) -> None:
+        self.roles.remove(role, name)
+
+    def add_channel(self, channel: discord.abc.GuildChannel) -> None:
+        self.channels.add(channel)
+        if isinstance(channel, discord.CategoryChannel):
+            self.categories.add(channel)
+
+    def remove_channel(self, channel: discord.abc.GuildChannel, name: str | None = None) -> None:
+        self.channels.remove(channel, name)
+        if isinstance(channel, discord.CategoryChannel):
+            self.categories.remove(channel, name)
+
+    def _lookup(self, table: _NameTable, name: str):
+        found = table.get(name)
+        if found is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return found
+
+    def role(self, name: str) -> discord.Role | None:
+        return self._lookup(self.roles, name)
+
+    def channel(self, name: str) -> discord.abc.GuildChannel | None:
+        return self._lookup(self.channels, name)
+
+    def category(self, name: str) -> discord.CategoryChannel | None:
+        return self._lookup(self.categories, name)
+
+
+_indexes: dict[int, GuildIndex] = {}
+
+
+def get_index(guild: discord.Guild) -> GuildIndex:
+    """
+    Return the index of the given guild, building it on first use.
+    :param guild: the discord server to get the index of
+    :return: the index of the guild
+    """
+    index = _indexes.get(guild.id)
+    if index is None:
+        index = _indexes[guild.id] = GuildIndex(guild)
+    return index
+
+
+def peek_index(guild_id: int) -> GuildIndex | None:
+    """
+    Return the index of the guild if it has already been built, else None.
+    Used by the gateway events, which must not build an index only to update it.
+    """
+    return _indexes.get(guild_id)
+
+
+def drop_index(guild_id: int | None = None) -> None:
+    """
+    Forget the index of a guild, or of every guild if no id is given.
+    The index will be rebuilt from the discord cache on its next use.
+    """
+    if guild_id is None:
+        _indexes.clear()
+    else:
+        _indexes.pop(guild_id, None)
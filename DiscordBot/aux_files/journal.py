@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import uuid
+from pathlib import Path
+
+from ressources.paths import JOURNAL_PATH
+from ressources.settings import JOURNAL_FLUSH_INTERVAL
+
+
+class JournalEntry:
+    """
+    A mutating operation read back from the journal.
+    """
+    __slots__ = ('op', 'guild_id', 'title', 'kind', 'payload', 'done', 'ended')
+
+    def __init__(self, op: str, guild_id: int, title: str, kind: str, payload: dict):
+        self.op: str = op
+        self.guild_id: int = guild_id
+        self.title: str = title
+        self.kind: str = kind
+        self.payload: dict = payload
+        self.done: set = set()
+        self.ended: bool = False
+
+
+class Journal:
+    """
+    Append-only log of the mutating operations (plans of API calls and bulk member operations),
+    so that an operation interrupted by a restart can be resumed where it stopped (see `@resume`).
+    An operation is recorded as a `begin` line holding everything needed to run it again,
+    one `done` line per completed step, and an `end` line.
+    The `begin` line is written to disk before the first API call; the other lines are batched
+    and written with a single fsync every `JOURNAL_FLUSH_INTERVAL` seconds.
+    A step completed in the last interval before a crash may thus be resumed : the resumed operations
+    check first whether each step is still needed.
+
+    Example: ::
+        op = await journal.begin(guild.id, "Création des UEs", 'plan', {'stages': plan.to_json()})
+        journal.done(op, 0)
+        journal.end(op)
+    """
+
+    def __init__(self, path: Path):
+        self.path: Path = path
+        self._pending: list[str] = []
+        self._lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+
+    def _append(self, record: dict) -> str:
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        self._pending.append(line)
+        return line
+
+    def _write(self, lines: list[str]) -> None:
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            size = f.tell()
+            try:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError:
+                f.truncate(size)  # no half line, which would swallow the first line written again
+                raise
+
+    async def flush(self) -> None:
+        """
+        Write the pending lines to disk now.
+        :raise OSError: if the lines cannot be written. They are kept for the next flush
+        """
+        async with self._flush_lock:
+            if self._pending:
+                lines, self._pending = self._pending, []
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+                except Exception:
+                    self._pending = lines + self._pending
+                    raise
+
+    async def _flush_forever(self) -> None:
+        async with self._flush_lock:  # no line is written while the file is rewritten
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.compact)
+            except Exception as error:  # the file is left as it is, and is only longer to read
+                print(f"Compactage du journal impossible : {error!r}", file=sys.stderr)
+        while True:
+            await asyncio.sleep(JOURNAL_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as error:  # disk full, file removed... : the flusher must keep running
+                print(f"Écriture du journal impossible, {len(self._pending)} ligne(s) en attente : {error!r}",
+                      file=sys.stderr)
+
+    def start(self) -> None:
+        """
+        Start removing the finished operations from the file, then writing the batched lines, in the background.
+        """
+        if self._flusher is not None:
+            return
+        self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def begin(self, guild_id: int, title: str, kind: str, payload: dict, resumes: str | None = None) -> str:
+        """
+        Record the start of an operation, and wait until it is on disk.
+        :param guild_id: the id of the discord server of the operation
+        :param title: the title of the operation, shown by `@resume`
+        :param kind: 'plan' or 'bulk'
+        :param payload: everything needed to run the operation again, JSON serializable
+        :param resumes: the id of the interrupted operation this one resumes, which is then finished
+        :return: the id of the operation
+        :raise OSError: if the operation cannot be recorded : it must not be started
+        """
+        op = uuid.uuid4().hex
+        line = self._append({'op': op, 'type': 'begin', 'guild': guild_id, 'title': title, 'kind': kind,
+                             'payload': payload, 'resumes': resumes})
+        try:
+            await self.flush()
+        except Exception:
+            self._pending.remove(line)  # the operation does not start : it must not be resumed later
+            raise
+        return op
+
+    def done(self, op: str, item) -> None:
+        """
+        Record the completion of a step (the index of a plan step, or the id of a member).
+        """
+        self._append({'op': op, 'type': 'done', 'item': item})
+
+    def end(self, op: str) -> None:
+        """
+        Record the end of an operation : it will not be resumed, whatever the state of its steps.
+        """
+        self._append({'op': op, 'type': 'end'})
+
+    def _read(self) -> dict[str, JournalEntry]:
+        entries: dict[str, JournalEntry] = {}
+        if not os.path.exists(self.path):
+            return entries
+        with self._lock, open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut by a crash
+                if record['type'] == 'begin':
+                    entries[record['op']] = JournalEntry(record['op'], record['guild'], record['title'],
+                                                         record['kind'], record['payload'])
+                    if record.get('resumes') in entries:
+                        entries[record['resumes']].ended = True
+                elif record['op'] in entries:
+                    if record['type'] == 'done':
+                        entries[record['op']].done.add(record['item'])
+                    else:
+                        entries[record['op']].ended = True
+        return entries
+
+    async def unfinished(self, guild_id: int) -> list[JournalEntry]:
+        """
+        Return the operations of a guild which were interrupted, oldest first.
+        """
+        await self.flush()
+        entries = await asyncio.get_running_loop().run_in_executor(None, self._read)
+        return [entry for entry in entries.values() if entry.guild_id == guild_id and not entry.ended]
+
+    def compact(self) -> None:
+        """
+        Rewrite the file with the unfinished operations only.
+        """
+        unfinished = [entry for entry in self._read().values() if not entry.ended]
+        lines = []
+        for entry in unfinished:
+            lines.append(json.dumps({'op': entry.op, 'type': 'begin', 'guild': entry.guild_id, 'title': entry.title,
+                                     'kind': entry.kind, 'payload': entry.payload}, ensure_ascii=False) + '\n')
+            lines += [json.dumps({'op': entry.op, 'type': 'done', 'item': item}) + '\n' for item in entry.done]
+        temporary = f"{self.path}.tmp"
+        with self._lock:
+            with open(temporary, 'w', encoding='utf-8') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+
+
+journal = Journal(JOURNAL_PATH)
@@ -0,0 +1,163 @@
+from typing import Iterable
+
+import discord
+
+from DiscordBot.aux_files.guild_index import normalize
+from ressources.settings import MEMBER_CACHE
+
+
+def _usernames(user: discord.abc.User) -> list[str]:
+    """
+    Return the keys under which a user can be found by username :
+    the username itself and, for the users not migrated to the new username system, `name#1234`.
+    """
+    names = [normalize(user.name)]
+    if user.discriminator not in ('0', '0000'):
+        names.append(normalize(f"{user.name}#{user.discriminator}"))
+    return names
+
+
+class MemberIndex:
+    """
+    Index of the members of a guild by id, username (with or without discriminator) and global name.
+    The index is built once from the member cache, then kept up to date by the member gateway events
+    (see `DiscordBot.events.member_index`).
+    When a member is not in the cache, `resolve` asks discord with a single targeted query.
+    With `MEMBER_CACHE = 'compact'`, the index stays empty and every lookup is such a query,
+    so that the index does not become a second member cache.
+
+    Example: ::
+        member = await get_member_index(guild).resolve(guild, "jean.dupont")
+    """
+
+    def __init__(self, guild: discord.Guild, members: Iterable[discord.Member] | None = None):
+        """
+        :param guild: the discord server of the members
+        :param members: the members to index, the members of the cache by default
+        """
+        self.guild_id: int = guild.id
+        self.by_id: dict[int, discord.Member] = {}
+        self.by_username: dict[str, discord.Member] = {}
+        self.by_global_name: dict[str, discord.Member] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+        self.fallbacks: int = 0
+        self.fallbacks_found: int = 0
+        for member in guild.members if members is None else members:
+            self.add(member)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def add(self, member: discord.Member) -> None:
+        self.by_id[member.id] = member
+        for name in _usernames(member):
+            self.by_username[name] = member
+        global_name = getattr(member, 'global_name', None)  # only exists since discord.py 2.3
+        if global_name:
+            # global names are not unique, the first member keeps the name
+            self.by_global_name.setdefault(normalize(global_name), member)
+
+    def remove(self, member: discord.abc.User) -> None:
+        self.by_id.pop(member.id, None)
+        for name in _usernames(member):
+            if getattr(self.by_username.get(name), 'id', None) == member.id:
+                del self.by_username[name]
+        global_name = getattr(member, 'global_name', None)
+        if global_name and getattr(self.by_global_name.get(normalize(global_name)), 'id', None) == member.id:
+            del self.by_global_name[normalize(global_name)]
+
+    def rename(self, before: discord.abc.User, after: discord.abc.User) -> None:
+        """
+        Re-index a member whose username or global name has changed.
+        """
+        member = self.by_id.get(after.id)
+        if member is not None:
+            self.remove(before)
+            self.add(member)
+
+    def _find(self, key: str | int, username_only: bool = False) -> discord.Member | None:
+        if isinstance(key, int):
+            return self.by_id.get(key)
+        if username_only:
+            return self.by_username.get(normalize(key))
+        if key.isdigit() and int(key) in self.by_id:  # usernames can be made of digits too
+            return self.by_id[int(key)]
+        return self.by_username.get(normalize(key)) or self.by_global_name.get(normalize(key))
+
+    def get(self, key: str | int, username_only: bool = False) -> discord.Member | None:
+        """
+        Find a member in the index by id, username (`name` or `name#1234`) or global name.
+        With `username_only`, a string is only looked up as a username : the global names and the ids
+        can be chosen by anyone and are not unique, they must not identify a member to grant roles to.
+        """
+        member = self._find(key, username_only)
+        if member is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return member
+
+    async def resolve(self, guild: discord.Guild, key: str | int,
+                      username_only: bool = False) -> discord.Member | None:
+        """
+        Find a member in the index, or ask discord for it if it is not in the cache.
+        :param guild: the discord server of the member
+        :param key: the id, username or global name of the member
+        :param username_only: if True, a string key is only matched against the usernames (see `get`)
+        :return: the member, or None if no member of the server matches
+        """
+        member = self.get(key, username_only)
+        if member is not None:
+            return member
+        self.fallbacks += 1
+        compact = MEMBER_CACHE == 'compact'
+        if isinstance(key, int):
+            found = await guild.query_members(user_ids=[key], cache=not compact)
+        else:
+            found = await guild.query_members(query=key.split('#')[0], limit=5, cache=not compact)
+        if compact:
+            member = MemberIndex(guild, found)._find(key, username_only)
+        else:
+            for candidate in found:
+                self.add(candidate)
+            member = self._find(key, username_only)
+        if member is not None:
+            self.fallbacks_found += 1
+        return member
+
+
+_indexes: dict[int, MemberIndex] = {}
+
+
+def get_member_index(guild: discord.Guild) -> MemberIndex:
+    """
+    Return the member index of the given guild, building it on first use.
+    :param guild: the discord server to get the member index of
+    :return: the member index of the guild
+    """
+    index = _indexes.get(guild.id)
+    if index is None:
+        index = _indexes[guild.id] = MemberIndex(guild)
+    return index
+
+
+def peek_member_index(guild_id: int) -> MemberIndex | None:
+    """
+    Return the member index of the guild if it has already been built, else None.
+    """
+    return _indexes.get(guild_id)
+
+
+def member_indexes() -> list[MemberIndex]:
+    return list(_indexes.values())
+
+
+def drop_member_index(guild_id: int | None = None) -> None:
+    """
+    Forget the member index of a guild, or of every guild if no id is given.
+    """
+    if guild_id is None:
+        _indexes.clear()
+    else:
+        _indexes.pop(guild_id, None)
@@ -0,0 +1,180 @@
+import asyncio
+import sys
+import time
+from array import array
+from collections import Counter
+
+import discord
+
+from ressources.settings import MEMBER_CACHE, MEMBER_SNAPSHOT_TTL
+
+
+class MemberSnapshot:
+    """
+    Compact copy of the members of a guild : their ids, usernames, bot flags and the ids of their roles,
+    without the `discord.Member` objects (user, activities, voice state...) kept by the discord.py cache.
+    The ids are kept in arrays of 64 bits integers, the roles of each member in its own array.
+
+    With `MEMBER_CACHE = 'compact'`, discord.py keeps no member and the getters read this snapshot,
+    built with the paged member list of the discord API, then kept up to date by the join and leave
+    gateway events (see `DiscordBot.events.member_snapshot`). discord does send the role and name changes
+    of every member, but discord.py drops them when the member is not in its cache, and has no raw event
+    for them : rebuilding the snapshot when it is older than `MEMBER_SNAPSHOT_TTL` is the only refresh
+    of the roles and usernames.
+
+    Example: ::
+        snapshot = await get_snapshot(ctx.guild)
+        snapshot.role_counts()[role.id]  # number of members having the role
+        snapshot.members_with(role.id)  # ids of the members having the role
+    """
+    __slots__ = ('guild_id', 'built_at', 'ids', 'names', 'bots', 'roles', '_positions')
+
+    def __init__(self, guild_id: int):
+        self.guild_id: int = guild_id
+        self.built_at: float = time.monotonic()
+        self.ids: array = array('Q')
+        self.names: list[str] = []
+        self.bots: bytearray = bytearray()
+        self.roles: list[array] = []
+        self._positions: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, member_id: int) -> bool:
+        return member_id in self._positions
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.built_at
+
+    def add(self, member: discord.Member) -> None:
+        """
+        Add a member to the snapshot, or update it if it is already there.
+        """
+        # the @everyone role is implicit : every member has it
+        roles = array('Q', (role.id for role in member.roles if not role.is_default()))
+        position = self._positions.get(member.id)
+        if position is None:
+            self._positions[member.id] = len(self.ids)
+            self.ids.append(member.id)
+            self.names.append(member.name)
+            self.bots.append(member.bot)
+            self.roles.append(roles)
+        else:
+            self.names[position] = member.name
+            self.roles[position] = roles
+
+    def remove(self, member_id: int) -> None:
+        position = self._positions.pop(member_id, None)
+        if position is None:
+            return
+        last = len(self.ids) - 1
+        if position != last:  # move the last member in the hole, to keep the arrays dense
+            self.ids[position] = self.ids[last]
+            self.names[position] = self.names[last]
+            self.bots[position] = self.bots[last]
+            self.roles[position] = self.roles[last]
+            self._positions[self.ids[position]] = position
+        self.ids.pop()
+        self.names.pop()
+        self.bots.pop()
+        self.roles.pop()
+
+    def rename(self, member_id: int, name: str) -> None:
+        position = self._positions.get(member_id)
+        if position is not None:
+            self.names[position] = name
+
+    def name(self, member_id: int) -> str | None:
+        position = self._positions.get(member_id)
+        return None if position is None else self.names[position]
+
+    def member_roles(self, member_id: int) -> array | None:
+        """
+        Return the ids of the roles of a member (without @everyone), or None if the member is not in the snapshot.
+        """
+        position = self._positions.get(member_id)
+        return None if position is None else self.roles[position]
+
+    def members_with(self, role_id: int) -> list[int]:
+        return [member_id for member_id, roles in zip(self.ids, self.roles) if role_id in roles]
+
+    def humans(self) -> list[int]:
+        return [member_id for member_id, bot in zip(self.ids, self.bots) if not bot]
+
+    def role_counts(self, default_role_id: int | None = None) -> Counter:
+        """
+        Return the number of members of each role, in a single pass over the role arrays.
+        :param default_role_id: the id of the @everyone role, counted for every member if given
+        """
+        counts = Counter()
+        for roles in self.roles:
+            counts.update(roles)
+        if default_role_id is not None:
+            counts[default_role_id] = len(self.ids)
+        return counts
+
+    def nbytes(self) -> int:
+        """
+        Return an estimation of the memory used by the snapshot, in bytes.
+        """
+        size = sys.getsizeof(self.ids) + sys.getsizeof(self.bots) + sys.getsizeof(self._positions)
+        size += sys.getsizeof(self.names) + sum(sys.getsizeof(name) for name in self.names)
+        size += sys.getsizeof(self.roles) + sum(sys.getsizeof(roles) for roles in self.roles)
+        # the int keys of the position dict are objects of their own
+        return size + 2 * sys.getsizeof(2 ** 62) * len(self._positions)
+
+
+async def _build(guild: discord.Guild) -> MemberSnapshot:
+    snapshot = MemberSnapshot(guild.id)
+    if guild.chunked:
+        for member in guild.members:
+            snapshot.add(member)
+    else:
+        # pages of 1000 members from the API : the members are not put in the discord.py cache
+        async for member in guild.fetch_members(limit=None):
+            snapshot.add(member)
+    return snapshot
+
+
+_snapshots: dict[int, MemberSnapshot] = {}
+_build_tasks: dict[int, asyncio.Task] = {}
+
+
+async def get_snapshot(guild: discord.Guild) -> MemberSnapshot:
+    """
+    Return the member snapshot of the given guild, building it on first use (or when it is too old,
+    with `MEMBER_CACHE = 'compact'`). Concurrent calls for the same guild share the same build.
+    :param guild: the discord server to get the snapshot of
+    :return: the member snapshot of the guild
+    """
+    snapshot = _snapshots.get(guild.id)
+    if snapshot is not None and (MEMBER_CACHE != 'compact' or snapshot.age < MEMBER_SNAPSHOT_TTL):
+        return snapshot
+    task = _build_tasks.get(guild.id)
+    if task is None or task.done():
+        task = _build_tasks[guild.id] = asyncio.create_task(_build(guild))
+    snapshot = _snapshots[guild.id] = await asyncio.shield(task)
+    return snapshot
+
+
+def peek_snapshot(guild_id: int) -> MemberSnapshot | None:
+    """
+    Return the member snapshot of the guild if it has already been built, else None.
+    """
+    return _snapshots.get(guild_id)
+
+
+def snapshots() -> list[MemberSnapshot]:
+    return list(_snapshots.values())
+
+
+def drop_snapshot(guild_id: int | None = None) -> None:
+    """
+    Forget the member snapshot of a guild, or of every guild if no id is given.
+    """
+    if guild_id is None:
+        _snapshots.clear()
+    else:
+        _snapshots.pop(guild_id, None)
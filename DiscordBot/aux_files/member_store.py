@@ -0,0 +1,235 @@
+import asyncio
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import discord
+
+from ressources.paths import STORE_PATH
+from ressources.settings import STORE_FLUSH_INTERVAL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    nick TEXT,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS roles (
+    guild_id INTEGER NOT NULL,
+    role_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, role_id)
+);
+CREATE TABLE IF NOT EXISTS member_roles (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    role_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, user_id, role_id)
+);
+CREATE INDEX IF NOT EXISTS member_roles_role ON member_roles (guild_id, role_id);
+CREATE INDEX IF NOT EXISTS member_roles_user ON member_roles (guild_id, user_id);
+CREATE TABLE IF NOT EXISTS synced_guilds (
+    guild_id INTEGER PRIMARY KEY
+);
+"""
+
+
+class MemberStore:
+    """
+    SQLite mirror of the members, roles and role memberships of the guilds.
+    The mirror is fully rewritten once the members of a guild are loaded, then updated from the
+    gateway events (see `DiscordBot.events.member_store`). The changes are batched and written
+    in a thread every `STORE_FLUSH_INTERVAL` seconds, so that the event loop never waits for the disk.
+    A batch which cannot be written is kept and written again at the next flush; until then, the getters
+    do not answer from the mirror.
+    As the file survives restarts, the getters can answer from it before the members are loaded,
+    and the site can read it without going through the bot.
+
+    Example: ::
+        store.member_added(member)
+        await store.role_count(guild.id, role.id)
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, tuple]] = []
+        self._flush_lock = asyncio.Lock()  # the batches must be written in order
+        self._flusher: asyncio.Task | None = None
+        self.failing: bool = False
+        self._synced: set[int] | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript(SCHEMA)
+            self._synced = {row[0] for row in self._connection.execute("SELECT guild_id FROM synced_guilds")}
+        return self._connection
+
+    def _write(self, operations: list[tuple[str, tuple]]) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:  # a single transaction for the whole batch
+                for sql, params in operations:
+                    connection.execute(sql, params)
+
+    def _read(self, sql: str, params: tuple) -> list[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    # --- writes ---
+
+    def _queue(self, sql: str, params: tuple) -> None:
+        self._pending.append((sql, params))
+
+    async def _flush(self) -> None:
+        # must be called with the flush lock
+        if self._pending:
+            operations, self._pending = self._pending, []
+            try:
+                await self._run(self._write, operations)
+            except Exception:
+                self._pending = operations + self._pending  # the transaction was rolled back
+                self.failing = True
+                raise
+            self.failing = False
+
+    async def flush(self) -> None:
+        """
+        Write the pending changes now.
+        :raise sqlite3.Error: if the changes cannot be written. They are kept for the next flush
+        """
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush_forever(self) -> None:
+        while True:
+            await asyncio.sleep(STORE_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as error:  # database locked, disk full... : the flusher must keep running
+                print(f"Écriture du miroir SQLite impossible, {len(self._pending)} changement(s) en attente : "
+                      f"{error!r}", file=sys.stderr)
+
+    def start(self) -> None:
+        """
+        Start writing the batched changes in the background, if not already done.
+        """
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_forever())
+
+    def _member_rows(self, member: discord.Member, replace: bool = True) -> list[tuple[str, tuple]]:
+        guild_id = member.guild.id
+        operations = [
+            ("INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?)", (guild_id, member.id, member.name, member.nick))
+        ]
+        if replace:
+            operations.append(("DELETE FROM member_roles WHERE guild_id = ? AND user_id = ?", (guild_id, member.id)))
+        operations += [
+            ("INSERT INTO member_roles VALUES (?, ?, ?)", (guild_id, member.id, role.id))
+            for role in member.roles if not role.is_default()
+        ]
+        return operations
+
+    def member_added(self, member: discord.Member) -> None:
+        self._pending += self._member_rows(member)
+
+    def member_updated(self, member: discord.Member) -> None:
+        self._pending += self._member_rows(member)
+
+    def member_removed(self, member: discord.Member) -> None:
+        self._queue("DELETE FROM members WHERE guild_id = ? AND user_id = ?", (member.guild.id, member.id))
+        self._queue("DELETE FROM member_roles WHERE guild_id = ? AND user_id = ?", (member.guild.id, member.id))
+
+    def role_updated(self, role: discord.Role) -> None:
+        self._queue("INSERT OR REPLACE INTO roles VALUES (?, ?, ?, ?)",
+                    (role.guild.id, role.id, role.name, role.position))
+
+    def role_deleted(self, role: discord.Role) -> None:
+        self._queue("DELETE FROM roles WHERE guild_id = ? AND role_id = ?", (role.guild.id, role.id))
+        self._queue("DELETE FROM member_roles WHERE guild_id = ? AND role_id = ?", (role.guild.id, role.id))
+
+    async def sync_guild(self, guild: discord.Guild) -> None:
+        """
+        Replace everything known about a guild by the content of the discord cache.
+        Must be called once the members of the guild are loaded.
+        """
+        guild_id = guild.id
+        async with self._flush_lock:
+            await self._flush()  # older changes must not be applied over the new snapshot
+            # built after the flush, and written before any later batch : the changes received
+            # from now on are queued and written over the snapshot
+            operations = [
+                ("DELETE FROM members WHERE guild_id = ?", (guild_id,)),
+                ("DELETE FROM roles WHERE guild_id = ?", (guild_id,)),
+                ("DELETE FROM member_roles WHERE guild_id = ?", (guild_id,)),
+                ("INSERT OR IGNORE INTO synced_guilds VALUES (?)", (guild_id,)),
+            ]
+            operations += [("INSERT INTO roles VALUES (?, ?, ?, ?)", (guild_id, role.id, role.name, role.position))
+                           for role in guild.roles]
+            for member in guild.members:
+                operations += self._member_rows(member, replace=False)
+            await self._run(self._write, operations)
+        self._synced.add(guild_id)
+
+    # --- reads ---
+
+    def _open(self) -> None:
+        with self._lock:
+            self._connect()
+
+    async def has_guild(self, guild_id: int) -> bool:
+        """
+        Return True if the guild has already been fully mirrored, during this run or a previous one,
+        and the last changes could be written.
+        """
+        if self._synced is None:  # the database is opened in the executor : it may be slow on a busy disk
+            await self._run(self._open)
+        return guild_id in self._synced and not self.failing
+
+    async def role_count(self, guild_id: int, role_id: int) -> int:
+        await self.flush()
+        if role_id == guild_id:  # @everyone
+            sql, params = "SELECT COUNT(*) FROM members WHERE guild_id = ?", (guild_id,)
+        else:
+            sql, params = "SELECT COUNT(*) FROM member_roles WHERE guild_id = ? AND role_id = ?", (guild_id, role_id)
+        return (await self._run(self._read, sql, params))[0][0]
+
+    async def role_counts(self, guild_id: int) -> dict[int, int]:
+        """
+        Return the number of members of every role of the guild.
+        """
+        await self.flush()
+        rows = await self._run(self._read, """
+            SELECT roles.role_id, COUNT(member_roles.user_id) FROM roles
+            LEFT JOIN member_roles ON member_roles.guild_id = roles.guild_id AND member_roles.role_id = roles.role_id
+            WHERE roles.guild_id = ? GROUP BY roles.role_id
+        """, (guild_id,))
+        counts = dict(rows)
+        if guild_id in counts:
+            counts[guild_id] = await self.role_count(guild_id, guild_id)
+        return counts
+
+    async def member_roles(self, guild_id: int, user_id: int) -> list[int] | None:
+        """
+        Return the ids of the roles of a member, or None if the member is not in the mirror.
+        The roles are resolved by the caller with `guild.get_role`, so that they show their current names.
+        """
+        await self.flush()
+        if not await self._run(self._read, "SELECT 1 FROM members WHERE guild_id = ? AND user_id = ?",
+                                (guild_id, user_id)):
+            return None
+        rows = await self._run(self._read, "SELECT role_id FROM member_roles WHERE guild_id = ? AND user_id = ?",
+                               (guild_id, user_id))
+        return [row[0] for row in rows]
+
+
+store = MemberStore(STORE_PATH)
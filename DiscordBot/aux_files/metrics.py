@@ -0,0 +1,244 @@
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from collections import Counter
+
+import aiohttp
+
+from DiscordBot.aux_files.member_snapshot import snapshots
+
+# upper bounds in seconds of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, float('inf'))
+
+
+class Histogram:
+    """
+    Cumulative histogram of durations, in the Prometheus way.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: list[int] = [0] * len(buckets)
+        self.sum: float = 0.0
+        self.count: int = 0
+        self.max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def prometheus(self, name: str, labels: str = "") -> list[str]:
+        sep = "," if labels else ""
+        braces = f"{{{labels}}}" if labels else ""
+        lines, cumulated = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulated += count
+            le = "+Inf" if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {cumulated}')
+        lines.append(f"{name}_sum{braces} {self.sum}")
+        lines.append(f"{name}_count{braces} {self.count}")
+        return lines
+
+
+class Metrics:
+    """
+    All the measures of the bot : latency of the commands and of the admin check,
+    calls to the discord API per route, 429 responses, lag and stalls of the event loop,
+    and the private messages (outcomes, queue depth, delay between the submission and the sending).
+    """
+
+    def __init__(self):
+        self.commands: dict[str, Histogram] = {}
+        self.command_errors: Counter = Counter()
+        self.admin_check = Histogram()
+        self.http: dict[str, Histogram] = {}
+        self.http_status: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self.retry_after: float = 0.0
+        self.loop_lag = Histogram()
+        self.loop_stalls: int = 0
+        self.dm_results: Counter = Counter()
+        self.dm_queue_depth: int = 0
+        self.dm_latency = Histogram()
+
+    def observe_command(self, name: str, duration: float) -> None:
+        self.commands.setdefault(name, Histogram()).observe(duration)
+
+    def observe_http(self, route: str, status: int | str, duration: float) -> None:
+        self.http.setdefault(route, Histogram()).observe(duration)
+        self.http_status[(route, status)] += 1
+
+    def prometheus(self) -> str:
+        """
+        Render all the measures in the Prometheus text exposition format.
+        """
+        lines = ["# TYPE discord_bot_command_seconds histogram"]
+        for name, histogram in self.commands.items():
+            lines += histogram.prometheus("discord_bot_command_seconds", f'command="{name}"')
+        lines.append("# TYPE discord_bot_command_errors_total counter")
+        for name, count in self.command_errors.items():
+            lines.append(f'discord_bot_command_errors_total{{command="{name}"}} {count}')
+        lines.append("# TYPE discord_bot_admin_check_seconds histogram")
+        lines += self.admin_check.prometheus("discord_bot_admin_check_seconds")
+        lines.append("# TYPE discord_bot_http_seconds histogram")
+        for route, histogram in self.http.items():
+            lines += histogram.prometheus("discord_bot_http_seconds", f'route="{route}"')
+        lines.append("# TYPE discord_bot_http_responses_total counter")
+        for (route, status), count in self.http_status.items():
+            lines.append(f'discord_bot_http_responses_total{{route="{route}",status="{status}"}} {count}')
+        lines.append("# TYPE discord_bot_rate_limited_total counter")
+        for route, count in self.rate_limited.items():
+            lines.append(f'discord_bot_rate_limited_total{{route="{route}"}} {count}')
+        lines.append("# TYPE discord_bot_retry_after_seconds_total counter")
+        lines.append(f"discord_bot_retry_after_seconds_total {self.retry_after}")
+        lines.append("# TYPE discord_bot_loop_lag_seconds histogram")
+        lines += self.loop_lag.prometheus("discord_bot_loop_lag_seconds")
+        lines.append("# TYPE discord_bot_loop_stalls_total counter")
+        lines.append(f"discord_bot_loop_stalls_total {self.loop_stalls}")
+        lines.append("# TYPE discord_bot_dm_total counter")
+        for result, count in self.dm_results.items():
+            lines.append(f'discord_bot_dm_total{{result="{result}"}} {count}')
+        lines.append("# TYPE discord_bot_dm_queue_depth gauge")
+        lines.append(f"discord_bot_dm_queue_depth {self.dm_queue_depth}")
+        lines.append("# TYPE discord_bot_dm_latency_seconds histogram")
+        lines += self.dm_latency.prometheus("discord_bot_dm_latency_seconds")
+        lines.append("# TYPE discord_bot_resident_memory_bytes gauge")
+        lines.append(f"discord_bot_resident_memory_bytes {rss_bytes()}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def rss_bytes() -> int:
+    """
+    Return the resident memory of the process in bytes, or its peak where `/proc` does not exist.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource  # not available on Windows
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024  # kilobytes on Linux
+
+
+def memory_report(bot) -> str:
+    """
+    Describe the memory used by the bot : resident memory of the process,
+    members kept in the discord.py cache and members kept in the compact snapshots.
+    """
+    cached = sum(len(guild.members) for guild in bot.guilds)
+    compact = snapshots()
+    snapshot_size = sum(snapshot.nbytes() for snapshot in compact)
+    return (f"Mémoire : {rss_bytes() / 2 ** 20:.1f} Mo résidents, {cached} membre(s) dans le cache de discord.py, "
+            f"{sum(len(snapshot) for snapshot in compact)} membre(s) dans les instantanés compacts "
+            f"({snapshot_size / 2 ** 20:.1f} Mo)")
+
+
+# route of the discord API call being made by the current task, read by the rate limit trace
+_current_route: contextvars.ContextVar[str] = contextvars.ContextVar('current_route', default='inconnue')
+# status of the last HTTP response received by the current task, set by the trace :
+# 'ok' when the trace is not installed, as discord.py returns the body of the response only
+_last_status: contextvars.ContextVar[int | str] = contextvars.ContextVar('last_status', default='ok')
+
+
+async def _on_request_end(session, context, params: aiohttp.TraceRequestEndParams) -> None:
+    response = params.response
+    _last_status.set(response.status)
+    if response.status != 429:
+        return
+    # discord.py retries the 429 responses by itself : they never reach the wrapped request
+    headers = response.headers
+    route = 'global' if headers.get('X-RateLimit-Global', '').lower() == 'true' else _current_route.get()
+    metrics.rate_limited[route] += 1
+    try:
+        metrics.retry_after += float(headers.get('X-RateLimit-Reset-After') or headers.get('Retry-After') or 0)
+    except ValueError:
+        pass
+
+
+def rate_limit_trace() -> aiohttp.TraceConfig:
+    """
+    Return an aiohttp trace counting the 429 responses of the discord API and the delays they impose,
+    read from the status and the headers of each response, and recording the status of the calls.
+    It must be given to the constructor of the bot, which hands it to the HTTP session of discord.py.
+    Example: ::
+        bot = commands.Bot(command_prefix='@', intents=intents, http_trace=rate_limit_trace())
+    """
+    trace = aiohttp.TraceConfig()
+    trace.on_request_end.append(_on_request_end)
+    return trace
+
+
+def _route_name(route) -> str:
+    # the path of a discord.py Route is a template (/guilds/{guild_id}/roles), so ids do not multiply the routes
+    return f"{route.method} {route.path}"
+
+
+def instrument_bot(bot) -> None:
+    """
+    Measure every command and every call to the discord API of the bot (the 429 responses are counted by
+    `rate_limit_trace`, given to the constructor of the bot).
+    Must be called once, before the bot is started.
+    :param bot: the discord bot to instrument
+    """
+    request = bot.http.request
+
+    @functools.wraps(request)
+    async def timed_request(route, **kwargs):
+        name = _route_name(route)
+        token = _current_route.set(name)
+        status_token = _last_status.set('ok')
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            response = await request(route, **kwargs)
+            status = _last_status.get()  # the last response, after the retries of discord.py
+            return response
+        except Exception as error:
+            status = getattr(error, 'status', 'error')
+            raise
+        finally:
+            metrics.observe_http(name, status, time.perf_counter() - start)
+            _current_route.reset(token)
+            _last_status.reset(status_token)
+
+    bot.http.request = timed_request
+
+    @bot.before_invoke
+    async def start_timer(ctx):
+        ctx.started_at = time.perf_counter()
+
+    @bot.after_invoke
+    async def stop_timer(ctx):
+        # called even when the command raised, but not when a check failed
+        if hasattr(ctx, 'started_at'):
+            metrics.observe_command(ctx.command.qualified_name, time.perf_counter() - ctx.started_at)
+        if ctx.command_failed:
+            metrics.command_errors[ctx.command.qualified_name] += 1
+
+
+async def monitor_loop_lag(interval: float = 0.5) -> None:
+    """
+    Measure forever how late the event loop wakes up a task sleeping for `interval` seconds.
+    """
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        metrics.loop_lag.observe(max(0.0, time.monotonic() - start - interval))
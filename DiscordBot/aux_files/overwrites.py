@@ -1,6 +1,79 @@
 from discord import Permissions, PermissionOverwrite, Guild
+from discord.abc import GuildChannel
 from discord.guild import Role
 
+TEXT_TEMPLATE = 'text'
+VOICE_TEMPLATE = 'voice'
+
+
+def _text_allow() -> PermissionOverwrite:
+    text_perms = Permissions.text()
+    text_perms.update(manage_messages=False, read_message_history=True, mention_everyone=False, read_messages=True)
+    return PermissionOverwrite.from_pair(text_perms, Permissions.none())
+
+
+def _voice_allow() -> PermissionOverwrite:
+    voice_perms = Permissions.voice()
+    voice_perms.update(priority_speaker=False, move_members=False, mute_members=False, deafen_members=False)
+    return PermissionOverwrite.from_pair(voice_perms, Permissions.none())
+
+
+# the permissions are computed once, the templates of every UE channel share them
+_DENY_ALL = PermissionOverwrite.from_pair(Permissions.none(), Permissions.all())
+_ALLOW = {TEXT_TEMPLATE: _text_allow(), VOICE_TEMPLATE: _voice_allow()}
+# (template, role id) -> overwrites of the channels of this UE
+_templates: dict[tuple[str, int], dict[Role, PermissionOverwrite]] = {}
+
+
+def template(kind: str, guild: Guild, ue_role: Role) -> dict[Role, PermissionOverwrite]:
+    """
+    Return the overwrites an UE channel must have, built once per role and template.
+    The returned dict is shared : it must not be modified.
+    Example: ::
+        expected = overwrites.template(overwrites.TEXT_TEMPLATE, ctx.guild, ue_role)
+    :param kind: TEXT_TEMPLATE or VOICE_TEMPLATE
+    :param guild: the discord server of the channel
+    :param ue_role: the role corresponding to the ue of the channel
+    :return: the overwrites of the channel, by role
+    """
+    key = (kind, ue_role.id)
+    overwrites = _templates.get(key)
+    if overwrites is None:
+        overwrites = _templates[key] = {guild.default_role: _DENY_ALL, ue_role: _ALLOW[kind]}
+    return overwrites
+
+
+def drop_templates(role_id: int | None = None) -> None:
+    """
+    Forget the templates of a role, or of every role if no id is given.
+    """
+    if role_id is None:
+        _templates.clear()
+    else:
+        for kind in _ALLOW:
+            _templates.pop((kind, role_id), None)
+
+
+def has_drifted(channel: GuildChannel, expected: dict[Role, PermissionOverwrite]) -> bool:
+    """
+    Return True if the overwrites of a channel differ from the expected ones.
+    Only the targets of the template are compared : the overwrites added by hand to a channel
+    (for a professor, a moderator...) are not a drift.
+    """
+    current = {target.id: overwrite.pair() for target, overwrite in channel.overwrites.items()}
+    return any(current.get(target.id) != overwrite.pair() for target, overwrite in expected.items())
+
+
+def merged(channel: GuildChannel, expected: dict[Role, PermissionOverwrite]) -> dict:
+    """
+    Return the overwrites of a channel with the ones of the template put back, keeping the other targets.
+    Example: ::
+        await channel.edit(overwrites=overwrites.merged(channel, expected))
+    """
+    current = dict(channel.overwrites)
+    current.update(expected)
+    return current
+
 
 def ue_channel_perms(guild: Guild, ue_role: Role) -> dict[Role, PermissionOverwrite]:
     """
@@ -14,12 +87,7 @@ def ue_channel_perms(guild: Guild, ue_role: Role) -> dict[Role, PermissionOverwr
     :param ue_role: the role corresponding to the ue for which the salon is being created
     :return: a dict usable to overwrite the permissions of an ue channel
     """
-    text_perms = Permissions.text()
-    text_perms.update(manage_messages=False, read_message_history=True, mention_everyone=False, read_messages=True)
-    return {
-        guild.default_role: PermissionOverwrite.from_pair([], Permissions.all()),
-        ue_role: PermissionOverwrite.from_pair(text_perms, [])
-    }
+    return dict(template(TEXT_TEMPLATE, guild, ue_role))
 
 
 def ue_voice_perms(guild: Guild, ue_role: Role) -> dict[Role, PermissionOverwrite]:
@@ -34,9 +102,4 @@ def ue_voice_perms(guild: Guild, ue_role: Role) -> dict[Role, PermissionOverwrit
     :param ue_role: the role corresponding to the ue for which the salon is being created
     :return: a dict usable to overwrite the permissions of an ue channel
     """
-    voice_perms = Permissions.voice()
-    voice_perms.update(priority_speaker=False, move_members=False, mute_members=False, deafen_members=False)
-    return {
-        guild.default_role: PermissionOverwrite.from_pair([], Permissions.all()),
-        ue_role: PermissionOverwrite.from_pair(voice_perms, [])
-    }
+    return dict(template(VOICE_TEMPLATE, guild, ue_role))
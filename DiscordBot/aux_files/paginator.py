@@ -0,0 +1,112 @@
+import time
+from typing import Callable, Sequence
+
+import discord
+
+from ressources.settings import PAGE_CACHE_TTL, PAGE_TIMEOUT
+
+PREVIOUS = '◀'
+NEXT = '▶'
+MAX_LENGTH = 1900
+
+
+class _PageButtons(discord.ui.View):
+    """
+    The ◀ and ▶ buttons under the message of a paginator.
+    """
+
+    def __init__(self, paginator: 'Paginator'):
+        super().__init__(timeout=paginator.timeout)
+        self.paginator: Paginator = paginator
+
+    @discord.ui.button(emoji=PREVIOUS, style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.paginator.turn(interaction, -1)
+
+    @discord.ui.button(emoji=NEXT, style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.paginator.turn(interaction, 1)
+
+    async def on_timeout(self) -> None:
+        await self.paginator.close()
+
+
+class Paginator:
+    """
+    A list sent as a single discord message, showing one page at a time.
+    The admin moves between the pages with the ◀ and ▶ buttons, and the message is edited in place
+    by the answer to the click, which is not subject to the rate limit of the message edits.
+    A page is rendered only when it is shown, and kept `PAGE_CACHE_TTL` seconds :
+    coming back to it later renders it again, so it shows the current names of the items.
+    The buttons are removed `PAGE_TIMEOUT` seconds after the last move.
+
+    Example: ::
+        roles = sorted(ctx.guild.roles)
+        await Paginator(ctx, f"{len(roles)} rôles :", roles, lambda role: f"- {role.name}").send()
+    """
+
+    def __init__(self, ctx, title: str, items: Sequence, render_item: Callable[[object], str] = str,
+                 per_page: int = 20, timeout: float = PAGE_TIMEOUT, ttl: float = PAGE_CACHE_TTL):
+        self.ctx = ctx
+        self.title: str = title
+        self.items: Sequence = items
+        self.render_item: Callable[[object], str] = render_item
+        self.per_page: int = per_page
+        self.timeout: float = timeout
+        self.ttl: float = ttl
+        self.page: int = 0
+        self.message: discord.Message | None = None
+        self._cache: dict[int, tuple[float, str]] = {}
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-len(self.items) // self.per_page))
+
+    def render(self, page: int) -> str:
+        """
+        Return the text of a page, from the cache if it has been rendered less than `ttl` seconds ago.
+        """
+        now = time.monotonic()
+        cached = self._cache.get(page)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+        header = self.title if self.pages == 1 else f"{self.title} (page {page + 1}/{self.pages})"
+        text = header
+        for item in self.items[page * self.per_page:(page + 1) * self.per_page]:
+            line = self.render_item(item)
+            if len(text) + len(line) + 1 > MAX_LENGTH:
+                text += "\n…"
+                break
+            text += f"\n{line}"
+        self._cache[page] = (now, text)
+        return text
+
+    async def send(self) -> None:
+        """
+        Send the first page, with the buttons if there are several pages.
+        """
+        if self.pages == 1:
+            self.message = await self.ctx.send(self.render(0))
+            return
+        # the view is kept by the connection state of discord.py until it times out
+        self.message = await self.ctx.send(self.render(0), view=_PageButtons(self))
+
+    async def turn(self, interaction: discord.Interaction, step: int) -> None:
+        """
+        Show the previous (step = -1) or the next (step = 1) page, in answer to a click on a button.
+        """
+        self.page = (self.page + step) % self.pages
+        try:
+            await interaction.response.edit_message(content=self.render(self.page))
+        except discord.HTTPException:
+            pass  # e.g. the message has been deleted : the next click will try again
+
+    async def close(self) -> None:
+        """
+        Remove the buttons, once the pages can no longer be turned.
+        """
+        self._cache.clear()
+        try:
+            await self.message.edit(view=None)
+        except discord.HTTPException:
+            pass
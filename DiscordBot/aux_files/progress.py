@@ -0,0 +1,76 @@
+import asyncio
+
+import discord
+
+from DiscordBot.aux_files.ratelimit import limiter
+from ressources.settings import PROGRESS_INTERVAL
+
+
+class ProgressMessage:
+    """
+    A single discord message showing the progress of a long operation.
+    The message is edited at most once every `PROGRESS_INTERVAL` seconds,
+    whatever the number of steps done in between.
+
+    Example: ::
+        progress = ProgressMessage(ctx, "Création des UEs", len(steps))
+        await progress.start()
+        for step in steps:
+            ...
+            progress.advance()
+        await progress.finish("Toutes les UEs ont été créées")
+    """
+
+    def __init__(self, ctx, title: str, total: int, interval: float = PROGRESS_INTERVAL):
+        self.ctx = ctx
+        self.title: str = title
+        self.total: int = total
+        self.interval: float = interval
+        self.done: int = 0
+        self.failed: int = 0
+        self.message: discord.Message | None = None
+        self._shown: str | None = None
+        self._ticker: asyncio.Task | None = None
+
+    def advance(self, n: int = 1, failed: bool = False) -> None:
+        self.done += n
+        if failed:
+            self.failed += n
+
+    def render(self) -> str:
+        ratio = self.done / self.total if self.total else 1
+        bar = '█' * int(ratio * 20) + '░' * (20 - int(ratio * 20))
+        text = f"{self.title}\n`{bar}` {self.done}/{self.total}"
+        if self.failed:
+            text += f" ({self.failed} échec(s))"
+        return text
+
+    async def _show(self, content: str) -> None:
+        if content == self._shown:
+            return
+        self._shown = content
+        if self.message is None:
+            self.message = await self.ctx.send(content)
+        else:
+            await limiter.acquire('message_edit', self.message.channel.id)
+            await self.message.edit(content=content)
+
+    async def _tick(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._show(self.render())
+            except discord.HTTPException:
+                pass  # the progress display must never break the operation
+
+    async def start(self) -> None:
+        await self._show(self.render())
+        self._ticker = asyncio.create_task(self._tick())
+
+    async def finish(self, summary: str = "") -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+        content = self.render()
+        if summary:
+            content += f"\n{summary}"
+        await self._show(content)
@@ -0,0 +1,459 @@
+import asyncio
+from collections import Counter
+
+import discord
+
+from DiscordBot.aux_files import overwrites
+from DiscordBot.aux_files.guild_index import get_index, normalize
+from DiscordBot.aux_files.journal import journal
+from DiscordBot.aux_files.progress import ProgressMessage
+from DiscordBot.aux_files.ratelimit import limiter
+from DiscordBot.aux_files.utils import TEXT, VOICE, BOTH, parse_ue, send_with_details
+from ressources.settings import PROVISIONING_CONCURRENCY
+
+# argument of the commands asking for the description of their plan instead of running it
+PLAN_FLAG = '--plan'
+# average duration in seconds of a call to the discord API, used to estimate the duration of a plan
+AVERAGE_LATENCY = 0.3
+
+
+class Step:
+    """
+    A single call to the discord API.
+    A step only holds names, the discord objects are resolved through the guild index
+    when the step is run, so that a step can use an object created by a previous step.
+    """
+    __slots__ = ('kind', 'params')
+
+    def __init__(self, kind: str, **params):
+        self.kind: str = kind
+        self.params: dict = params
+
+    def __repr__(self):
+        return f"Step({self.kind}, {self.params})"
+
+
+class Plan:
+    """
+    The list of all the steps needed by an operation.
+    The plan is made of stages run one after the other.
+    A stage is made of chains run concurrently, and the steps of a chain are run in order.
+    """
+
+    def __init__(self):
+        self.stages: list[list[list[Step]]] = []
+
+    def add_stage(self) -> list[list[Step]]:
+        stage = []
+        self.stages.append(stage)
+        return stage
+
+    def steps(self):
+        for stage in self.stages:
+            for chain in stage:
+                yield from chain
+
+    def __len__(self) -> int:
+        return sum(len(chain) for stage in self.stages for chain in stage)
+
+    def to_json(self) -> list:
+        """
+        Return the stages of the plan as JSON serializable lists of [kind, params] steps.
+        """
+        return [[[[step.kind, step.params] for step in chain] for chain in stage] for stage in self.stages]
+
+    @classmethod
+    def from_json(cls, stages: list, skip=frozenset()) -> 'Plan':
+        """
+        Rebuild a plan from `to_json`, without the steps whose index (in the order of `steps`) is in `skip`.
+        """
+        plan, i = cls(), 0
+        for stage in stages:
+            new_stage = plan.add_stage()
+            for chain in stage:
+                steps = []
+                for kind, params in chain:
+                    if i not in skip:
+                        steps.append(Step(kind, **params))
+                    i += 1
+                if steps:
+                    new_stage.append(steps)
+        return plan
+
+
+def plan_creation(guild: discord.Guild, ue_dict: dict[str, list[str]], channel_type: int = TEXT) -> Plan:
+    """
+    Compute every category, role, channel and message needed to create the given UEs.
+    Objects which already exist in the guild are not created again,
+    and an UE listed in several categories is only created in the first one.
+    :param guild: the discord server in which the UEs are to be created
+    :param ue_dict: a dict whose keys are the name of the categories and values the list of their UEs
+    :param channel_type: the type of the channels to create : either TEXT, VOICE or BOTH
+    :return: the plan of the creation
+    """
+    index = get_index(guild)
+    plan = Plan()
+    categories = plan.add_stage()
+    ue_chains = plan.add_stage()
+    planned_roles, planned_channels = set(), set()
+    for category_name, ues in ue_dict.items():
+        if index.category(category_name) is None:
+            categories.append([Step('create_category', name=category_name)])
+        for ue_name in ues:
+            chain = []
+            if index.role(ue_name) is None and normalize(ue_name) not in planned_roles:
+                planned_roles.add(normalize(ue_name))
+                chain.append(Step('create_role', name=ue_name))
+            if index.channel(ue_name) is None and normalize(ue_name) not in planned_channels:
+                planned_channels.add(normalize(ue_name))
+                if channel_type in (TEXT, BOTH):
+                    chain.append(Step('create_text_channel', name=ue_name, role=ue_name, category=category_name))
+                    chain.append(Step('send_message', channel=ue_name, role=ue_name))
+                if channel_type in (VOICE, BOTH):
+                    chain.append(Step('create_voice_channel', name=ue_name, role=ue_name, category=category_name))
+            if chain:
+                ue_chains.append(chain)
+    return plan
+
+
+def plan_deletion(guild: discord.Guild, categories: list[discord.CategoryChannel]) -> Plan:
+    """
+    Compute every channel, role and category to delete to remove the given UE categories.
+    For each channel of the categories, the role with the same name is deleted too.
+    :param guild: the discord server from which the UEs are to be deleted
+    :param categories: the categories to delete
+    :return: the plan of the deletion
+    """
+    plan = Plan()
+    channel_chains = plan.add_stage()
+    category_chains = plan.add_stage()
+    planned_roles = set()
+    for category in categories:
+        for channel in category.channels:
+            channel_chains.append(_deletion_chain(guild, channel, planned_roles))
+        category_chains.append([Step('delete_category', id=category.id, name=category.name)])
+    return plan
+
+
+def plan_channel_deletion(guild: discord.Guild, channel: discord.abc.GuildChannel) -> Plan:
+    """
+    Compute the deletion of a single UE channel and of the role with the same name.
+    :param guild: the discord server from which the UE is to be deleted
+    :param channel: the channel to delete
+    :return: the plan of the deletion
+    """
+    plan = Plan()
+    plan.add_stage().append(_deletion_chain(guild, channel, set()))
+    return plan
+
+
+def _deletion_chain(guild: discord.Guild, channel: discord.abc.GuildChannel, planned_roles: set) -> list[Step]:
+    chain = [Step('delete_channel', id=channel.id, name=channel.name)]
+    role = parse_ue(guild, channel.name)
+    if role is not None and role.id not in planned_roles:
+        planned_roles.add(role.id)
+        chain.append(Step('delete_role', id=role.id, name=role.name))
+    return chain
+
+
+def _channel_template(channel: discord.abc.GuildChannel) -> str:
+    return overwrites.VOICE_TEMPLATE if isinstance(channel, discord.VoiceChannel) else overwrites.TEXT_TEMPLATE
+
+
+def plan_permissions_sync(guild: discord.Guild, categories: list[discord.CategoryChannel]) -> Plan:
+    """
+    Compute the UE channels of the given categories whose permissions differ from their template.
+    A channel is an UE channel if a role has the same name. The channels already in line are left untouched.
+    :param guild: the discord server whose channels are to be synchronized
+    :param categories: the categories to check
+    :return: the plan of the synchronization, with one edit per drifted channel
+    """
+    plan = Plan()
+    edits = plan.add_stage()
+    index = get_index(guild)
+    for category in categories:
+        for channel in category.channels:
+            role = index.role(channel.name)
+            if role is None:
+                continue
+            if overwrites.has_drifted(channel, overwrites.template(_channel_template(channel), guild, role)):
+                edits.append([Step('sync_permissions', id=channel.id, name=channel.name, role=role.name)])
+    return plan
+
+
+# kind of step -> label of the objects concerned, in the plan descriptions
+STEP_LABELS = {
+    'create_category': "Catégories à créer",
+    'create_role': "Rôles à créer",
+    'create_text_channel': "Salons textuels à créer",
+    'create_voice_channel': "Salons vocaux à créer",
+    'send_message': "Messages à envoyer",
+    'delete_channel': "Salons à supprimer",
+    'delete_role': "Rôles à supprimer",
+    'delete_category': "Catégories à supprimer",
+    'sync_permissions': "Salons dont les permissions sont à rétablir",
+}
+
+
+def _route(guild: discord.Guild, step: Step) -> tuple[str, object]:
+    """
+    Return the rate limit bucket (route, major parameter) used by a step.
+    """
+    route = STEP_HANDLERS[step.kind][0]
+    major = step.params.get('channel', guild.id) if route == 'message_send' else guild.id
+    return route, major
+
+
+def estimate_duration(guild: discord.Guild, plan: Plan, concurrency: int = PROVISIONING_CONCURRENCY) -> float:
+    """
+    Estimate the wall-clock time in seconds needed to run a plan.
+    Each rate limit bucket lets its first `limit` calls go at once, then one call every `per / limit` seconds.
+    The plan can't go faster than its slowest bucket, nor than the latency of its calls spread over
+    the concurrent chains.
+    :param guild: the discord server the plan is to be run on
+    :param plan: the plan to estimate
+    :param concurrency: the maximum number of chains run at the same time
+    :return: the estimated duration in seconds
+    """
+    calls = Counter(_route(guild, step) for step in plan.steps())
+    calls[('global', None)] = len(plan)
+    bucket_times = []
+    for (route, _), count in calls.items():
+        limit, per = limiter.limits[route]
+        bucket_times.append(max(0, count - limit) * per / limit)
+    return max(bucket_times + [len(plan) * AVERAGE_LATENCY / concurrency])
+
+
+def describe(guild: discord.Guild, plan: Plan) -> tuple[str, str]:
+    """
+    Describe a plan without running it.
+    :param guild: the discord server the plan is to be run on
+    :param plan: the plan to describe
+    :return: a short summary (number of calls per kind and estimated duration)
+        and the detailed list of the objects concerned
+    """
+    names: dict[str, list[str]] = {}
+    for step in plan.steps():
+        names.setdefault(step.kind, []).append(step.params.get('name') or step.params.get('channel'))
+    minutes, seconds = divmod(round(estimate_duration(guild, plan)), 60)
+    summary = f"Plan : {len(plan)} appel(s) à l'API, durée estimée ~{minutes} min {seconds:02d} s"
+    details = []
+    for kind, label in STEP_LABELS.items():
+        if kind in names:
+            summary += f"\n- {label} : {len(names[kind])}"
+            details.append(f"{label} ({len(names[kind])}) :\n" + ", ".join(names[kind]))
+    return summary, "\n\n".join(details)
+
+
+def _require(found, name: str):
+    """
+    Return the object found in the index, or raise LookupError if the previous step creating it failed.
+    """
+    if found is None:
+        raise LookupError(f"{name} introuvable")
+    return found
+
+
+async def _create_category(guild: discord.Guild, name: str) -> None:
+    category = await guild.create_category(name)
+    get_index(guild).add_channel(category)
+
+
+async def _create_role(guild: discord.Guild, name: str) -> None:
+    role = await guild.create_role(name=name)
+    get_index(guild).add_role(role)
+
+
+async def _create_text_channel(guild: discord.Guild, name: str, role: str, category: str) -> None:
+    index = get_index(guild)
+    ue_role = _require(index.role(role), role)
+    perms = overwrites.ue_channel_perms(guild, ue_role)
+    channel = await guild.create_text_channel(name, overwrites=perms,
+                                              category=_require(index.category(category), category))
+    index.add_channel(channel)
+
+
+async def _create_voice_channel(guild: discord.Guild, name: str, role: str, category: str) -> None:
+    index = get_index(guild)
+    ue_role = _require(index.role(role), role)
+    perms = overwrites.ue_voice_perms(guild, ue_role)
+    channel = await guild.create_voice_channel(name, overwrites=perms,
+                                               category=_require(index.category(category), category))
+    index.add_channel(channel)
+
+
+def _text_channel(guild: discord.Guild, name: str) -> discord.TextChannel | None:
+    text_channel = get_index(guild).channel(name)
+    if not isinstance(text_channel, discord.TextChannel):  # a voice channel has the same name
+        text_channel = discord.utils.get(guild.text_channels, name=normalize(name))
+    return text_channel
+
+
+async def _send_message(guild: discord.Guild, channel: str, role: str) -> None:
+    index = get_index(guild)
+    text_channel = _require(_text_channel(guild, channel), channel)
+    await text_channel.send(f'{_require(index.role(role), role).mention}, votre salon a été créé')
+
+
+async def _delete_channel(guild: discord.Guild, id: int, name: str) -> None:
+    channel = _require(guild.get_channel(id), name)
+    await channel.delete(reason="Suppression par un administrateur")
+    get_index(guild).remove_channel(channel)
+
+
+async def _delete_role(guild: discord.Guild, id: int, name: str,
+                       reason: str = "Suppression par un administrateur") -> None:
+    role = _require(guild.get_role(id), name)
+    await role.delete(reason=reason)
+    get_index(guild).remove_role(role)
+
+
+async def _sync_permissions(guild: discord.Guild, id: int, name: str, role: str) -> None:
+    channel = _require(guild.get_channel(id), name)
+    ue_role = _require(get_index(guild).role(role), role)
+    template = overwrites.template(_channel_template(channel), guild, ue_role)
+    await channel.edit(overwrites=overwrites.merged(channel, template), reason="Synchronisation des permissions")
+
+
+# kind of step -> (rate limit route, coroutine running the step)
+STEP_HANDLERS = {
+    'create_category': ('category_create', _create_category),
+    'create_role': ('role_create', _create_role),
+    'create_text_channel': ('channel_create', _create_text_channel),
+    'create_voice_channel': ('channel_create', _create_voice_channel),
+    'send_message': ('message_send', _send_message),
+    'delete_channel': ('channel_delete', _delete_channel),
+    'delete_role': ('role_delete', _delete_role),
+    'delete_category': ('channel_delete', _delete_channel),
+    'sync_permissions': ('channel_edit', _sync_permissions),
+}
+
+
+def step_needed(guild: discord.Guild, step: Step) -> bool:
+    """
+    Return False if the effect of a step is already there, e.g. when it succeeded just before a crash.
+    """
+    index = get_index(guild)
+    params = step.params
+    if step.kind == 'create_category':
+        return index.category(params['name']) is None
+    if step.kind == 'create_role':
+        return index.role(params['name']) is None
+    if step.kind == 'create_text_channel':
+        return discord.utils.get(guild.text_channels, name=normalize(params['name'])) is None
+    if step.kind == 'create_voice_channel':
+        return discord.utils.get(guild.voice_channels, name=params['name']) is None
+    if step.kind in ('delete_channel', 'delete_category'):
+        return guild.get_channel(params['id']) is not None
+    if step.kind == 'delete_role':
+        return guild.get_role(params['id']) is not None
+    if step.kind == 'send_message':
+        # the message is the first one of the channel created by the plan : a channel with a message
+        # already got it (or is in use, and does not need it any more)
+        text_channel = _text_channel(guild, params['channel'])
+        return text_channel is None or text_channel.last_message_id is None
+    if step.kind == 'sync_permissions':
+        channel, role = guild.get_channel(params['id']), index.role(params['role'])
+        if channel is None or role is None:
+            return True  # let the step fail and report it
+        return overwrites.has_drifted(channel, overwrites.template(_channel_template(channel), guild, role))
+    return True
+
+
+class Report:
+    """
+    Result of the execution of a plan.
+    """
+
+    def __init__(self):
+        self.done: int = 0
+        self.skipped: int = 0
+        self.failures: list[tuple[Step, Exception]] = []
+
+    def summary(self) -> str:
+        text = f"{self.done} étape(s) réussie(s)"
+        if self.failures:
+            text += f", {len(self.failures)} échec(s), {self.skipped} étape(s) abandonnée(s) :\n- "
+            text += "\n- ".join(f"{step.kind} {step.params} : {error}" for step, error in self.failures[:10])
+        return text
+
+
+async def run_step(guild: discord.Guild, step: Step) -> None:
+    """
+    Run a single step, waiting for its rate limit bucket first.
+    """
+    await limiter.acquire(*_route(guild, step))
+    await STEP_HANDLERS[step.kind][1](guild, **step.params)
+
+
+async def run_plan(guild: discord.Guild, plan: Plan, progress: ProgressMessage | None = None,
+                   concurrency: int = PROVISIONING_CONCURRENCY, on_done=None) -> Report:
+    """
+    Run all the steps of a plan with bounded concurrency.
+    When a step fails, the following steps of its chain are abandoned, the other chains go on.
+    Example: ::
+        plan = plan_creation(ctx.guild, {'TC': ['MT01', 'MT02']})
+        report = await run_plan(ctx.guild, plan)
+        await ctx.send(report.summary())
+    :param guild: the discord server to run the plan on
+    :param plan: the plan to run
+    :param progress: an optional progress message to update after each step
+    :param concurrency: the maximum number of chains run at the same time
+    :param on_done: an optional function called with each step once it succeeded
+    :return: the report of the execution
+    """
+    report = Report()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_chain(chain: list[Step]) -> None:
+        async with semaphore:
+            for i, step in enumerate(chain):
+                try:
+                    await run_step(guild, step)
+                except (discord.HTTPException, LookupError) as error:
+                    report.failures.append((step, error))
+                    report.skipped += len(chain) - i - 1
+                    if progress is not None:
+                        progress.advance(len(chain) - i, failed=True)
+                    return
+                report.done += 1
+                if on_done is not None:
+                    on_done(step)
+                if progress is not None:
+                    progress.advance()
+
+    for stage in plan.stages:
+        await asyncio.gather(*(run_chain(chain) for chain in stage))
+    return report
+
+
+async def execute_plan(ctx, plan: Plan, title: str, dry_run: bool = False, resumes: str | None = None) -> Report | None:
+    """
+    Run a plan from a command, showing the progress in a single message edited along the way.
+    The plan and its completed steps are written to the journal, so that it can be resumed after a crash.
+    In dry run mode, only describe the plan.
+    Example: ::
+        await execute_plan(ctx, plan_creation(ctx.guild, catalogue.as_dict()), "Création des UEs", '--plan' in args)
+    :param ctx: the discord context of the command
+    :param plan: the plan to run
+    :param title: the title of the progress message
+    :param dry_run: if True, send the description of the plan instead of running it
+    :param resumes: the id of the interrupted operation of the journal this plan resumes
+    :return: the report of the execution, or None in dry run mode
+    """
+    if dry_run:
+        await send_with_details(ctx, *describe(ctx.guild, plan), filename='plan.txt')
+        return None
+    if len(plan) == 0:
+        await ctx.send("Rien à faire")
+        await ctx.message.add_reaction('✅')
+        return Report()
+    op = await journal.begin(ctx.guild.id, title, 'plan', {'stages': plan.to_json()}, resumes)
+    indexes = {id(step): i for i, step in enumerate(plan.steps())}
+    progress = ProgressMessage(ctx, title, len(plan))
+    await progress.start()
+    report = await run_plan(ctx.guild, plan, progress, on_done=lambda step: journal.done(op, indexes[id(step)]))
+    journal.end(op)
+    await progress.finish(report.summary())
+    await ctx.message.add_reaction('⚠' if report.failures else '✅')
+    return report
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from ressources.settings import RATE_LIMITS
+
+# (requests, seconds) allowed for each kind of call.
+# Route buckets are per guild (or per channel for messages), the global bucket is shared by the whole bot.
+# Role creation has a much stricter bucket than the other routes.
+DEFAULT_LIMITS: dict[str, tuple[int, float]] = {
+    'global': (50, 1.0),
+    'category_create': (5, 5.0),
+    'channel_create': (5, 5.0),
+    'channel_delete': (5, 5.0),
+    'channel_edit': (2, 10.0),
+    'role_create': (5, 15.0),
+    'role_delete': (5, 5.0),
+    'message_send': (5, 5.0),
+    'message_edit': (5, 5.0),
+    'member_edit': (10, 10.0),
+    'member_kick': (5, 5.0),
+    'member_role': (10, 10.0),
+    'member_fetch': (10, 1.0),
+    # private messages : opening many DMs in a short time gets a bot flagged as a spammer
+    'dm_send': (5, 10.0),
+}
+
+
+class Bucket:
+    """
+    Token bucket allowing `limit` calls every `per` seconds, with bursts up to `limit`.
+    """
+
+    def __init__(self, limit: int, per: float):
+        self.limit: int = limit
+        self.per: float = per
+        self._tokens: float = limit
+        self._updated: float = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.limit, self._tokens + (now - self._updated) * self.limit / self.per)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """
+        Wait until a call is allowed by this bucket, then consume it.
+        Waiters are served in FIFO order.
+        """
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) * self.per / self.limit)
+                self._refill()
+            self._tokens -= 1
+
+
+class RateLimiter:
+    """
+    Client-side limiter keeping the bot under the buckets of the discord API,
+    so that mass operations never trigger a storm of 429 responses.
+
+    Example: ::
+        await limiter.acquire('role_create', guild.id)
+        role = await guild.create_role(name="GE21")
+    """
+
+    def __init__(self, limits: dict[str, tuple[int, float]] | None = None):
+        self.limits: dict[str, tuple[int, float]] = {**DEFAULT_LIMITS, **(limits or {})}
+        self._buckets: dict[tuple[str, object], Bucket] = {}
+
+    def bucket(self, route: str, major=None) -> Bucket:
+        key = (route, major)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = Bucket(*self.limits[route])
+        return bucket
+
+    async def acquire(self, route: str, major=None) -> None:
+        """
+        Wait until a call to the given route is allowed.
+        :param route: the name of the route, one of the keys of `DEFAULT_LIMITS`
+        :param major: the major parameter of the route (guild or channel id)
+        """
+        await self.bucket(route, major).acquire()
+        await self.bucket('global').acquire()
+
+
+limiter = RateLimiter(RATE_LIMITS)
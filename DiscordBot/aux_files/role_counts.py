@@ -0,0 +1,117 @@
+import discord
+
+
+class RoleCounter:
+    """
+    Number of members of each role of a guild, and the reverse histogram count -> roles.
+    The counter is built with a single pass over the members of the guild,
+    then kept up to date by the member and role gateway events (see `DiscordBot.events.role_counts`),
+    so that `len(role.members)`, which scans every member of the guild, is never needed.
+
+    Example: ::
+        counter = get_counter(ctx.guild)
+        counter.count(role.id)  # number of members having the role
+        counter.roles_between(0, 3)  # ids of the roles held by 0 to 3 members
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self.guild_id: int = guild.id
+        self.default_role_id: int = guild.default_role.id
+        self.counts: dict[int, int] = {role.id: 0 for role in guild.roles}
+        for member in guild.members:
+            for role_id in self._role_ids(member):
+                self.counts[role_id] = self.counts.get(role_id, 0) + 1
+        self.histogram: dict[int, set[int]] = {}
+        for role_id, count in self.counts.items():
+            self.histogram.setdefault(count, set()).add(role_id)
+
+    def _role_ids(self, member: discord.Member) -> set[int]:
+        # member.roles contains the @everyone role, like role.members contains every member for @everyone
+        return {role.id for role in member.roles} | {self.default_role_id}
+
+    def _move(self, role_id: int, delta: int) -> None:
+        old = self.counts.get(role_id, 0)
+        new = old + delta
+        ids = self.histogram.get(old)
+        if ids is not None:
+            ids.discard(role_id)
+            if not ids:
+                del self.histogram[old]
+        self.counts[role_id] = new
+        self.histogram.setdefault(new, set()).add(role_id)
+
+    def member_added(self, member: discord.Member) -> None:
+        for role_id in self._role_ids(member):
+            self._move(role_id, 1)
+
+    def member_removed(self, member: discord.Member) -> None:
+        for role_id in self._role_ids(member):
+            self._move(role_id, -1)
+
+    def member_updated(self, before: discord.Member, after: discord.Member) -> None:
+        old_roles, new_roles = self._role_ids(before), self._role_ids(after)
+        for role_id in new_roles - old_roles:
+            self._move(role_id, 1)
+        for role_id in old_roles - new_roles:
+            self._move(role_id, -1)
+
+    def role_created(self, role: discord.Role) -> None:
+        if role.id not in self.counts:
+            self._move(role.id, 0)
+
+    def role_deleted(self, role: discord.Role) -> None:
+        count = self.counts.pop(role.id, None)
+        if count is not None:
+            ids = self.histogram[count]
+            ids.discard(role.id)
+            if not ids:
+                del self.histogram[count]
+
+    def count(self, role_id: int) -> int:
+        return self.counts.get(role_id, 0)
+
+    def roles_with(self, count: int) -> set[int]:
+        return set(self.histogram.get(count, ()))
+
+    def roles_between(self, low: int, high: int) -> set[int]:
+        """
+        Return the ids of the roles held by at least `low` and at most `high` members.
+        The cost depends on the number of distinct member counts, not on the number of members.
+        """
+        found = set()
+        for count, ids in self.histogram.items():
+            if low <= count <= high:
+                found |= ids
+        return found
+
+
+_counters: dict[int, RoleCounter] = {}
+
+
+def get_counter(guild: discord.Guild) -> RoleCounter:
+    """
+    Return the role counter of the given guild, building it on first use.
+    :param guild: the discord server to get the counter of
+    :return: the role counter of the guild
+    """
+    counter = _counters.get(guild.id)
+    if counter is None:
+        counter = _counters[guild.id] = RoleCounter(guild)
+    return counter
+
+
+def peek_counter(guild_id: int) -> RoleCounter | None:
+    """
+    Return the role counter of the guild if it has already been built, else None.
+    """
+    return _counters.get(guild_id)
+
+
+def drop_counter(guild_id: int | None = None) -> None:
+    """
+    Forget the role counter of a guild, or of every guild if no id is given.
+    """
+    if guild_id is None:
+        _counters.clear()
+    else:
+        _counters.pop(guild_id, None)
@@ -0,0 +1,212 @@
+import re
+import shlex
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from DiscordBot.aux_files.metrics import metrics
+from DiscordBot.aux_files.tasks import background_tasks
+
+# commands run in the background : they can take minutes, and report their progress by themselves
+HEAVY_COMMANDS = {'addUes', 'addAllUes', 'delUes', 'delAllUes', 'syncPerms', 'delSameRole', 'kickAll',
+                  'removeAllFromRole', 'export', 'resume', 'rollover'}
+ROLE_MENTION = re.compile(r"<@&(\d+)>")
+MEMBER_MENTION = re.compile(r"<@!?(\d+)>")
+
+
+def split_arguments(arguments: str) -> list[str]:
+    """
+    Split the arguments of a slash command like discord.py splits the ones of a prefix command :
+    on spaces, an argument in double quotes being kept whole. The apostrophes are not quotes.
+    :raise ValueError: if a double quote is not closed
+    """
+    lexer = shlex.shlex(arguments, posix=True)
+    lexer.whitespace_split = True
+    lexer.quotes = '"'
+    lexer.escape = ''
+    lexer.commenters = ''
+    return list(lexer)
+
+
+class _InteractionMessage:
+    """
+    Stand-in for the message of a prefix command, which a slash command does not have.
+    The mentions are read from the arguments (see `resolve_mentions`), and the reactions are sent as messages.
+    """
+
+    def __init__(self, ctx: 'InteractionContext', arguments: str):
+        self._ctx = ctx
+        self._arguments: str = arguments
+        self.attachments: list[discord.Attachment] = []  # the arguments of a slash command are text only
+        self.role_mentions: list[discord.Role] = [
+            role for role in map(ctx.guild.get_role, map(int, ROLE_MENTION.findall(arguments))) if role is not None
+        ]
+        self.mentions: list[discord.Member] = []
+
+    async def resolve_mentions(self) -> None:
+        """
+        Find the mentioned members in the cache, else by asking discord : discord resolves the mentions
+        of the member options only, not of a text option, and with the compact member cache no member is cached.
+        """
+        guild = self._ctx.guild
+        for member_id in map(int, MEMBER_MENTION.findall(self._arguments)):
+            member = guild.get_member(member_id)
+            if member is None:
+                try:
+                    member = await guild.fetch_member(member_id)
+                except discord.NotFound:
+                    continue
+            self.mentions.append(member)
+
+    async def add_reaction(self, emoji: str) -> None:
+        await self._ctx.send(emoji)
+
+
+class InteractionContext:
+    """
+    Adapter giving a slash command interaction the attributes of a `commands.Context`,
+    so that the callbacks of the prefix commands can run unchanged.
+    The first message answers the deferred interaction, the next ones are sent in the channel,
+    so that a command running longer than the 15 minutes of validity of the interaction can still report.
+    """
+
+    def __init__(self, interaction: discord.Interaction, command: commands.Command, arguments: str):
+        self.interaction: discord.Interaction = interaction
+        self.bot = interaction.client
+        self.command: commands.Command = command
+        self.guild: discord.Guild = interaction.guild
+        self.channel = interaction.channel
+        self.author: discord.Member = interaction.user
+        self.permissions: discord.Permissions = interaction.permissions
+        self.args: list[str] = split_arguments(arguments)
+        params = list(command.clean_params.values())
+        if not any(param.kind is param.VAR_POSITIONAL for param in params):
+            del self.args[len(params):]  # like the prefix commands, ignore the extra arguments
+        self.message = _InteractionMessage(self, arguments)
+        self.command_failed: bool = False
+        self.answered: bool = False
+
+    async def send(self, content: str | None = None, **kwargs):
+        if not self.answered:
+            self.answered = True
+            if content is not None:
+                kwargs['content'] = content
+            return await self.interaction.followup.send(wait=True, **kwargs)
+        return await self.channel.send(content, **kwargs)
+
+
+async def _can_run(ctx: InteractionContext) -> bool:
+    for check in ctx.command.checks:
+        try:
+            if not await discord.utils.maybe_coroutine(check, ctx):
+                return False
+        except commands.CheckFailure:
+            return False
+    return True
+
+
+async def _invoke(ctx: InteractionContext) -> None:
+    start = time.perf_counter()
+    try:
+        await ctx.command.callback(ctx, *ctx.args)
+    except Exception:
+        ctx.command_failed = True
+        metrics.command_errors[ctx.command.qualified_name] += 1
+        raise
+    finally:
+        metrics.observe_command(ctx.command.qualified_name, time.perf_counter() - start)
+
+
+async def run_slash_command(interaction: discord.Interaction, command: commands.Command, arguments: str) -> None:
+    """
+    Run a prefix command from its slash version.
+    The interaction is acknowledged at once. The heavy commands (see `HEAVY_COMMANDS`) are then handed
+    to the background task registry, the others are run right away.
+    :param interaction: the interaction of the slash command
+    :param command: the prefix command to run
+    :param arguments: the arguments of the command, as they would follow the name of the prefix command
+    """
+    try:
+        ctx = InteractionContext(interaction, command, arguments)
+    except ValueError:
+        await interaction.response.send_message(":warning: Guillemet non fermé dans les arguments", ephemeral=True)
+        return
+    if not await _can_run(ctx):
+        await interaction.response.send_message(":no_entry: Vous ne pouvez pas utiliser cette commande ici",
+                                                ephemeral=True)
+        return
+    await interaction.response.defer(thinking=True)
+    await ctx.message.resolve_mentions()
+    if command.name in HEAVY_COMMANDS:
+        await ctx.send(f":hourglass: `/{command.name.lower()}` lancée, suivi avec `/tasks`")
+        background_tasks.spawn(ctx, command.name, _invoke(ctx))
+        return
+    try:
+        await _invoke(ctx)
+    except Exception as error:
+        await ctx.send(f":x: La commande a échoué : {error}")
+        raise
+    if not ctx.answered:  # the command answered nothing, close the deferred response
+        await ctx.send("✅")
+
+
+def _description(command: commands.Command) -> str:
+    lines = (command.callback.__doc__ or command.name).strip().splitlines()
+    return lines[0].strip()[:100] if lines else command.name
+
+
+def _slash_version(command: commands.Command):
+    async def callback(interaction: discord.Interaction, arguments: str = '') -> None:
+        await run_slash_command(interaction, command, arguments)
+
+    callback = app_commands.describe(arguments="les arguments de la commande, comme après @" + command.name)(callback)
+    callback = app_commands.guild_only()(callback)
+    return app_commands.Command(name=command.name.lower(), description=_description(command), callback=callback)
+
+
+def _slash_help(commands_: list[commands.Command]) -> app_commands.Command:
+    """
+    The slash version of the help : the help command of discord.py needs the prefix and the message of a
+    prefix command, it cannot run from an interaction.
+    """
+    by_name = {command.name.lower(): command for command in commands_}
+
+    async def callback(interaction: discord.Interaction, commande: str = '') -> None:
+        name = commande.lower().lstrip('/@')
+        if not name:
+            lines = ["Commandes du bot :"]
+            lines += [f"`/{name}` : {_description(command)}" for name, command in sorted(by_name.items())]
+        elif name in by_name:
+            doc = (by_name[name].callback.__doc__ or name).strip()
+            lines = [f"`/{name}`", "```", *(line.strip() for line in doc.splitlines()), "```"]
+        else:
+            lines = [f"La commande {commande} n'existe pas"]
+        messages = ['']
+        for line in lines:  # a message holds at most 2000 characters
+            if len(messages[-1]) + len(line) + 1 > 1900:
+                messages.append('')
+            messages[-1] += line + '\n'
+        await interaction.response.send_message(messages[0], ephemeral=True)
+        for message in messages[1:]:
+            await interaction.followup.send(message, ephemeral=True)
+
+    callback = app_commands.describe(commande="le nom d'une commande, pour en avoir le détail")(callback)
+    return app_commands.Command(name='help', description="Liste des commandes du bot", callback=callback)
+
+
+def register_slash_commands(bot: commands.Bot) -> int:
+    """
+    Register a slash version of every prefix command of the bot, and a slash help listing them.
+    Must be called once, after all the commands are loaded. The commands must then be synchronized
+    with discord (`await bot.tree.sync()`).
+    :param bot: the discord bot
+    :return: the number of slash commands registered
+    """
+    # the help command of discord.py cannot run from an interaction : it gets a slash version of its own
+    registered = [command for command in bot.commands if command.name != 'help']
+    for command in registered:
+        bot.tree.add_command(_slash_version(command))
+    bot.tree.add_command(_slash_help(registered))
+    return len(registered) + 1
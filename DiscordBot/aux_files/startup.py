@@ -0,0 +1,43 @@
+import time
+
+PHASES = {
+    'import': "import des modules",
+    'login': "connexion à discord",
+    'ready': "gateway prête",
+    'chunk': "membres chargés",
+}
+
+
+class StartupTimer:
+    """
+    Time at which each phase of the startup of the bot ended, measured from the start of the process.
+    Only the first occurrence of a phase is kept : a reconnection is not a restart.
+
+    Example: ::
+        startup.mark('ready')
+        print(startup.report())
+    """
+
+    def __init__(self):
+        self.started: float = time.perf_counter()
+        self.marks: dict[str, float] = {}
+
+    def mark(self, phase: str) -> None:
+        if phase not in self.marks:
+            self.marks[phase] = time.perf_counter() - self.started
+
+    def report(self) -> str:
+        lines = []
+        previous = 0.0
+        for phase, label in PHASES.items():
+            if phase in self.marks:
+                elapsed = self.marks[phase]
+                lines.append(f"- {label} : {elapsed:.2f} s (+{elapsed - previous:.2f} s)")
+                previous = elapsed
+            else:
+                lines.append(f"- {label} : pas encore")
+        return "Temps de démarrage :\n" + "\n".join(lines)
+
+
+# imported first by `main.py`, before any other module of the bot, to measure the import time
+startup = StartupTimer()
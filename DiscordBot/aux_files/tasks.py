@@ -0,0 +1,66 @@
+import asyncio
+import sys
+import time
+import traceback
+from typing import Coroutine
+
+
+class BackgroundTask:
+    """
+    A long command running in the background.
+    """
+    __slots__ = ('name', 'guild_id', 'author', 'started_at', 'task')
+
+    def __init__(self, name: str, guild_id: int, author: str, task: asyncio.Task):
+        self.name: str = name
+        self.guild_id: int = guild_id
+        self.author: str = author
+        self.started_at: float = time.monotonic()
+        self.task: asyncio.Task = task
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+
+class TaskRegistry:
+    """
+    The long commands running in the background, per guild.
+    A command handed to the registry no longer holds the handler which started it :
+    it reports its progress and its result itself, in the channel of the command.
+    The tasks are forgotten as soon as they end, and their errors are reported in the channel.
+
+    Example: ::
+        background_tasks.spawn(ctx, "addAllUes", command.callback(ctx))
+    """
+
+    def __init__(self):
+        self._tasks: dict[int, list[BackgroundTask]] = {}
+
+    async def _run(self, ctx, name: str, coro: Coroutine) -> None:
+        try:
+            await coro
+        except Exception as error:
+            traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
+            await ctx.send(f":x: La commande {name} a échoué : {error}")
+
+    def spawn(self, ctx, name: str, coro: Coroutine) -> BackgroundTask:
+        """
+        Run a coroutine in the background.
+        :param ctx: the context of the command, in which its errors are reported
+        :param name: the name of the command
+        :param coro: the coroutine running the command
+        :return: the background task
+        """
+        tasks = self._tasks.setdefault(ctx.guild.id, [])
+        task = asyncio.create_task(self._run(ctx, name, coro))
+        background = BackgroundTask(name, ctx.guild.id, str(ctx.author), task)
+        tasks.append(background)
+        background.task.add_done_callback(lambda _: tasks.remove(background))
+        return background
+
+    def running(self, guild_id: int) -> list[BackgroundTask]:
+        return list(self._tasks.get(guild_id, []))
+
+
+background_tasks = TaskRegistry()
@@ -1,6 +1,14 @@
+import asyncio
+import io
+
 import discord
 
 from DiscordBot.aux_files import overwrites
+from DiscordBot.aux_files.guild_index import get_index
+from DiscordBot.aux_files.member_index import drop_member_index
+from DiscordBot.aux_files.member_store import store
+from DiscordBot.aux_files.role_counts import drop_counter
+from ressources.settings import MEMBER_CACHE
 
 TEXT = 0
 VOICE = 1
@@ -9,6 +17,58 @@ channel_ret = discord.TextChannel | discord.VoiceChannel | None
 channel_in = discord.TextChannel | discord.VoiceChannel
 
 
+_chunk_tasks: dict[int, asyncio.Task] = {}
+
+
+async def _chunk(guild: discord.Guild) -> None:
+    await guild.chunk()
+    # the members loaded by the chunk did not go through the member events
+    drop_member_index(guild.id)
+    drop_counter(guild.id)
+    await store.sync_guild(guild)
+
+
+async def ensure_chunked(guild: discord.Guild) -> None:
+    """
+    Make sure all the members of a guild are in the cache, loading them if needed.
+    Must be awaited by every feature needing the full member list when members are not loaded at startup
+    (see `MEMBER_CHUNKING` in `ressources/settings.py`).
+    Concurrent calls for the same guild share the same loading.
+    With `MEMBER_CACHE = 'compact'`, the members are never loaded : the callers must read the member snapshot
+    or `guild.fetch_members` instead.
+    Example: ::
+        await ensure_chunked(ctx.guild)
+        nb_members = len(ctx.guild.members)
+    :param guild: the discord server whose members are needed
+    :raise RuntimeError: with the compact member cache, as loading the members would fill the cache
+    """
+    if guild.chunked:
+        return
+    if MEMBER_CACHE == 'compact':
+        raise RuntimeError("les membres ne sont pas chargés avec MEMBER_CACHE = 'compact'")
+    task = _chunk_tasks.get(guild.id)
+    if task is None or task.done():
+        task = _chunk_tasks[guild.id] = asyncio.create_task(_chunk(guild))
+    await asyncio.shield(task)
+
+
+async def send_with_details(ctx, summary: str, details: str, filename: str = 'details.txt') -> None:
+    """
+    Send a summary followed by its details.
+    When the whole text does not fit in a discord message, the details are attached as a text file.
+    Example: ::
+        await send_with_details(ctx, "3 rôles dupliqués", "GE21\nNF04\nMT01", 'doublons.txt')
+    :param ctx: the discord context in which this function is called
+    :param summary: the text always sent in the message
+    :param details: the text sent in the message if possible, else as an attachment
+    :param filename: the name of the attached file
+    """
+    if len(summary) + len(details) < 1900:
+        await ctx.send(f"{summary}\n\n{details}" if details else summary)
+    else:
+        await ctx.send(summary, file=discord.File(io.BytesIO(details.encode()), filename=filename))
+
+
 async def create_channel(ctx, channel_role: discord.Role, category = None, channel_type: int = TEXT) -> channel_ret:
     """
     Given a discord context, a discord role corresponding to the ue to which we want to create a channel,
@@ -29,16 +89,18 @@ async def create_channel(ctx, channel_role: discord.Role, category = None, chann
     """
     channel = None
     channel_name: str = channel_role.name
-    if discord.utils.get(ctx.guild.channels, name=channel_name) is not None:  # channel already exists
+    if get_index(ctx.guild).channel(channel_name) is not None:  # channel already exists
         await ctx.send(f"Le salon {channel_name} existe déjà")
         return None
     if channel_type in (TEXT, BOTH):
         perms = overwrites.ue_channel_perms(ctx.guild, channel_role)
         channel = await ctx.guild.create_text_channel(channel_name, overwrites=perms, category=category)
+        get_index(ctx.guild).add_channel(channel)
         await channel.send(f'{channel_role.mention}, votre salon a été créé')
     if channel_type in (VOICE, BOTH):
         perms = overwrites.ue_voice_perms(ctx.guild, channel_role)
-        await ctx.guild.create_voice_channel(channel_name, overwrites=perms, category=category)
+        voice_channel = await ctx.guild.create_voice_channel(channel_name, overwrites=perms, category=category)
+        get_index(ctx.guild).add_channel(voice_channel)
     return channel
 
 
@@ -91,10 +153,13 @@ async def create_category(ctx, category_name: str, ues: list[str] = None,
     category = parse_category(ctx.guild, category_name)
     if category is None:
         category: discord.CategoryChannel = await ctx.guild.create_category(category_name)
+        get_index(ctx.guild).add_channel(category)
     for ue_name in ues:
         ue = parse_ue(ctx.guild, ue_name)
         if ue is None:
             ue: discord.Role = await ctx.guild.create_role(name=ue_name)
+            # index it right away, the gateway event may arrive after the next lookup
+            get_index(ctx.guild).add_role(ue)
         channel = parse_channel(ctx.guild, ue_name)
         if channel is None:  # don't create if the channel already exists
             await create_channel(ctx, ue, category, channel_type)
@@ -105,6 +170,7 @@ def parse_category(guild: discord.Guild, category: str) -> discord.CategoryChann
     """
     Given a string with the name of an ue, find the category in the server corresponding to this category, if exists.
     If no corresponding category is found, return None.
+    The lookup is case-insensitive and answered in constant time by the guild index.
     Example: ::
         @bot.command()
         async def command(ctx, channel_role):
@@ -118,7 +184,7 @@ def parse_category(guild: discord.Guild, category: str) -> discord.CategoryChann
     :return: the category corresponding to the ue category if it exists, else None
     """
     if type(category) != discord.CategoryChannel:
-        category = discord.utils.get(guild.categories, name=category)
+        category = get_index(guild).category(category)
     return category
 
 
@@ -126,6 +192,7 @@ def parse_ue(guild: discord.Guild, ue: str) -> discord.Role | None:
     """
     Given a string with the name of an ue, find the role in the server corresponding to this ue, if exists.
     If no corresponding role is found, return None.
+    The lookup is case-insensitive and answered in constant time by the guild index.
     Example: ::
         @bot.command()
         async def command(ctx, channel_role):
@@ -137,7 +204,7 @@ def parse_ue(guild: discord.Guild, ue: str) -> discord.Role | None:
     :return: the role corresponding to the ue if it exists, else None
     """
     if type(ue) == str:
-        return discord.utils.get(guild.roles, name=ue)
+        return get_index(guild).role(ue)
     return None
 
 
@@ -145,6 +212,7 @@ def parse_channel(guild: discord.Guild, channel: str) -> channel_ret:
     """
     Given a string with the name of a channel, find the corresponding channel, if exists.
     If no corresponding channel is found, return None.
+    The lookup is case-insensitive and answered in constant time by the guild index.
     Example: ::
         @bot.command()
         async def command(ctx, channel_role):
@@ -155,6 +223,6 @@ def parse_channel(guild: discord.Guild, channel: str) -> channel_ret:
     :param channel: a string with the name of the channel
     :return: the role corresponding to the ue if it exists, else None
     """
-    if type(guild) == str:
-        return discord.utils.get(guild.channels, name=channel)
+    if type(channel) == str:
+        return get_index(guild).channel(channel)
     return None
@@ -0,0 +1,35 @@
+from aiohttp import web
+
+from DiscordBot.aux_files.metrics import metrics
+from ressources.settings import WEB_HOST, WEB_PORT, WEB_SOCKET
+
+# the modules exposing an endpoint add their routes to this application when they are imported
+app = web.Application()
+_runner: web.AppRunner | None = None
+
+
+async def _get_metrics(request: web.Request) -> web.Response:
+    """
+    GET /metrics : the measures of the bot, in the Prometheus text format.
+    """
+    return web.Response(text=metrics.prometheus(), content_type='text/plain', charset='utf-8')
+
+
+app.router.add_get('/metrics', _get_metrics)
+
+
+async def start_web_server() -> None:
+    """
+    Start the local HTTP server of the bot, if it is not already running.
+    It listens on the unix socket `WEB_SOCKET` if it is set, else on `WEB_HOST:WEB_PORT`.
+    """
+    global _runner
+    if _runner is not None:
+        return
+    _runner = web.AppRunner(app)
+    await _runner.setup()
+    if WEB_SOCKET:
+        site = web.UnixSite(_runner, WEB_SOCKET)
+    else:
+        site = web.TCPSite(_runner, WEB_HOST, WEB_PORT)
+    await site.start()
@@ -1,10 +1,20 @@
 import discord
 from discord.ext import commands
 
+from DiscordBot.aux_files.metrics import rate_limit_trace
+from ressources.settings import MEMBER_CACHE, MEMBER_CHUNKING, SHARDED
+
 context = commands.Context
-client = discord.Client()
 
 intents = discord.Intents.default()
 intents.members = True
-bot = commands.Bot(command_prefix='@', intents=intents, case_insensitive=True)
+intents.message_content = True  # privileged : needed to read the prefix commands
+if MEMBER_CACHE == 'compact':
+    member_cache_flags = discord.MemberCacheFlags.none()
+else:
+    member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+bot_class = commands.AutoShardedBot if SHARDED else commands.Bot
+bot = bot_class(command_prefix='@', intents=intents, case_insensitive=True, member_cache_flags=member_cache_flags,
+                chunk_guilds_at_startup=MEMBER_CHUNKING == 'startup' and MEMBER_CACHE != 'compact',
+                http_trace=rate_limit_trace())
 
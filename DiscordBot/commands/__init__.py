@@ -1 +1 @@
-__all__ = ['channel_management', 'getters', 'role_management']
+__all__ = ['channel_management', 'diagnostics', 'export', 'firewall', 'getters', 'resume', 'resync', 'role_management']
@@ -1,11 +1,11 @@
-import json
-
 import discord
 
 from DiscordBot.aux_files import utils
+from DiscordBot.aux_files.guild_config import get_config
+from DiscordBot.aux_files.provisioning import (PLAN_FLAG, plan_channel_deletion, plan_creation, plan_deletion,
+                                               plan_permissions_sync, execute_plan)
 from DiscordBot.bot import context, bot
-from DiscordBot.aux_files.utils import create_channel, create_category, parse_category
-from ressources.paths import UES_PATH
+from DiscordBot.aux_files.utils import create_channel, parse_category
 from DiscordBot.aux_files.decorators import admin_command
 
 
@@ -55,10 +55,14 @@ async def _add_ues(ctx: context, *args) -> None:
     if len(args) != 1:
         await ctx.send(":warning:  Erreur. La syntaxe est `@addUes <branche> texte | vocal | lesDeux`.")
         return
-    with open(UES_PATH, 'r') as f:
-        ue_list = json.load(f)[args[0]]
-    await create_category(ctx, args[0], ue_list)
-    await ctx.message.add_reaction('✅')
+    catalogue = get_config(ctx.guild).catalogue
+    category = catalogue.category(args[0])
+    if category is None:
+        await ctx.send(f":warning: La branche {args[0]} n'existe pas. Les branches sont : "
+                       + ", ".join(catalogue.categories()))
+        return
+    await execute_plan(ctx, plan_creation(ctx.guild, {category: catalogue.ues(category)}),
+                       f"Création des UEs de {category}")
 
 
 @bot.command(name='addAllUes')
@@ -71,24 +75,24 @@ async def _add_all_ues(ctx: context, *args) -> None:
     Create the roles associated with the UE channels. No duplicate roles will be created.
     The syntax of the command is:
     ::
-        @addAllUes
+        @addAllUes [--plan]
+
+    With `--plan`, nothing is created : the bot answers with the list of what would be created,
+    the number of calls to the discord API and an estimation of the duration.
 
     Please be aware that this command is REALLY heavy in terms of requests to the discord server.
-    You must be sure when you use this command, because if you use it multiple times,
-    there is a chance that you reach a rate limit
-    and that Discord prevents the bot from any operation of role creation for an unknown period of time.
+    All the needed roles, channels and messages are computed first, then created concurrently
+    while staying under the rate limits of discord (see `DiscordBot.aux_files.ratelimit`).
     :param ctx: the discord context of the command
     :param args: the arguments of the command
     :return: None
     """
-    if len(args) > 0:
-        await ctx.send(":warning:  Erreur. La syntaxe est `@addAllUes`.")
+    if args not in ((), (PLAN_FLAG,)):
+        await ctx.send(":warning:  Erreur. La syntaxe est `@addAllUes [--plan]`.")
         return
-    with open(UES_PATH, 'r') as f:
-        ue_dict: dict = json.load(f)
-    for category, ue_list in ue_dict.items():
-        await create_category(ctx, category, ue_list)
-    await ctx.message.add_reaction('✅')
+    await execute_plan(ctx, plan_creation(ctx.guild, get_config(ctx.guild).catalogue.as_dict()),
+                       "Création de toutes les UEs",
+                       dry_run=bool(args))
 
 
 @bot.command(name='delUe')
@@ -108,10 +112,10 @@ async def _del_ue(ctx: context, *args) -> None:
     """
     if len(args) != 1:
         await ctx.send(":warning:  Erreur. La syntaxe est `@delUe <ue_name>`.")
+        return
     channel = utils.parse_channel(ctx.guild, args[0])
     if channel is not None:
-        await utils.delete_channel(ctx.guild, channel)
-        await ctx.message.add_reaction('✅')
+        await execute_plan(ctx, plan_channel_deletion(ctx.guild, channel), f"Suppression de l'UE {channel.name}")
     else:
         await ctx.send(f"Le salon {args[0]} n'existe pas")
 
@@ -126,42 +130,82 @@ async def _del_ues(ctx: context, *args) -> None:
 
     Syntax:
     ::
-        @delUes TC
+        @delUes TC [--plan]
+
+    With `--plan`, nothing is deleted : the bot answers with the list of what would be deleted.
     :param ctx: the discord context of the command
     :param args: the arguments of the command. For the command to be effective, there must be exactly 1 argument :
-        the name of the category
+        the name of the category, optionally followed by `--plan`
     """
-    if len(args) != 1:
-        await ctx.send(":warning: Erreur. La syntaxe est `@delUEs <category>`.")
+    if len(args) not in (1, 2) or args[1:] not in ((), (PLAN_FLAG,)):
+        await ctx.send(":warning: Erreur. La syntaxe est `@delUEs <category> [--plan]`.")
         return
     category = parse_category(ctx.guild, args[0])
     if category is None:
         await ctx.send("Cette catégorie n'existe pas.")
         return
-    for channel in category.channels:
-        await utils.delete_channel(ctx.guild, channel)
-    await category.delete(reason="Suppression par un administrateur")
-    await ctx.message.add_reaction('✅')
+    await execute_plan(ctx, plan_deletion(ctx.guild, [category]), f"Suppression des UEs de {category.name}",
+                       dry_run=len(args) == 2)
 
 
 @bot.command(name='delAllUes')
 @admin_command()
-async def _del_all_ues(ctx: context) -> None:
+async def _del_all_ues(ctx: context, *args) -> None:
     """
-    discord command to delete all UEs channels of the server.
+    discord command to delete all UEs channels of the server, i.e. the channels of the categories
+    listed in the UE catalogue.
     When all UE channel are deleted, delete the category.
     Also delete the roles associated with each UE channel
 
     Syntax:
     ::
-        @delAllUes
+        @delAllUes [--plan]
+
+    With `--plan`, nothing is deleted : the bot answers with the list of what would be deleted.
+    :param ctx: the discord context of the command
+    :param args: the arguments of the command : nothing, or `--plan`
+    """
+    if args not in ((), (PLAN_FLAG,)):
+        await ctx.send(":warning:  Erreur. La syntaxe est `@delAllUes [--plan]`.")
+        return
+    catalogue = get_config(ctx.guild).catalogue
+    categories = [cat for cat in ctx.guild.categories if catalogue.category(cat.name) is not None]
+    await execute_plan(ctx, plan_deletion(ctx.guild, categories), "Suppression de toutes les UEs",
+                       dry_run=bool(args))
+
+
+@bot.command(name='syncPerms')
+@admin_command()
+async def _sync_perms(ctx: context, *args) -> None:
+    """
+    discord command to bring back the permissions of the UE channels in line with their template,
+    without recreating them. Only the channels whose permissions have changed are edited.
+    Without category, every category of the UE catalogue is checked.
+
+    Syntax:
+    ::
+        @syncPerms [category] [--plan]
+
+    With `--plan`, nothing is edited : the bot answers with the list of the channels that would be.
     :param ctx: the discord context of the command
+    :param args: the arguments of the command : optionally the name of a category, optionally `--plan`
     """
-    ue_categories = {'TC', 'ISI', 'RT', 'GI', 'GM', 'MTE', 'A2I', 'MM', 'ME', 'EC', 'HT', 'PAIP'}
-    discord_categories = {cat.name for cat in ctx.guild.categories}
-    categories = ue_categories.intersection(discord_categories)
-    for category in categories:
-        await _del_ues(ctx, category)
+    dry_run = PLAN_FLAG in args
+    names = [arg for arg in args if arg != PLAN_FLAG]
+    if len(names) > 1:
+        await ctx.send(":warning:  Erreur. La syntaxe est `@syncPerms [catégorie] [--plan]`.")
+        return
+    if names:
+        category = parse_category(ctx.guild, names[0])
+        if category is None:
+            await ctx.send(f"La catégorie {names[0]} n'existe pas")
+            return
+        categories = [category]
+    else:
+        catalogue = get_config(ctx.guild).catalogue
+        categories = [cat for cat in ctx.guild.categories if catalogue.category(cat.name) is not None]
+    await execute_plan(ctx, plan_permissions_sync(ctx.guild, categories), "Synchronisation des permissions",
+                       dry_run=dry_run)
 
 
-bot_commands = [_add_ue, _del_ues, _add_ues, _add_all_ues, _del_all_ues, _del_ue]
+bot_commands = [_add_ue, _del_ues, _add_ues, _add_all_ues, _del_all_ues, _del_ue, _sync_perms]
@@ -0,0 +1,161 @@
+import io
+
+import discord
+
+from DiscordBot.aux_files.decorators import admin_command
+from DiscordBot.aux_files.guild_config import get_config, guild_configs
+from DiscordBot.aux_files.member_snapshot import peek_snapshot
+from DiscordBot.aux_files.metrics import memory_report, metrics
+from DiscordBot.aux_files.profiler import profiler
+from DiscordBot.aux_files.tasks import background_tasks
+from DiscordBot.bot import bot, context
+
+
+@bot.command(name='stats')
+@admin_command()
+async def _stats(ctx: context) -> None:
+    """
+    Send a Discord message with the measures of the bot since its startup :
+    the slowest commands, the most called routes of the discord API, the 429 responses,
+    the lag of the event loop and the private messages.
+    The full measures are available in the Prometheus format on the `/metrics` endpoint of the bot.
+
+    Syntax:
+    ::
+        @stats
+    :param ctx: the discord context of the command
+    """
+    lines = ["**Commandes** (temps total, nombre d'appels, moyenne, max) :"]
+    by_total = sorted(metrics.commands.items(), key=lambda item: item[1].sum, reverse=True)
+    for name, histogram in by_total[:8]:
+        errors = metrics.command_errors[name]
+        lines.append(f"- {name} : {histogram.sum:.1f} s, {histogram.count} appels, {histogram.mean:.2f} s, "
+                     f"{histogram.max:.2f} s" + (f", {errors} erreur(s)" if errors else ""))
+    lines.append("**Routes de l'API** (appels, temps moyen, 429) :")
+    by_calls = sorted(metrics.http.items(), key=lambda item: item[1].count, reverse=True)
+    for route, histogram in by_calls[:8]:
+        lines.append(f"- `{route}` : {histogram.count}, {histogram.mean:.2f} s, {metrics.rate_limited[route]}")
+    lines.append(f"**Rate limits** : {sum(metrics.rate_limited.values())} réponse(s) 429 "
+                 f"(dont {metrics.rate_limited['global']} globale(s)), {metrics.retry_after:.1f} s d'attente")
+    lag = metrics.loop_lag
+    lines.append(f"**Boucle d'événements** : retard moyen {lag.mean * 1000:.1f} ms, max {lag.max * 1000:.1f} ms, "
+                 f"{metrics.loop_stalls} blocage(s)")
+    dm = metrics.dm_results
+    lines.append(f"**Messages privés** : {dm['sent']} envoyé(s), {dm['fallback']} mention(s) dans l'accueil, "
+                 f"{dm['deduplicated']} doublon(s), {dm['dropped']} abandonné(s), {dm['failed']} échec(s), "
+                 f"{metrics.dm_queue_depth} en attente, délai moyen {metrics.dm_latency.mean:.1f} s")
+    await ctx.send("\n".join(lines))
+
+
+@bot.command(name='config')
+@admin_command()
+async def _config(ctx: context, *args) -> None:
+    """
+    Send a Discord message with the configuration of the bot on this server,
+    or read the configuration file (`ressources/guilds.json`) again.
+
+    Syntax:
+    ::
+        @config [reload]
+    :param ctx: the discord context of the command
+    :param args: nothing, or `reload`
+    """
+    if args == ('reload',):
+        try:
+            guild_configs.reload()
+        except ValueError as error:
+            await ctx.send(f":warning: Configuration invalide, l'ancienne est conservée : {error}")
+            return
+    elif args:
+        await ctx.send(":warning: Erreur. La syntaxe est `@config [reload]`")
+        return
+    config = get_config(ctx.guild)
+    origin = "configuration par défaut" if config.guild_id is None else "configuration du serveur"
+    await ctx.send(f"**{origin}** :\n"
+                   f"- salon d'administration : <#{config.admin_channel_id}>\n"
+                   f"- catalogue des UEs : `{config.catalogue.path.name}` "
+                   f"({len(config.catalogue.categories())} branches)\n"
+                   f"- URL de connexion : {config.bot_url}\n"
+                   f"- rôles : {config.student_role}, {config.alumni_role}\n"
+                   f"- salon d'accueil : {config.welcome_channel}")
+
+
+@bot.command(name='tasks')
+@admin_command()
+async def _tasks(ctx: context) -> None:
+    """
+    Send a Discord message with the commands running in the background on this server
+    (the heavy commands launched as slash commands).
+
+    Syntax:
+    ::
+        @tasks
+    :param ctx: the discord context of the command
+    """
+    running = background_tasks.running(ctx.guild.id)
+    if not running:
+        await ctx.send("Aucune commande en cours")
+        return
+    await ctx.send(f"{len(running)} commande(s) en cours :\n" + "\n".join(
+        f"- {task.name}, lancée par {task.author} il y a {task.elapsed:.0f} s" for task in running
+    ))
+
+
+@bot.command(name='memory')
+@admin_command()
+async def _memory(ctx: context) -> None:
+    """
+    Send a Discord message with the memory used by the bot : its resident memory, the number of members
+    kept in the discord.py cache and in the compact snapshots (see `MEMBER_CACHE` in `ressources/settings.py`).
+
+    Syntax:
+    ::
+        @memory
+    :param ctx: the discord context of the command
+    """
+    text = memory_report(ctx.bot)
+    snapshot = peek_snapshot(ctx.guild.id)
+    if snapshot is not None:
+        text += (f"\nInstantané de ce serveur : {len(snapshot)} membres, {snapshot.nbytes() / 1024:.0f} Ko, "
+                 f"construit il y a {snapshot.age:.0f} s")
+    await ctx.send(text)
+
+
+@bot.command(name='profile')
+@admin_command()
+async def _profile(ctx: context, *args) -> None:
+    """
+    Start or stop the sampling profiler of the event loop, to find out what the bot is doing when it is slow :
+    blocking code shows up with its own frames, waiting for discord shows up in the selector of the loop.
+    When stopped, the bot sends the most sampled functions and attaches the stacks in the collapsed format
+    of the flame graph tools (`flamegraph.pl`, speedscope...).
+
+    Syntax:
+    ::
+        @profile start
+        @profile stop
+    :param ctx: the discord context of the command
+    :param args: `start` or `stop`
+    """
+    if args not in (('start',), ('stop',)):
+        await ctx.send(":warning: Erreur. La syntaxe est `@profile start | stop`")
+        return
+    if args[0] == 'start':
+        if profiler.running:
+            await ctx.send("Le profilage est déjà en cours")
+            return
+        profiler.start()
+        await ctx.send(f":stopwatch: Profilage lancé, arrêt avec `@profile stop` "
+                       f"(ou automatiquement au bout de {profiler.max_duration:.0f} s)")
+        return
+    if profiler.started_at is None:
+        await ctx.send("Aucun profilage n'a été lancé")
+        return
+    collapsed = profiler.stop()
+    lines = [f"{profiler.samples} échantillons en {profiler.duration:.1f} s, fonctions les plus vues :"]
+    lines += [f"- `{frame}` : {100 * count / max(profiler.samples, 1):.1f} %" for frame, count in profiler.top(8)]
+    attachment = discord.File(io.BytesIO(collapsed.encode()), filename='profile.collapsed.txt')
+    await ctx.send("\n".join(lines), file=attachment)
+
+
+bot_commands = [_stats, _config, _tasks, _memory, _profile]
@@ -1,7 +1,95 @@
+import io
+
+import discord
+from discord.ext import commands
+
+from DiscordBot.aux_files.export import EXPORT_FORMATS, GzipParts, gzip_parts, member_rows
+from DiscordBot.aux_files.guild_config import get_config
+from DiscordBot.aux_files.utils import ensure_chunked, parse_ue
 from DiscordBot.bot import bot, context
+from ressources.settings import EXPORT_ROLES, MEMBER_CACHE
+
+ALL_FLAG = '--all'
+
+
+def _can_export(ctx: context, role: discord.Role | None) -> bool:
+    """
+    The admins can export anything from the admin channel.
+    The members with one of the `EXPORT_ROLES` (the professors) can export the UEs they are in.
+    """
+    if ctx.channel.id == get_config(ctx.guild).admin_channel_id:
+        return True
+    if role is None or role not in ctx.author.roles:
+        return False
+    return any(author_role.name in EXPORT_ROLES for author_role in ctx.author.roles)
 
 
 @bot.command(name='export')
-async def export(ctx: context):
-    # TODO implement authorization for professors
-    pass
+@commands.guild_only()
+async def export(ctx: context, *args) -> None:
+    """
+    Export the members of a role (or of the whole server) with their nickname, the first name, last name,
+    branch and semester read from it, and their roles, as gzip compressed CSV or JSONL.
+    The export is split into several files if it does not fit in a single attachment.
+    Professors get the files in private messages, admins get them in the admin channel.
+
+    Syntax:
+    ::
+        @export @UE [csv|jsonl]
+        @export --all [csv|jsonl]  # admins only
+    :param ctx: the discord context of the command
+    :param args: the role (mention or name) or `--all`, optionally followed by the format (csv by default)
+    """
+    if not 1 <= len(args) <= 2 or (len(args) == 2 and args[1] not in EXPORT_FORMATS):
+        await ctx.send(":warning: La syntaxe de cette commande est `@export <@UE | --all> [csv | jsonl]`")
+        return
+    export_format = args[1] if len(args) == 2 else 'csv'
+    whole_guild = args[0] == ALL_FLAG
+    role = None
+    if not whole_guild:
+        role = ctx.message.role_mentions[0] if ctx.message.role_mentions else parse_ue(ctx.guild, args[0])
+        if role is None:
+            await ctx.send(f"Le rôle {args[0]} n'existe pas")
+            return
+    if not _can_export(ctx, role):
+        await ctx.send(":no_entry: Vous n'avez pas le droit d'exporter ces membres")
+        return
+    destination = ctx if ctx.channel.id == get_config(ctx.guild).admin_channel_id else ctx.author
+
+    name = 'membres' if whole_guild else role.name
+    sent = 0
+
+    def exported(member: discord.Member) -> bool:
+        return not member.bot if whole_guild else role in member.roles
+
+    async def send(part: bytes) -> None:
+        nonlocal sent
+        sent += 1
+        filename = f"export-{name}-{sent}.{export_format}.gz"
+        await destination.send(file=discord.File(io.BytesIO(part), filename=filename))
+
+    try:
+        if MEMBER_CACHE == 'compact':
+            # the members are not in the cache : the pages of the member list are read,
+            # and each part is sent as soon as it is full
+            parts = GzipParts(export_format, ctx.guild.filesize_limit)
+            async for member in ctx.guild.fetch_members(limit=None):
+                if exported(member):
+                    for row in member_rows((member,)):
+                        part = parts.write(row)
+                        if part is not None:
+                            await send(part)
+            await send(parts.close())
+        else:
+            await ensure_chunked(ctx.guild)
+            rows = member_rows(member for member in ctx.guild.members if exported(member))
+            for part in gzip_parts(rows, export_format, ctx.guild.filesize_limit):
+                await send(part)
+    except discord.Forbidden:
+        await ctx.send(":warning: Impossible de vous envoyer l'export en message privé")
+        return
+    if destination is not ctx:
+        await ctx.message.add_reaction("✅")
+
+
+bot_commands = [export]
@@ -0,0 +1,49 @@
+from DiscordBot.aux_files.decorators import admin_command
+from DiscordBot.aux_files.firewall import ACTION_LABELS, get_monitor
+from DiscordBot.bot import bot, context
+from ressources.settings import FIREWALL_WINDOW
+
+# french names of the actions accepted by the command
+ACTION_NAMES = {'expulsion': 'kick', 'quarantaine': 'quarantine', 'signalement': 'report'}
+
+
+@bot.command(name='lockdown')
+@admin_command()
+async def _lockdown(ctx: context, *args) -> None:
+    """
+    Show the join rate of the server and the state of the firewall, or lock / unlock the server by hand.
+    While the server is locked, the members who join are kicked or quarantined (see `FIREWALL_ACTION`).
+    The server is locked automatically when too many members (or too many new accounts) join in a short time.
+
+    Syntax:
+    ::
+        @lockdown
+        @lockdown on [expulsion | quarantaine | signalement]
+        @lockdown off
+    :param ctx: the discord context of the command
+    :param args: nothing, `on` optionally followed by the action, or `off`
+    """
+    monitor = get_monitor(ctx.guild)
+    if not args:
+        if monitor.locked:
+            state = (f":rotating_light: verrouillé ({ACTION_LABELS[monitor.action]}), "
+                     f"{monitor.handled} membre(s) traité(s)")
+        else:
+            state = ":unlock: non verrouillé"
+        rates = "\n".join(f"- {name} : {count} / {limit}" for name, (count, limit) in monitor.rates().items())
+        await ctx.send(f"Serveur {state}\nSur les {FIREWALL_WINDOW} dernières secondes :\n{rates}")
+        return
+    if args[0] == 'on' and len(args) <= 2 and (len(args) == 1 or args[1] in ACTION_NAMES):
+        action = ACTION_NAMES[args[1]] if len(args) == 2 else None
+        await monitor.lockdown(ctx.channel, f"demandé par {ctx.author}", action)
+    elif args == ('off',):
+        if not monitor.locked:
+            await ctx.send("Le serveur n'est pas verrouillé")
+            return
+        await monitor.release(f"demandée par {ctx.author}")
+    else:
+        await ctx.send(":warning: Erreur. La syntaxe est "
+                       "`@lockdown [on [expulsion | quarantaine | signalement] | off]`")
+
+
+bot_commands = [_lockdown]
@@ -1,8 +1,64 @@
 import discord
 from DiscordBot.bot import bot, context
 from DiscordBot.aux_files.decorators import admin_command
+from DiscordBot.aux_files.guild_config import get_config
+from DiscordBot.aux_files.guild_index import get_index
+from DiscordBot.aux_files.member_index import get_member_index
+from DiscordBot.aux_files.member_snapshot import get_snapshot
+from DiscordBot.aux_files.member_store import store
+from DiscordBot.aux_files.paginator import Paginator
+from DiscordBot.aux_files.role_counts import get_counter
+from DiscordBot.aux_files.startup import startup
+from DiscordBot.aux_files.utils import ensure_chunked
+from ressources.settings import MEMBER_CACHE
+
+
+def _sorted_roles(guild: discord.Guild, role_ids) -> list[discord.Role]:
+    """
+    Return the given roles, in the order of the role list of the server.
+    """
+    return sorted(role for role in map(guild.get_role, role_ids) if role is not None)
+
+
+def _role_line(role: discord.Role) -> str:
+    return f"- {role.name}"
+
+
+async def _use_store(guild: discord.Guild) -> bool:
+    """
+    Return True if the getters must answer from the SQLite mirror :
+    the members are not loaded yet, but the mirror knows the server from a previous run.
+    The mirror is not kept up to date with the compact member cache.
+    """
+    return MEMBER_CACHE != 'compact' and not guild.chunked and await store.has_guild(guild.id)
 
-from ressources.env import INVITATION_LINK, BOT_URL
+
+def _use_snapshot(guild: discord.Guild) -> bool:
+    """
+    Return True if the getters must answer from the compact member snapshot instead of loading the members
+    in the discord.py cache (see `MEMBER_CACHE` in `ressources/settings.py`).
+    """
+    return MEMBER_CACHE == 'compact' and not guild.chunked
+
+
+async def _role_count(guild: discord.Guild, role_id: int) -> int:
+    if _use_snapshot(guild):
+        return (await get_snapshot(guild)).role_counts(guild.default_role.id)[role_id]
+    if await _use_store(guild):
+        return await store.role_count(guild.id, role_id)
+    await ensure_chunked(guild)
+    return get_counter(guild).count(role_id)
+
+
+async def _roles_between(guild: discord.Guild, low: int, high: int) -> set[int]:
+    if _use_snapshot(guild):
+        counts = (await get_snapshot(guild)).role_counts(guild.default_role.id)
+        return {role.id for role in guild.roles if low <= counts[role.id] <= high}
+    if await _use_store(guild):
+        counts = await store.role_counts(guild.id)
+        return {role_id for role_id, count in counts.items() if low <= count <= high}
+    await ensure_chunked(guild)
+    return get_counter(guild).roles_between(low, high)
 
 
 @bot.command(name='getNb')
@@ -20,15 +76,17 @@ async def _get_nb(ctx: context, *args) -> None:
     """
     if len(args) != 1:
         await ctx.send(":warning: Erreur. La syntaxe est `@getNb <@Role | role_id>`")
+        return
     role = None
     if args[0].isdigit():
-        role = discord.utils.get(ctx.guild.roles, id=role)
+        role = ctx.guild.get_role(int(args[0]))
     elif ctx.message.role_mentions:
         role = ctx.message.role_mentions[0]
     if role is None:
         await ctx.send(f"Le rôle {args[0]} n'existe pas")
         return
-    await ctx.send(f":white_check_mark: Il y a {len(role.members)} utilisateur(s) dans le rôle {role.name}")
+    nb_members = await _role_count(ctx.guild, role.id)
+    await ctx.send(f":white_check_mark: Il y a {nb_members} utilisateur(s) dans le rôle {role.name}")
 
 
 @bot.command(name='getRoles')
@@ -36,25 +94,31 @@ async def _get_nb(ctx: context, *args) -> None:
 async def _get_roles(ctx: context, *args) -> None:
     """
     Given an integer number, send a discord message with all the roles that are held by this number of members.
+    Given two integer numbers, send a discord message with all the roles held by a number of members
+    between those two numbers (included).
 
     Syntax:
     ::
         @getRoles <integer number>
+        @getRoles <minimum> <maximum>
     :param ctx: the discord context of the command
-    :param args: the arguments. For the command to be effective, there must be exactly one argument : an integer
+    :param args: the arguments. For the command to be effective, there must be one or two arguments : integers
     """
-    if len(args) != 1:
-        await ctx.send(":warning:  Erreur. La syntaxe est `@getRoles NombreDePersonnes`")
+    if len(args) not in (1, 2):
+        await ctx.send(":warning:  Erreur. La syntaxe est `@getRoles NombreDePersonnes` "
+                       "ou `@getRoles Minimum Maximum`")
         return
-    if not args[0].isdigit():
-        await ctx.send(":warning: Erreur. L'argument de la fonction `getRoles` doit être un nombre entier")
+    if not all(arg.isdigit() for arg in args):
+        await ctx.send(":warning: Erreur. Les arguments de la fonction `getRoles` doivent être des nombres entiers")
         return
-    nb_people = int(args[0])
-    roles = [role.name for role in ctx.guild.roles if len(role.members) == nb_people]
+    low, high = int(args[0]), int(args[-1])
+    roles = _sorted_roles(ctx.guild, await _roles_between(ctx.guild, low, high))
     if len(roles) == 0:
         await ctx.send("Aucun rôle trouvé")
+    elif low == high:
+        await Paginator(ctx, f"{len(roles)} rôles ont {low} membres :", roles, _role_line).send()
     else:
-        await ctx.send(f"{len(roles)} rôles ont {nb_people} membres :\n- " + "\n- ".join(roles))
+        await Paginator(ctx, f"{len(roles)} rôles ont entre {low} et {high} membres :", roles, _role_line).send()
 
 
 @bot.command(name='getZeroOne')
@@ -68,11 +132,11 @@ async def _get_zero_one(ctx: context) -> None:
         @getZeroOne
     :param ctx: the discord context of the command
     """
-    roles = [role.name for role in ctx.guild.roles if len(role.members) < 2]
+    roles = _sorted_roles(ctx.guild, await _roles_between(ctx.guild, 0, 1))
     if len(roles) == 0:
         await ctx.send("Aucun rôle trouvé")
     else:
-        await ctx.send(f"{len(roles)} rôles ont moins de deux membres :\n- " + "\n- ".join(roles))
+        await Paginator(ctx, f"{len(roles)} rôles ont moins de deux membres :", roles, _role_line).send()
 
 
 @bot.command(name='getUrl')
@@ -83,27 +147,90 @@ async def _get_url(ctx: context) -> None:
 
     :param ctx: the discord context of the command
     """
-    await ctx.send(f"URL de connexion (à transmettre) : {BOT_URL}\n\n"
-                   f"Le lien d'invitation direct (peu recommandé) : {INVITATION_LINK}")
+    config = get_config(ctx.guild)
+    await ctx.send(f"URL de connexion (à transmettre) : {config.bot_url}\n\n"
+                   f"Le lien d'invitation direct (peu recommandé) : {config.invitation_link}")
 
 
-@bot.command(name='getMemeberRoles')
+@bot.command(name='getMemeberRoles', aliases=['getMemberRoles'])
 @admin_command()
 async def _get_member_roles(ctx: context, *args) -> None:
     """
     Displays the list of roles of a member, even if the member is not logged in
     (useful for servers > 1000 members)
-    
+    The member can be given by a mention or by its id.
+
     :param ctx: the discord context of the command
     :param args: the arguments. For the command to be effective, there must be exactly one argument :
-        the mention of the member we want to get the roles of
+        the mention or the id of the member we want to get the roles of
     """
-    if len(args) != 1 or not ctx.message.mentions:
-        await ctx.send(":warning: La syntaxe de cette commande est `@getMemberRoles @membre`")
+    if len(args) != 1 or not (ctx.message.mentions or args[0].isdigit()):
+        await ctx.send(":warning: La syntaxe de cette commande est `@getMemberRoles <@membre | id>`")
+        return
+    if ctx.message.mentions:
+        user: discord.Member = ctx.message.mentions[0]
+    elif _use_snapshot(ctx.guild):
+        snapshot = await get_snapshot(ctx.guild)
+        role_ids = snapshot.member_roles(int(args[0]))
+        if role_ids is None:
+            await ctx.send(f"Le membre {args[0]} n'existe pas")
+            return
+        roles = [role.name for role in reversed(_sorted_roles(ctx.guild, role_ids))]
+        await ctx.send(f"{snapshot.name(int(args[0]))} a {len(roles)} rôles : " + ', '.join(roles))
         return
-    user: discord.Member = ctx.message.mentions[0]
-    await ctx.send(f"{user.name} a {len(user.roles)} rôles : " + ', '.join(user.roles))
+    elif await _use_store(ctx.guild):
+        role_ids = await store.member_roles(ctx.guild.id, int(args[0]))
+        if role_ids is None:
+            await ctx.send(f"Le membre {args[0]} n'existe pas")
+            return
+        roles = [role.name for role in reversed(_sorted_roles(ctx.guild, role_ids))]
+        await ctx.send(f"{args[0]} a {len(roles)} rôles : " + ', '.join(roles))
+        return
+    else:
+        user = ctx.guild.get_member(int(args[0])) or await get_member_index(ctx.guild).resolve(ctx.guild, int(args[0]))
+        if user is None:
+            await ctx.send(f"Le membre {args[0]} n'existe pas")
+            return
+    roles = [role.name for role in reversed(user.roles) if not role.is_default()]
+    await ctx.send(f"{user.name} a {len(roles)} rôles : " + ', '.join(roles))
+
+
+@bot.command(name='getIndex')
+@admin_command()
+async def _get_index(ctx: context) -> None:
+    """
+    Send a Discord message with the size of the name index and of the member index of the server,
+    the number of lookups they answered or missed, and the number of members that had to be asked to discord.
+
+    Syntax:
+    ::
+        @getIndex
+    :param ctx: the discord context of the command
+    """
+    index = get_index(ctx.guild)
+    members = get_member_index(ctx.guild)
+    lookups = index.hits + index.misses
+    hit_rate = 100 * index.hits / lookups if lookups else 0
+    await ctx.send(f"Index : {len(index.roles)} rôles, {len(index.channels)} salons "
+                   f"dont {len(index.categories)} catégories.\n"
+                   f"{lookups} recherches : {index.hits} trouvées, {index.misses} manquées ({hit_rate:.1f} %)\n"
+                   f"Index des membres : {len(members)} membres, {members.hits} trouvés, {members.misses} absents "
+                   f"du cache, dont {members.fallbacks_found}/{members.fallbacks} retrouvés en interrogeant discord")
+
+
+@bot.command(name='getStartup')
+@admin_command()
+async def _get_startup(ctx: context) -> None:
+    """
+    Send a Discord message with the duration of each phase of the last startup of the bot.
+
+    Syntax:
+    ::
+        @getStartup
+    :param ctx: the discord context of the command
+    """
+    await ctx.send(startup.report())
 
 
-bot_commands = [_get_nb, _get_zero_one, _get_roles, _get_url, _get_member_roles]
+bot_commands = [_get_nb, _get_zero_one, _get_roles, _get_url, _get_member_roles, _get_index, _get_startup]
 
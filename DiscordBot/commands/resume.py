@@ -0,0 +1,74 @@
+from DiscordBot.aux_files.bulk import BULK_ACTIONS, BulkOperation
+from DiscordBot.aux_files.decorators import admin_command
+from DiscordBot.aux_files.journal import journal
+from DiscordBot.aux_files.provisioning import PLAN_FLAG, Plan, execute_plan, step_needed
+from DiscordBot.bot import bot, context
+
+
+def _remaining_plan(guild, entry) -> Plan:
+    plan = Plan.from_json(entry.payload['stages'], entry.done)
+    for stage in plan.stages:
+        stage[:] = [chain for chain in ([step for step in chain if step_needed(guild, step)] for chain in stage)
+                    if chain]
+    return plan
+
+
+def _remaining_members(guild, entry) -> list[int]:
+    _, _, pending = BULK_ACTIONS[entry.payload['action']](guild, **entry.payload['params'])
+    remaining = []
+    for member_id in entry.payload['member_ids']:
+        member = guild.get_member(member_id)
+        # a member absent from the cache (compact member cache) is fetched by the bulk operation
+        if member_id not in entry.done and (member is None or pending(member)):
+            remaining.append(member_id)
+    return remaining
+
+
+@bot.command(name='resume')
+@admin_command()
+async def _resume(ctx: context, *args) -> None:
+    """
+    Resume the operations of the server interrupted by a restart of the bot (creation or deletion of UEs,
+    synchronization of the permissions, kickAll, removeAllFromRole, rollover), where they stopped.
+    The steps whose effect is already there are skipped, so that nothing is done twice.
+
+    Syntax:
+    ::
+        @resume [--plan]
+
+    With `--plan`, nothing is done : the bot answers with what remains of each operation.
+    :param ctx: the discord context of the command
+    :param args: nothing, or `--plan`
+    """
+    if args not in ((), (PLAN_FLAG,)):
+        await ctx.send(":warning: Erreur. La syntaxe est `@resume [--plan]`.")
+        return
+    entries = await journal.unfinished(ctx.guild.id)
+    if not entries:
+        await ctx.send("Aucune opération interrompue")
+        return
+    dry_run = bool(args)
+    for entry in entries:
+        title = f"Reprise : {entry.title}"
+        if entry.kind == 'plan':
+            plan = _remaining_plan(ctx.guild, entry)
+            if len(plan) == 0 and not dry_run:
+                journal.end(entry.op)
+            await execute_plan(ctx, plan, title, dry_run, resumes=entry.op)
+        else:
+            try:
+                member_ids = _remaining_members(ctx.guild, entry)
+            except ValueError as error:  # e.g. the role to remove was deleted : it can never be resumed
+                if not dry_run:
+                    journal.end(entry.op)
+                await ctx.send(f":warning: {title} abandonnée : {error}")
+                continue
+            if dry_run:
+                await ctx.send(f"{title} : {len(member_ids)} membre(s) restant(s)")
+                continue
+            operation = BulkOperation.from_action(ctx, title, member_ids, entry.payload['action'],
+                                                  resumes=entry.op, **entry.payload['params'])
+            await operation.run()
+
+
+bot_commands = [_resume]
@@ -0,0 +1,69 @@
+import csv
+import gzip
+import io
+
+from DiscordBot.aux_files.decorators import admin_command
+from DiscordBot.aux_files.member_index import MemberIndex
+from DiscordBot.aux_files.provisioning import PLAN_FLAG
+from DiscordBot.aux_files.utils import ensure_chunked, send_with_details
+from DiscordBot.bot import bot, context
+from assign_from_web import Resync, read_export
+from ressources.settings import MEMBER_CACHE
+
+
+def _export_lines(filename: str, data: bytes) -> io.TextIOWrapper:
+    # the exports of @export are gzip compressed : they are decompressed line by line
+    raw = gzip.GzipFile(fileobj=io.BytesIO(data)) if filename.endswith('.gz') else io.BytesIO(data)
+    return io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+
+
+@bot.command(name='resync')
+@admin_command()
+async def _resync(ctx: context, *args) -> None:
+    """
+    Synchronize the nicknames and roles of all the members with an export of the accounts of the etu site,
+    attached to the command as JSON lines or CSV (optionally gzip compressed).
+    Only the members whose nickname or roles differ are edited, with a single request each.
+    See `assign_from_web.Resync`.
+
+    Syntax:
+    ::
+        @resync [--plan]  # with the export attached, e.g. comptes.jsonl or comptes.csv.gz
+
+    With `--plan`, nothing is edited : the bot answers with the number of members to edit.
+    :param ctx: the discord context of the command
+    :param args: nothing, or `--plan`
+    """
+    attachments = ctx.message.attachments
+    if args not in ((), (PLAN_FLAG,)) or len(attachments) != 1:
+        await ctx.send(":warning: Erreur. La syntaxe est `@resync [--plan]`, "
+                       "avec l'export du site etu en pièce jointe")
+        return
+    filename = attachments[0].filename.lower()
+    export_format = 'csv' if filename.removesuffix('.gz').endswith('.csv') else 'jsonl'
+    lines = _export_lines(filename, await attachments[0].read())
+    if MEMBER_CACHE == 'compact':
+        # the members are not in the cache : they are read from the pages of the member list,
+        # and only kept by this index until the end of the command
+        index = MemberIndex(ctx.guild, [member async for member in ctx.guild.fetch_members(limit=None)])
+    else:
+        await ensure_chunked(ctx.guild)
+        index = None
+    resync = Resync(ctx.guild)
+    try:
+        resync.diff(read_export(lines, export_format, ctx.guild.id), index)
+    except (ValueError, csv.Error, OSError, EOFError) as error:  # OSError, EOFError : invalid or truncated gzip file
+        await ctx.send(f":warning: Export invalide : {error}")
+        return
+    if args:
+        await send_with_details(ctx, resync.summary(), "\n".join(resync.missing), 'absents.txt')
+        return
+    operation = await resync.apply(ctx)
+    missing = len(resync.missing) + operation.missing
+    await send_with_details(ctx, f"Synchronisation terminée : {resync.unchanged} membre(s) inchangé(s), "
+                                 f"{operation.succeeded} modifié(s), {missing} absent(s), "
+                                 f"{len(operation.failures)} échec(s)",
+                            "\n".join(resync.missing), 'absents.txt')
+
+
+bot_commands = [_resync]
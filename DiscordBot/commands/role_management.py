@@ -1,36 +1,129 @@
 import discord
 
+from DiscordBot.aux_files.bulk import BulkOperation, running_operations
 from DiscordBot.aux_files.decorators import admin_command
+from DiscordBot.aux_files.guild_config import get_config
+from DiscordBot.aux_files.guild_index import get_index, normalize
+from DiscordBot.aux_files.member_snapshot import get_snapshot
+from DiscordBot.aux_files.paginator import Paginator
+from DiscordBot.aux_files.provisioning import PLAN_FLAG, Plan, Step, execute_plan
+from DiscordBot.aux_files.role_counts import get_counter
+from DiscordBot.aux_files.utils import ensure_chunked
 from DiscordBot.bot import bot, context
 from discord.ext import commands
+from ressources.settings import MEMBER_CACHE
+
+
+DUPLICATE_OPTIONS = ('couleur', 'permissions')
+
+
+def _use_snapshot(guild: discord.Guild) -> bool:
+    # see `MEMBER_CACHE` in `ressources/settings.py`
+    return MEMBER_CACHE == 'compact' and not guild.chunked
+
+
+async def _role_counts(guild: discord.Guild) -> dict[int, int]:
+    """
+    Return the number of members of each role, without loading the members in the compact cache mode.
+    """
+    if _use_snapshot(guild):
+        return (await get_snapshot(guild)).role_counts(guild.default_role.id)
+    await ensure_chunked(guild)
+    return get_counter(guild).counts
+
+
+def _duplicate_groups(guild: discord.Guild, counts: dict[int, int], by_colour: bool = False,
+                      by_permissions: bool = False) -> list[list[discord.Role]]:
+    """
+    Group the roles of a server by name (case-insensitive), and optionally by colour and permissions,
+    in a single pass over the roles.
+    In each group of duplicates, the first role is the one to keep : the one used in channel overwrites,
+    else the one with the most members.
+    The @everyone role and the roles managed by an integration are never considered.
+    :param guild: the discord server to search the duplicates in
+    :param counts: the number of members of each role
+    :param by_colour: if True, roles of different colours are not duplicates
+    :param by_permissions: if True, roles with different permissions are not duplicates
+    :return: the groups of duplicated roles, the role to keep first
+    """
+    groups: dict[tuple, list[discord.Role]] = {}
+    for role in guild.roles:
+        if role.is_default() or role.managed:
+            continue
+        key = (normalize(role.name),
+               role.colour.value if by_colour else None,
+               role.permissions.value if by_permissions else None)
+        groups.setdefault(key, []).append(role)
+    duplicates = [roles for roles in groups.values() if len(roles) > 1]
+    if duplicates:
+        overwritten = {target.id for channel in guild.channels for target in channel.overwrites}
+        for roles in duplicates:
+            roles.sort(key=lambda r: (r.id in overwritten, counts.get(r.id, 0)), reverse=True)
+    return duplicates
+
+
+def _parse_duplicate_options(args) -> tuple[bool, bool] | None:
+    """
+    Return the (by_colour, by_permissions) options of the duplicate commands, or None if an argument is invalid.
+    """
+    options = [arg.lower() for arg in args if arg != PLAN_FLAG]
+    if any(option not in DUPLICATE_OPTIONS for option in options):
+        return None
+    return 'couleur' in options, 'permissions' in options
 
 
 @bot.command(name='delSameRole', aliases=['delDuplicateRole'])
 @admin_command()
-async def _del_same_role(ctx: context) -> None:
+async def _del_same_role(ctx: context, *args) -> None:
     """
     Delete all duplicates to only keep a set of unique roles.
+    Two roles are duplicates if they have the same name (case-insensitive),
+    and optionally the same colour and/or the same permissions.
+    For each group of duplicates, the role used in channel overwrites is kept, else the one with the most members.
+    The deletions are run concurrently, under the rate limits of discord.
+
+    Example:
+    ::
+        @delSameRole [couleur] [permissions] [--plan]
     """
-    # pretty inefficient algorithm. I would be grateful if someone improves it
-    role_set = set(ctx.guild.roles)
-    for role in role_set:
-        same_roles = [r for r in ctx.guild.roles if r == role]
-        if len(same_roles) > 1:
-            for r in same_roles[1:]:
-                await r.delete(reason="Role dupliqué")
-    await ctx.message.add_reaction('✅')
+    options = _parse_duplicate_options(args)
+    if options is None:
+        await ctx.send(":warning: Erreur. La syntaxe est `@delSameRole [couleur] [permissions] [--plan]`")
+        return
+    counts = await _role_counts(ctx.guild)
+    plan = Plan()
+    deletions = plan.add_stage()
+    for roles in _duplicate_groups(ctx.guild, counts, *options):
+        for role in roles[1:]:
+            deletions.append([Step('delete_role', id=role.id, name=role.name, reason="Role dupliqué")])
+    await execute_plan(ctx, plan, "Suppression des rôles dupliqués", dry_run=PLAN_FLAG in args)
 
 
 @bot.command(name='checkSameRole', aliases=['checkDuplicateRole'])
 @admin_command()
-async def _check_same_role(ctx: context) -> None:
+async def _check_same_role(ctx: context, *args) -> None:
     """
-    Send a message with a list of all roles that have duplicates
+    Send a message with a list of all roles that have duplicates, and the role that `@delSameRole` would keep.
+
+    Example:
+    ::
+        @checkSameRole [couleur] [permissions]
     """
-    duplicates = [
-        role for role in set(ctx.guild.roles) if ctx.guild.roles.count(role) > 1
-    ]
-    await ctx.send("Les rôles suivants sont dupliqués :\n- " + '\n- '.join(duplicates))
+    options = _parse_duplicate_options(args)
+    if options is None or PLAN_FLAG in args:
+        await ctx.send(":warning: Erreur. La syntaxe est `@checkSameRole [couleur] [permissions]`")
+        return
+    counts = await _role_counts(ctx.guild)
+    groups = _duplicate_groups(ctx.guild, counts, *options)
+    if not groups:
+        await ctx.send("Aucun rôle dupliqué")
+        return
+
+    def render_group(roles: list[discord.Role]) -> str:
+        return (f"- {roles[0].name} ×{len(roles)} : conservé {roles[0].id} ({counts.get(roles[0].id, 0)} membres), "
+                f"supprimés " + ", ".join(f"{r.id} ({counts.get(r.id, 0)} membres)" for r in roles[1:]))
+
+    await Paginator(ctx, f"{len(groups)} rôles sont dupliqués :", groups, render_group, per_page=8).send()
 
 
 @bot.command(name='giveRole')
@@ -80,14 +173,26 @@ async def _remove_role(ctx: context, *args) -> None:
 @commands.has_permissions(administrator=True)
 async def _kick_all(ctx: context) -> None:
     """
-    Kick all non bot and non admins members from the server
+    Kick all non bot and non admins members from the server.
+    The members are kicked concurrently, under the rate limits of discord.
+    The operation can be stopped with `@cancel`.
     """
-    expulsed = 0
-    for member in ctx.guild.members:
-        if not member.guild_permissions.administrator and not member.bot:
-            await member.kick(reason="Commande kickAll")
-            expulsed += 1
-    await ctx.send(f"Fin de l'opération. {expulsed} personnes ont été éjectées du serveur")
+    guild = ctx.guild
+    if _use_snapshot(guild):
+        snapshot = await get_snapshot(guild)
+        admin_roles = {role.id for role in guild.roles if role.permissions.administrator}
+        member_ids = [
+            member_id for member_id in snapshot.humans()
+            if member_id != guild.owner_id and admin_roles.isdisjoint(snapshot.member_roles(member_id))
+        ]
+    else:
+        await ensure_chunked(guild)
+        member_ids = [
+            member.id for member in guild.members if not member.guild_permissions.administrator and not member.bot
+        ]
+    operation = BulkOperation.from_action(ctx, "Expulsion des membres", member_ids, 'kick', reason="Commande kickAll")
+    await operation.run()  # sends the summary
+    await ctx.message.add_reaction('⚠' if operation.failures or operation.cancelled else '✅')
 
 
 @bot.command(name='removeAllFromRole')
@@ -95,18 +200,97 @@ async def _kick_all(ctx: context) -> None:
 async def _remove_all_from_role(ctx: context, *args):
     """
     Removes all people from a role. Ensures that no one else has the role. The role still exists afterwards.
+    The role is removed concurrently from the members, under the rate limits of discord.
+    The operation can be stopped with `@cancel`.
 
     Example:
     ::
         removeAllFromRole @NF04
     """
-    if len(args) != 1 and not ctx.message.role_mentions:
+    if len(args) != 1 or not ctx.message.role_mentions:
         await ctx.send(":warning: Erreur. La syntaxe est `@removeAllFromRole @role`. Le rôle doit exister !")
         return
-    role: discord.Role = args[0]
-    for member in role.members:
-        member.remove_roles(role)
-    await ctx.message.add_reaction('✅')
+    role: discord.Role = ctx.message.role_mentions[0]
+    if _use_snapshot(ctx.guild):
+        member_ids = (await get_snapshot(ctx.guild)).members_with(role.id)
+    else:
+        await ensure_chunked(ctx.guild)
+        member_ids = [member.id for member in role.members]
+    operation = BulkOperation.from_action(ctx, f"Retrait du rôle {role.name}", member_ids, 'remove_role',
+                                          role=role.id, reason="Commande removeAllFromRole")
+    await operation.run()
+    await ctx.message.add_reaction('⚠' if operation.failures or operation.cancelled else '✅')
+
+
+@bot.command(name='rollover')
+@admin_command()
+async def _rollover(ctx: context, *args) -> None:
+    """
+    End of semester : remove all the UE roles (the UEs of the catalogue of the server) from the students.
+    The other roles, like the student role, the branch and the alumni role, are kept.
+    Each student is edited with a single request, whatever the number of UE roles removed,
+    concurrently and under the rate limits of discord. The operation can be stopped with `@cancel`,
+    and resumed with `@resume` after a restart.
+
+    Example:
+    ::
+        @rollover [--plan]
+
+    With `--plan`, nothing is removed : the bot answers with the number of students and roles concerned.
+    """
+    if args not in ((), (PLAN_FLAG,)):
+        await ctx.send(":warning: Erreur. La syntaxe est `@rollover [--plan]`")
+        return
+    guild = ctx.guild
+    config = get_config(guild)
+    student_role = get_index(guild).role(config.student_role)
+    if student_role is None:
+        await ctx.send(f"Le rôle {config.student_role} n'existe pas")
+        return
+    kept = {normalize(name) for name in [config.student_role, config.alumni_role, *config.catalogue.categories()]}
+    ue_roles = {
+        role.id for role in map(get_index(guild).role, config.catalogue.all_ues())
+        if role is not None and normalize(role.name) not in kept
+    }
+    if _use_snapshot(guild):
+        snapshot = await get_snapshot(guild)
+        students = {
+            member_id: snapshot.member_roles(member_id) for member_id in snapshot.members_with(student_role.id)
+        }
+    else:
+        await ensure_chunked(guild)
+        students = {member.id: [role.id for role in member.roles] for member in student_role.members}
+    removed = {member_id: len(ue_roles.intersection(roles)) for member_id, roles in students.items()}
+    member_ids = [member_id for member_id, count in removed.items() if count]
+    if args:
+        await ctx.send(f"{len(member_ids)} étudiant(s) sur {len(students)} perdraient {sum(removed.values())} "
+                       f"rôle(s) d'UE parmi {len(ue_roles)}, en {len(member_ids)} requête(s)")
+        return
+    operation = BulkOperation.from_action(ctx, "Fin de semestre : retrait des UEs", member_ids, 'strip_roles',
+                                          roles=sorted(ue_roles), reason="Commande rollover")
+    await operation.run()
+    await ctx.message.add_reaction('⚠' if operation.failures or operation.cancelled else '✅')
+
+
+@bot.command(name='cancel')
+@admin_command()
+async def _cancel(ctx: context) -> None:
+    """
+    Stop all the bulk member operations (`@kickAll`, `@removeAllFromRole`...) running on the server.
+    The members already handled stay handled.
+
+    Example:
+    ::
+        @cancel
+    """
+    operations = running_operations(ctx.guild.id)
+    if not operations:
+        await ctx.send("Aucune opération en cours")
+        return
+    for operation in operations:
+        operation.cancel()
+    await ctx.send(f"{len(operations)} opération(s) annulée(s) : " + ", ".join(op.title for op in operations))
 
 
-bot_commands = [_check_same_role, _del_same_role, _give_role, _remove_role, _remove_all_from_role, _kick_all]
+bot_commands = [_check_same_role, _del_same_role, _give_role, _remove_role, _remove_all_from_role, _kick_all,
+                _rollover, _cancel]
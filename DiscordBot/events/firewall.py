@@ -0,0 +1,16 @@
+from DiscordBot.aux_files.firewall import get_monitor
+from DiscordBot.aux_files.guild_config import get_config
+from DiscordBot.bot import bot
+
+
+@bot.listen()
+async def on_member_join(member):
+    admin_channel = member.guild.get_channel(get_config(member.guild).admin_channel_id)
+    if admin_channel is None:
+        return  # no admin channel to report to : the firewall is disabled on this server
+    monitor = get_monitor(member.guild)
+    reason = monitor.record(member)
+    if reason is not None:
+        await monitor.lockdown(admin_channel, reason)
+    else:
+        monitor.handle(member)
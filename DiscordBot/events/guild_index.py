@@ -0,0 +1,60 @@
+from DiscordBot.aux_files.guild_index import peek_index, drop_index
+from DiscordBot.aux_files.overwrites import drop_templates
+from DiscordBot.bot import bot
+
+
+@bot.listen()
+async def on_ready():
+    # after a reconnection, discord.py rebuilds its cache with new objects
+    drop_index()
+    drop_templates()
+
+
+@bot.listen()
+async def on_guild_remove(guild):
+    drop_index(guild.id)
+
+
+@bot.listen()
+async def on_guild_role_create(role):
+    index = peek_index(role.guild.id)
+    if index is not None:
+        index.add_role(role)
+
+
+@bot.listen()
+async def on_guild_role_update(before, after):
+    index = peek_index(after.guild.id)
+    if index is not None:
+        index.remove_role(after, before.name)
+        index.add_role(after)
+
+
+@bot.listen()
+async def on_guild_role_delete(role):
+    drop_templates(role.id)
+    index = peek_index(role.guild.id)
+    if index is not None:
+        index.remove_role(role)
+
+
+@bot.listen()
+async def on_guild_channel_create(channel):
+    index = peek_index(channel.guild.id)
+    if index is not None:
+        index.add_channel(channel)
+
+
+@bot.listen()
+async def on_guild_channel_update(before, after):
+    index = peek_index(after.guild.id)
+    if index is not None:
+        index.remove_channel(after, before.name)
+        index.add_channel(after)
+
+
+@bot.listen()
+async def on_guild_channel_delete(channel):
+    index = peek_index(channel.guild.id)
+    if index is not None:
+        index.remove_channel(channel)
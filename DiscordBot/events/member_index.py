@@ -0,0 +1,37 @@
+from DiscordBot.aux_files.member_index import peek_member_index, drop_member_index, member_indexes
+from DiscordBot.bot import bot
+from ressources.settings import MEMBER_CACHE
+
+
+@bot.listen()
+async def on_ready():
+    # after a reconnection, discord.py rebuilds its member cache with new objects
+    drop_member_index()
+
+
+@bot.listen()
+async def on_guild_remove(guild):
+    drop_member_index(guild.id)
+
+
+@bot.listen()
+async def on_member_join(member):
+    index = peek_member_index(member.guild.id)
+    if index is not None and MEMBER_CACHE != 'compact':  # see `MemberIndex`
+        index.add(member)
+
+
+@bot.listen()
+async def on_member_remove(member):
+    index = peek_member_index(member.guild.id)
+    if index is not None:
+        index.remove(member)
+
+
+@bot.listen()
+async def on_user_update(before, after):
+    # username and global name changes are user updates, common to every guild of the user
+    if before.name != after.name or before.discriminator != after.discriminator \
+            or getattr(before, 'global_name', None) != getattr(after, 'global_name', None):
+        for index in member_indexes():
+            index.rename(before, after)
@@ -0,0 +1,44 @@
+from DiscordBot.aux_files.member_snapshot import peek_snapshot, drop_snapshot, snapshots
+from DiscordBot.bot import bot
+
+
+@bot.listen()
+async def on_guild_remove(guild):
+    drop_snapshot(guild.id)
+
+
+@bot.listen()
+async def on_member_join(member):
+    snapshot = peek_snapshot(member.guild.id)
+    if snapshot is not None:
+        snapshot.add(member)
+
+
+@bot.listen()
+async def on_member_remove(member):
+    snapshot = peek_snapshot(member.guild.id)
+    if snapshot is not None:
+        snapshot.remove(member.id)
+
+
+@bot.listen()
+async def on_raw_member_remove(payload):
+    # also sent for the members absent from the cache, unlike on_member_remove
+    snapshot = peek_snapshot(payload.guild_id)
+    if snapshot is not None:
+        snapshot.remove(payload.user.id)
+
+
+# the two listeners below only receive the members still in the cache of discord.py (see `MemberSnapshot`)
+@bot.listen()
+async def on_member_update(before, after):
+    snapshot = peek_snapshot(after.guild.id)
+    if snapshot is not None and after.id in snapshot and before.roles != after.roles:
+        snapshot.add(after)
+
+
+@bot.listen()
+async def on_user_update(before, after):
+    if before.name != after.name:
+        for snapshot in snapshots():
+            snapshot.rename(after.id, after.name)
@@ -0,0 +1,50 @@
+from DiscordBot.aux_files.member_store import store
+from DiscordBot.bot import bot
+
+
+@bot.listen()
+async def on_ready():
+    store.start()
+    for guild in bot.guilds:
+        if guild.chunked:  # else the mirror is synchronized by utils.ensure_chunked
+            await store.sync_guild(guild)
+
+
+@bot.listen()
+async def on_member_join(member):
+    store.member_added(member)
+
+
+@bot.listen()
+async def on_member_remove(member):
+    store.member_removed(member)
+
+
+@bot.listen()
+async def on_member_update(before, after):
+    if before.roles != after.roles or before.nick != after.nick:
+        store.member_updated(after)
+
+
+@bot.listen()
+async def on_user_update(before, after):
+    if before.name != after.name:
+        for guild in bot.guilds:
+            member = guild.get_member(after.id)
+            if member is not None:
+                store.member_updated(member)
+
+
+@bot.listen()
+async def on_guild_role_create(role):
+    store.role_updated(role)
+
+
+@bot.listen()
+async def on_guild_role_update(before, after):
+    store.role_updated(after)
+
+
+@bot.listen()
+async def on_guild_role_delete(role):
+    store.role_deleted(role)
@@ -0,0 +1,48 @@
+from DiscordBot.aux_files.role_counts import peek_counter, drop_counter
+from DiscordBot.bot import bot
+
+
+@bot.listen()
+async def on_ready():
+    # after a reconnection, the member cache may have changed without events
+    drop_counter()
+
+
+@bot.listen()
+async def on_guild_remove(guild):
+    drop_counter(guild.id)
+
+
+@bot.listen()
+async def on_member_join(member):
+    counter = peek_counter(member.guild.id)
+    if counter is not None:
+        counter.member_added(member)
+
+
+@bot.listen()
+async def on_member_remove(member):
+    counter = peek_counter(member.guild.id)
+    if counter is not None:
+        counter.member_removed(member)
+
+
+@bot.listen()
+async def on_member_update(before, after):
+    counter = peek_counter(after.guild.id)
+    if counter is not None and before.roles != after.roles:
+        counter.member_updated(before, after)
+
+
+@bot.listen()
+async def on_guild_role_create(role):
+    counter = peek_counter(role.guild.id)
+    if counter is not None:
+        counter.role_created(role)
+
+
+@bot.listen()
+async def on_guild_role_delete(role):
+    counter = peek_counter(role.guild.id)
+    if counter is not None:
+        counter.role_deleted(role)
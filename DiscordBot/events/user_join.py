@@ -1,14 +1,23 @@
+from DiscordBot.aux_files.dm_dispatcher import dm_dispatcher
+from DiscordBot.aux_files.firewall import get_monitor
+from DiscordBot.aux_files.guild_config import get_config
 from DiscordBot.bot import bot
-from ressources.env import BOT_URL
 
 
 @bot.event
 async def on_member_join(member):
-    await member.send(
+    if get_monitor(member.guild).locked:
+        return  # no welcome message to the members joining during a raid
+    config = get_config(member.guild)
+    bot_url = config.bot_url
+    dm_dispatcher.submit(
+        member,
         "Bienvenue sur le serveur Discord des étudiants de l'UTT.\n "
         "Ceci n'étant pas une zone de non droit, vous **devez** vous identifier en cliquant ici "
-        f"(**que vous soyez étudiant ou prof**) : {BOT_URL}\n"
-        "Vous devez également lire les règles dans le channel `accueil`\n\n"
+        f"(**que vous soyez étudiant ou prof**) : {bot_url}\n"
+        f"Vous devez également lire les règles dans le channel `{config.welcome_channel}`\n\n"
         "En cas de problème, contactez l'un des administrateurs, visibles en haut à droite.\n"
-        "Tapez `@help` dans un channel texte pour voir la liste des commandes.`"
+        "Tapez `@help` dans un channel texte pour voir la liste des commandes.`",
+        f"bienvenue ! Vos messages privés sont fermés : identifiez-vous ici {bot_url} "
+        "et lisez les règles de ce salon."
     )
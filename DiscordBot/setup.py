@@ -1,16 +1,82 @@
+from DiscordBot.aux_files.startup import startup
+import asyncio
 import discord
 from discord.ext import commands
 from ressources.env import BOT_TOKEN
+from ressources.settings import MEMBER_CACHE, MEMBER_CHUNKING, SLASH_ONLY
 from DiscordBot.commands.channel_management import bot_commands
 from DiscordBot.commands.getters import bot_commands
 from DiscordBot.commands.role_management import bot_commands
-from DiscordBot.events import user_join
+from DiscordBot.commands.diagnostics import bot_commands
+from DiscordBot.commands.export import bot_commands
+from DiscordBot.commands.firewall import bot_commands
+from DiscordBot.commands.resume import bot_commands
+from DiscordBot.commands.resync import bot_commands
+from DiscordBot.events import user_join, guild_index, role_counts, member_index, firewall, member_snapshot
 from DiscordBot.bot import bot
+from DiscordBot.aux_files.member_snapshot import get_snapshot
+from DiscordBot.aux_files.profiler import watchdog
+from DiscordBot.aux_files.metrics import instrument_bot, memory_report, monitor_loop_lag
+from DiscordBot.aux_files.utils import ensure_chunked
+from DiscordBot.aux_files.web_server import start_web_server
+from DiscordBot.aux_files.dm_dispatcher import dm_dispatcher
+from DiscordBot.aux_files.journal import journal
+from DiscordBot.aux_files.slash import register_slash_commands
+from assign_from_web import login_queue
+
+if MEMBER_CACHE != 'compact':  # the SQLite mirror is built from the member cache
+    from DiscordBot.events import member_store
+
+instrument_bot(bot)
+# the background tasks started by `on_ready` : the loop keeps weak references to its tasks only
+_lag_task: asyncio.Task | None = None
+_chunk_task: asyncio.Task | None = None
+slash_commands = register_slash_commands(bot)
+startup.mark('import')
+
+
+if SLASH_ONLY:
+    @bot.event
+    async def on_message(message):
+        pass  # the messages are not parsed for prefix commands
+
+
+@bot.event
+async def on_connect():
+    startup.mark('login')
+
+
+async def _chunk_in_background():
+    for guild in bot.guilds:
+        if MEMBER_CACHE == 'compact':
+            await get_snapshot(guild)
+        else:
+            await ensure_chunked(guild)
+    startup.mark('chunk')
+    print(startup.report())
+    print(memory_report(bot))
 
 
 @bot.event
 async def on_ready():
+    global _lag_task, _chunk_task
     print(f'{bot.user} has connected to Discord!')
+    if 'ready' not in startup.marks:  # on_ready is dispatched again after each reconnection
+        _lag_task = asyncio.create_task(monitor_loop_lag())
+        watchdog.start()
+        if slash_commands:
+            await bot.tree.sync()
+    startup.mark('ready')
+    if MEMBER_CHUNKING == 'startup' and MEMBER_CACHE != 'compact':
+        startup.mark('chunk')
+    elif MEMBER_CHUNKING in ('startup', 'background') and _chunk_task is None:
+        _chunk_task = asyncio.create_task(_chunk_in_background())
+    print(startup.report())
+    print(memory_report(bot))
+    login_queue.start()
+    dm_dispatcher.start()
+    journal.start()
+    await start_web_server()
 
 
 def start_bot():
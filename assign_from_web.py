@@ -1,12 +1,25 @@
+import asyncio
+import csv
+import json
 import sys
+from typing import Iterable, Iterator
 
 import discord
+from aiohttp import web
 
+from DiscordBot.aux_files.bulk import BulkOperation
+from DiscordBot.aux_files.guild_config import get_config
+from DiscordBot.aux_files.member_index import MemberIndex, get_member_index
+from DiscordBot.aux_files.ratelimit import limiter
 from DiscordBot.aux_files.utils import parse_ue
+from DiscordBot.aux_files.web_server import app
 from DiscordBot.bot import bot
+from ressources.settings import LOGIN_WORKERS
 
 
 class EtuMember:
+    __slots__ = ('first_name', 'last_name', 'semester', 'branch', 'is_student')
+
     def __init__(self, first_name: str, last_name: str, semester: str, branch: str, is_student: bool):
         self.first_name: str = first_name
         self.last_name: str = last_name
@@ -18,18 +31,302 @@ class EtuMember:
         return f"{self.first_name} {self.last_name.upper()} - {self.branch}{self.semester}"
 
 
+def _expected_roles(guild: discord.Guild, etu_member: EtuMember, add_roles) -> list[discord.Role]:
+    """
+    Return the roles a member logging in from the etu site must have.
+    """
+    config = get_config(guild)
+    # only UEs of the catalogue of the server can be given from the site
+    roles = [parse_ue(guild, ue) for ue in add_roles if ue in config.catalogue]
+    roles.append(parse_ue(guild, config.alumni_role))
+    roles.extend([parse_ue(guild, ue) for ue in (config.student_role, etu_member.branch)])
+    return [ue for ue in roles if ue is not None]  # remove potential None values
+
+
 async def etu_to_discord(etu_member: EtuMember, discord_username: str,
                          guild_id: int, etu_name: str, add_roles: list | tuple | set) -> None:
     guild = bot.get_guild(guild_id)
     if guild is None:
         print(f"Aucun serveur ne correspond à l'id {guild_id}", file=sys.stderr)
         return
-    discord_member: discord.Member = discord.utils.get(guild.members, name=discord_username)
+    # the username is the only unique name chosen through discord : never match a global name or an id
+    discord_member = await get_member_index(guild).resolve(guild, discord_username, username_only=True)
     if discord_member is not None:
-        # rename user
-        await discord_member.edit(nick=etu_member.get_nickname(), reason="Connexion depuis le site etu")
-        roles = [parse_ue(guild, ue) for ue in add_roles]
-        roles.append(parse_ue(guild, 'Ancien'))
-        roles.extend([parse_ue(guild, ue) for ue in ('Etudiant', etu_member.branch)])
-        roles = [ue for ue in roles if ue is not None]  # remove potential None values
-        await discord_member.add_roles(*roles, reason="Connexion depuis le site etu")
+        # rename the member and give the roles in a single request
+        nickname = etu_member.get_nickname()
+        current_roles = set(discord_member.roles) - {guild.default_role}
+        roles = current_roles | set(_expected_roles(guild, etu_member, add_roles))
+        if discord_member.nick == nickname and roles == current_roles:
+            return  # nothing has changed since the last login
+        await limiter.acquire('member_edit', guild.id)
+        await discord_member.edit(nick=nickname, roles=sorted(roles), reason="Connexion depuis le site etu")
+
+
+class LoginRequest:
+    """
+    A login from the etu site, waiting to be applied on discord.
+    """
+    __slots__ = ('etu_member', 'discord_username', 'guild_id', 'etu_name', 'add_roles')
+
+    def __init__(self, etu_member: EtuMember, discord_username: str, guild_id: int, etu_name: str, add_roles):
+        self.etu_member: EtuMember = etu_member
+        self.discord_username: str = discord_username
+        self.guild_id: int = guild_id
+        self.etu_name: str = etu_name
+        self.add_roles: set[str] = set(add_roles)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LoginRequest':
+        """
+        Build a login request from its JSON representation : ::
+            {"first_name": "Jean", "last_name": "Dupont", "semester": "3", "branch": "ISI", "is_student": true,
+             "discord_username": "jean", "guild_id": 1234, "etu_name": "dupontje", "add_roles": ["LO07", "IF02"]}
+        :raise ValueError: if a field is missing or invalid
+        """
+        try:
+            etu_member = EtuMember(data['first_name'], data['last_name'], str(data['semester']),
+                                   data['branch'], bool(data['is_student']))
+            return cls(etu_member, data['discord_username'], int(data['guild_id']),
+                       data['etu_name'], data.get('add_roles', []))
+        except (KeyError, TypeError) as error:
+            raise ValueError(f"connexion invalide : {error!r}")
+
+    @property
+    def key(self) -> tuple[int, str]:
+        return self.guild_id, self.discord_username.lower()
+
+    def merge(self, newer: 'LoginRequest') -> 'LoginRequest':
+        """
+        Merge a newer login of the same user into this one :
+        the newer identity wins, the roles of both logins are given.
+        """
+        newer.add_roles |= self.add_roles
+        return newer
+
+
+class LoginQueue:
+    """
+    Queue of the logins from the etu site, applied by a pool of workers.
+    While a login waits in the queue, later logins of the same user are merged into it,
+    so that a burst of logins results in at most one request to discord per user.
+    The logins of a user are applied one at a time : a login arriving while the previous one is being
+    applied waits for it to finish, then is applied with the roles of both, as the member edit replaces
+    all the roles and the cache may not show the previous edit yet.
+    The logins submitted before `start` wait until the workers are started.
+
+    Example: ::
+        login_queue.submit(LoginRequest(etu_member, "jean", guild_id, "dupontje", ["LO07"]))
+    """
+
+    def __init__(self, workers: int = LOGIN_WORKERS):
+        self.workers: int = workers
+        self._pending: dict[tuple[int, str], LoginRequest] = {}
+        self._in_flight: dict[tuple[int, str], LoginRequest] = {}
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self.submitted: int = 0
+        self.merged: int = 0
+        self.applied: int = 0
+        self.failed: int = 0
+
+    def submit(self, request: LoginRequest) -> None:
+        self.submitted += 1
+        pending = self._pending.get(request.key)
+        if pending is not None:
+            self.merged += 1
+            self._pending[request.key] = pending.merge(request)
+            return
+        self._pending[request.key] = request
+        # else queued when the current login of the user is applied, or when the workers are started
+        if request.key not in self._in_flight and self._queue is not None:
+            self._queue.put_nowait(request.key)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def _work(self) -> None:
+        while True:
+            key = await self._queue.get()
+            request = self._in_flight[key] = self._pending.pop(key)
+            try:
+                await etu_to_discord(request.etu_member, request.discord_username, request.guild_id,
+                                     request.etu_name, request.add_roles)
+                self.applied += 1
+            except Exception as error:  # a failed login must not stop the worker
+                self.failed += 1
+                print(f"Échec de la connexion de {request.discord_username} : {error}", file=sys.stderr)
+            finally:
+                del self._in_flight[key]
+                if key in self._pending:  # a login of the same user arrived in the meantime
+                    self._pending[key] = request.merge(self._pending[key])
+                    self._queue.put_nowait(key)
+                self._queue.task_done()
+
+    def start(self) -> None:
+        """
+        Start the workers, if they are not already running.
+        """
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for key in self._pending:
+            self._queue.put_nowait(key)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+
+login_queue = LoginQueue()
+
+
+def submit_jsonl(lines) -> int:
+    """
+    Submit logins given as JSON lines (one login per line, see `LoginRequest.from_dict`).
+    :param lines: an iterable of strings
+    :return: the number of logins submitted
+    :raise ValueError: if a line is not a valid login. The previous lines are submitted anyway
+    """
+    count = 0
+    for line in lines:
+        if line.strip():
+            login_queue.submit(LoginRequest.from_dict(json.loads(line)))
+            count += 1
+    return count
+
+
+async def _post_logins(request: web.Request) -> web.Response:
+    """
+    POST /logins : submit one login (JSON object) or several (JSON lines).
+    The logins are applied in the background, the response only tells how many were queued.
+    """
+    if not login_queue.running:
+        return web.json_response({'error': "le bot n'est pas encore prêt"}, status=503)
+    text = await request.text()
+    try:
+        try:
+            body = json.loads(text)
+        except ValueError:
+            body = None  # not a single JSON document : JSON lines
+        if isinstance(body, dict):
+            login_queue.submit(LoginRequest.from_dict(body))
+            count = 1
+        else:
+            count = submit_jsonl(text.splitlines())
+    except ValueError as error:
+        return web.json_response({'error': str(error)}, status=400)
+    return web.json_response({'queued': count, 'pending': len(login_queue)}, status=202)
+
+
+app.router.add_post('/logins', _post_logins)
+
+
+def _csv_login(row: dict) -> dict:
+    # the CSV cells are strings : the UEs are separated by ';' or spaces
+    return {**row, 'is_student': (row.get('is_student') or '').strip().lower() in ('1', 'true', 'oui'),
+            'add_roles': (row.get('add_roles') or '').replace(';', ' ').split()}
+
+
+def read_export(lines: Iterable[str], export_format: str, guild_id: int) -> Iterator[LoginRequest]:
+    """
+    Read an export of the accounts of the etu site one line at a time, as logins to the given guild.
+    The export holds the fields of `LoginRequest.from_dict` but `guild_id`, as JSON lines or as CSV
+    with a header line (the UEs of `add_roles` separated by ';').
+    :param lines: an iterable of strings, e.g. an open file
+    :param export_format: 'jsonl' or 'csv'
+    :param guild_id: the id of the discord server to synchronize
+    :raise ValueError: if a line is not a valid account
+    """
+    if export_format == 'csv':
+        rows = (_csv_login(row) for row in csv.DictReader(lines))
+    else:
+        rows = (json.loads(line) for line in lines if line.strip())
+    for row in rows:
+        if not isinstance(row, dict):
+            raise ValueError(f"un compte doit être un objet JSON : {row!r}")
+        yield LoginRequest.from_dict({**row, 'guild_id': guild_id})
+
+
+class Resync:
+    """
+    Synchronization of a whole guild with an export of the accounts of the etu site,
+    for when the data of the site changes in bulk (new semester, change of branch...)
+    and the students should not have to log in again.
+    For each account, the nickname and the roles a login would give are compared with the member :
+    the branch roles the account no longer has are removed, the missing roles are given,
+    and only the changed members are edited, with a single request each, concurrently.
+    The edit is computed again from the member itself when its turn comes, so that the roles changed
+    since the diff (by a login, an admin...) are kept.
+
+    Example: ::
+        resync = Resync(guild)
+        resync.diff(read_export(f, 'jsonl', guild.id))
+        await resync.apply(ctx)
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self.guild: discord.Guild = guild
+        # id of each member to edit -> the account it is synchronized with
+        self.changed: dict[int, LoginRequest] = {}
+        self.unchanged: int = 0
+        self.missing: list[str] = []
+        config = get_config(guild)
+        self._branches: set[discord.Role] = {parse_ue(guild, branch) for branch in config.catalogue.categories()}
+        self._branches.discard(None)
+
+    def _edit(self, member: discord.Member, login: LoginRequest) -> dict:
+        edit = {}
+        nickname = login.etu_member.get_nickname()
+        if member.nick != nickname:
+            edit['nick'] = nickname
+        current = set(member.roles) - {self.guild.default_role}
+        expected = set(_expected_roles(self.guild, login.etu_member, login.add_roles))
+        roles = (current - (self._branches - expected)) | expected
+        if roles != current:
+            edit['roles'] = sorted(roles)
+        return edit
+
+    def diff(self, logins: Iterable[LoginRequest], index: MemberIndex | None = None) -> None:
+        """
+        Compute the edit of each member of the export.
+        A member found several times in the export gets the roles of all its accounts, like repeated logins.
+        :param logins: the accounts of the export
+        :param index: the members to look the accounts up in, the member index of the cache by default
+        """
+        index = get_member_index(self.guild) if index is None else index
+        merged: dict[tuple[int, str], LoginRequest] = {}
+        for login in logins:
+            previous = merged.get(login.key)
+            merged[login.key] = login if previous is None else previous.merge(login)
+        for login in merged.values():
+            # like a login : the username is the only unique name chosen through discord
+            member = index.get(login.discord_username, username_only=True)
+            if member is None:
+                self.missing.append(login.discord_username)
+                continue
+            if self._edit(member, login):
+                self.changed[member.id] = login
+            else:
+                self.unchanged += 1
+
+    def summary(self) -> str:
+        return (f"{self.unchanged} membre(s) inchangé(s), {len(self.changed)} à modifier, "
+                f"{len(self.missing)} absent(s) du serveur")
+
+    async def apply(self, ctx) -> BulkOperation:
+        """
+        Edit the changed members, showing the progress in the channel of the command.
+        :param ctx: the discord context of the command
+        :return: the finished bulk operation
+        """
+        changed = self.changed
+
+        def edit(member: discord.Member):
+            # the member of the operation is the current one : its roles may have changed since the diff
+            return member.edit(**self._edit(member, changed[member.id]), reason="Synchronisation du site etu")
+
+        operation = BulkOperation(ctx, "Synchronisation avec le site etu", list(changed), edit, 'member_edit')
+        operation.pending = lambda member: bool(self._edit(member, changed[member.id]))
+        await operation.run()
+        return operation
@@ -0,0 +1,384 @@
+"""
+In-memory stand-in for a discord guild and for the discord API, used by the benchmarks.
+Every mutating call goes through a `FakeServer`, which simulates the latency of the API
+and its rate limit buckets (answering 429 and making the caller wait, like discord.py does).
+"""
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter, deque
+
+import discord
+
+_ids = itertools.count(10 ** 17)
+
+
+def new_id() -> int:
+    return next(_ids)
+
+
+class FakeServer:
+    """
+    The discord API : counts the calls per route and enforces sliding-window rate limits.
+    """
+
+    def __init__(self, limits: dict[str, tuple[int, float]], latency: float):
+        self.limits: dict[str, tuple[int, float]] = limits
+        self.latency: float = latency
+        self.calls: Counter = Counter()
+        self.rate_limited: int = 0
+        self._windows: dict[tuple[str, object], deque] = {}
+
+    def _wait_time(self, route: str, major) -> float:
+        limit, per = self.limits[route]
+        window = self._windows.setdefault((route, major), deque())
+        now = time.monotonic()
+        while window and now - window[0] >= per:
+            window.popleft()
+        return per - (now - window[0]) if len(window) >= limit else 0.0
+
+    async def request(self, route: str, major=None) -> None:
+        while True:
+            retry_after = max(self._wait_time(route, major), self._wait_time('global', None))
+            if retry_after <= 0:
+                break
+            self.rate_limited += 1  # 429 : discord.py sleeps retry_after then retries
+            await asyncio.sleep(retry_after)
+        now = time.monotonic()
+        self._windows[(route, major)].append(now)
+        self._windows[('global', None)].append(now)
+        self.calls[route] += 1
+        await asyncio.sleep(self.latency)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class _Value:
+    def __init__(self, value: int = 0):
+        self.value: int = value
+
+
+class _Permissions:
+    def __init__(self, administrator: bool = False):
+        self.administrator: bool = administrator
+        self.value: int = 8 if administrator else 0
+
+
+class _Response:
+    """
+    The part of an aiohttp response read by the discord.py exceptions.
+    """
+
+    def __init__(self, status: int, reason: str):
+        self.status: int = status
+        self.reason: str = reason
+
+
+class FakeRole:
+    def __init__(self, guild: 'FakeGuild', name: str, position: int, role_id: int | None = None):
+        self.id: int = new_id() if role_id is None else role_id
+        self.guild: FakeGuild = guild
+        self.name: str = name
+        self.position: int = position
+        self.colour = _Value(0)
+        self.permissions = _Permissions()
+        self.managed: bool = False
+
+    def __lt__(self, other: 'FakeRole') -> bool:
+        return (self.position, self.id) < (other.position, other.id)
+
+    def __hash__(self) -> int:
+        return self.id >> 22
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FakeRole) and other.id == self.id
+
+    def is_default(self) -> bool:
+        return self.id == self.guild.id
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+    @property
+    def members(self) -> list['FakeMember']:
+        # like discord.py : a scan of the whole member cache
+        if self.is_default():
+            return list(self.guild.members)
+        return [member for member in self.guild.members if self in member.roles]
+
+    async def delete(self, reason: str | None = None) -> None:
+        await self.guild.server.request('role_delete', self.guild.id)
+        self.guild.roles.remove(self)
+        for member in self.guild.members:
+            if self in member.roles:
+                member.roles.remove(self)
+
+
+class _FakeChannelMixin:
+    """
+    Behaviour shared by the fake channels, which subclass the discord.py channels
+    so that the isinstance checks of the bot keep working.
+    """
+
+    def _setup(self, guild: 'FakeGuild', name: str, category_id: int | None, overwrites: dict | None) -> None:
+        self.id = new_id()
+        self.guild = guild
+        self.name = name
+        self.category_id = category_id
+        self.position = len(guild.channels)
+        self._fake_overwrites = dict(overwrites or {})
+
+    @property
+    def overwrites(self) -> dict:
+        return dict(self._fake_overwrites)
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    async def delete(self, reason: str | None = None) -> None:
+        await self.guild.server.request('channel_delete', self.guild.id)
+        self.guild.channels.remove(self)
+
+    async def edit(self, overwrites: dict | None = None, **kwargs) -> None:
+        await self.guild.server.request('channel_edit', self.guild.id)
+        if overwrites is not None:
+            self._fake_overwrites = dict(overwrites)
+
+
+class FakeTextChannel(_FakeChannelMixin, discord.TextChannel):
+    def __init__(self, guild, name, category_id=None, overwrites=None):
+        self._setup(guild, name.lower(), category_id, overwrites)
+        self.last_message_id: int | None = None
+
+    async def send(self, content: str | None = None, **kwargs) -> 'FakeMessage':
+        await self.guild.server.request('message_send', self.id)
+        message = FakeMessage(self, content, kwargs.get('view'))
+        self.last_message_id = message.id
+        return message
+
+
+class FakeVoiceChannel(_FakeChannelMixin, discord.VoiceChannel):
+    def __init__(self, guild, name, category_id=None, overwrites=None):
+        self._setup(guild, name, category_id, overwrites)
+
+
+class FakeCategory(_FakeChannelMixin, discord.CategoryChannel):
+    def __init__(self, guild, name, overwrites=None):
+        self._setup(guild, name, None, overwrites)
+
+    @property
+    def channels(self) -> list:
+        return [channel for channel in self.guild.channels if channel.category_id == self.id]
+
+
+class FakeMessage:
+    def __init__(self, channel, content: str | None, view: discord.ui.View | None = None):
+        self.id: int = new_id()
+        self.channel = channel
+        self.content: str | None = content
+        self.view: discord.ui.View | None = view
+        self.reactions: list[str] = []
+        self.role_mentions: list[FakeRole] = []
+        self.mentions: list[FakeMember] = []
+
+    async def edit(self, content: str | None = None, **kwargs) -> None:
+        await self.channel.guild.server.request('message_edit', self.channel.id)
+        if content is not None:
+            self.content = content
+        if 'view' in kwargs:
+            self.view = kwargs['view']
+
+    async def add_reaction(self, emoji: str) -> None:
+        self.reactions.append(emoji)
+
+    async def clear_reactions(self) -> None:
+        self.reactions.clear()
+
+
+class FakeMember:
+    def __init__(self, guild: 'FakeGuild', name: str, roles: list[FakeRole], administrator: bool = False,
+                 bot: bool = False):
+        self.id: int = new_id()
+        self.guild: FakeGuild = guild
+        self.name: str = name
+        self.discriminator: str = '0'
+        self.global_name: str | None = name.title()
+        self.nick: str | None = None
+        self.roles: list[FakeRole] = [guild.default_role] + sorted(roles)
+        self.bot: bool = bot
+        self.guild_permissions = _Permissions(administrator)
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    async def edit(self, nick: str | None = None, roles: list[FakeRole] | None = None, **kwargs) -> None:
+        await self.guild.server.request('member_edit', self.guild.id)
+        if nick is not None:
+            self.nick = nick
+        if roles is not None:
+            self.roles = [self.guild.default_role] + sorted(roles)
+
+    async def add_roles(self, *roles: FakeRole, **kwargs) -> None:
+        for role in roles:
+            await self.guild.server.request('member_role', self.guild.id)
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles: FakeRole, **kwargs) -> None:
+        for role in roles:
+            await self.guild.server.request('member_role', self.guild.id)
+            if role in self.roles:
+                self.roles.remove(role)
+
+    async def kick(self, reason: str | None = None) -> None:
+        await self.guild.server.request('member_kick', self.guild.id)
+        self.guild.remove_member(self)
+
+    async def send(self, content: str | None = None, **kwargs) -> None:
+        await self.guild.server.request('message_send', self.id)
+
+
+class FakeGuild:
+    """
+    A guild with the attributes and methods of `discord.Guild` used by the bot.
+    """
+
+    def __init__(self, server: FakeServer):
+        self.server: FakeServer = server
+        self.id: int = new_id()
+        self.chunked: bool = True
+        self.owner_id: int = new_id()
+        self.default_role = FakeRole(self, '@everyone', 0, role_id=self.id)
+        self.roles: list[FakeRole] = [self.default_role]
+        self.channels: list = []
+        self.members: list[FakeMember] = []
+        self._members_by_id: dict[int, FakeMember] = {}
+
+    def add_member(self, member: 'FakeMember') -> None:
+        self.members.append(member)
+        self._members_by_id[member.id] = member
+
+    def remove_member(self, member: 'FakeMember') -> None:
+        self.members.remove(member)
+        del self._members_by_id[member.id]
+
+    @property
+    def categories(self) -> list[FakeCategory]:
+        return [channel for channel in self.channels if isinstance(channel, FakeCategory)]
+
+    @property
+    def text_channels(self) -> list[FakeTextChannel]:
+        return [channel for channel in self.channels if isinstance(channel, FakeTextChannel)]
+
+    def get_role(self, role_id: int) -> FakeRole | None:
+        return discord.utils.get(self.roles, id=role_id)
+
+    def get_channel(self, channel_id: int):
+        return discord.utils.get(self.channels, id=channel_id)
+
+    def get_member(self, member_id: int) -> FakeMember | None:
+        return self._members_by_id.get(member_id)
+
+    async def chunk(self) -> None:
+        self.chunked = True
+
+    async def fetch_member(self, member_id: int) -> FakeMember:
+        await self.server.request('member_fetch', self.id)
+        member = self._members_by_id.get(member_id)
+        if member is None:
+            raise discord.NotFound(_Response(404, 'Not Found'), 'Unknown Member')
+        return member
+
+    async def fetch_members(self, limit: int | None = None):
+        # the member list is read by pages of 1000 members
+        for start in range(0, len(self.members) if limit is None else min(limit, len(self.members)), 1000):
+            self.server.calls['member_list'] += 1
+            for member in self.members[start:start + 1000]:
+                yield member
+
+    async def query_members(self, query: str | None = None, limit: int = 5, user_ids=None, cache: bool = True):
+        self.server.calls['query_members'] += 1  # a gateway request, not rate limited like the REST routes
+        if user_ids:
+            return [member for member in self.members if member.id in user_ids]
+        return [member for member in self.members if member.name.startswith(query)][:limit]
+
+    def add_role(self, name: str) -> FakeRole:
+        role = FakeRole(self, name, len(self.roles))
+        self.roles.append(role)
+        return role
+
+    async def create_role(self, name: str, **kwargs) -> FakeRole:
+        await self.server.request('role_create', self.id)
+        return self.add_role(name)
+
+    async def create_category(self, name: str, **kwargs) -> FakeCategory:
+        await self.server.request('category_create', self.id)
+        category = FakeCategory(self, name)
+        self.channels.append(category)
+        return category
+
+    async def create_text_channel(self, name: str, overwrites=None, category=None, **kwargs) -> FakeTextChannel:
+        await self.server.request('channel_create', self.id)
+        channel = FakeTextChannel(self, name, category.id if category else None, overwrites)
+        self.channels.append(channel)
+        return channel
+
+    async def create_voice_channel(self, name: str, overwrites=None, category=None, **kwargs) -> FakeVoiceChannel:
+        await self.server.request('channel_create', self.id)
+        channel = FakeVoiceChannel(self, name, category.id if category else None, overwrites)
+        self.channels.append(channel)
+        return channel
+
+
+class FakeBot:
+    """
+    The bot of a context, in the guild of the context only.
+    """
+
+    def __init__(self, guild: FakeGuild):
+        self.guilds: list[FakeGuild] = [guild]
+
+
+class FakeContext:
+    """
+    The context of a command written in the admin channel.
+    """
+
+    def __init__(self, guild: FakeGuild, admin_channel: FakeTextChannel):
+        self.bot = FakeBot(guild)
+        self.guild: FakeGuild = guild
+        self.channel: FakeTextChannel = admin_channel
+        self.message = FakeMessage(admin_channel, None)
+        self.sent: list[FakeMessage] = []
+
+    async def send(self, content: str | None = None, **kwargs) -> FakeMessage:
+        message = await self.channel.send(content, **kwargs)
+        self.sent.append(message)
+        return message
+
+
+def build_guild(server: FakeServer, members: int, roles: int, channels: int, seed: int = 0) -> FakeGuild:
+    """
+    Build a guild with the given number of members, roles and channels.
+    Every member has a handful of random roles.
+    """
+    rng = random.Random(seed)
+    guild = FakeGuild(server)
+    all_roles = [guild.add_role(f"role-{i}") for i in range(roles)]
+    category = None
+    for i in range(channels):
+        if i % 50 == 0:
+            category = FakeCategory(guild, f"categorie-{i // 50}")
+            guild.channels.append(category)
+        else:
+            guild.channels.append(FakeTextChannel(guild, f"salon-{i}", category.id))
+    for i in range(members):
+        guild.add_member(FakeMember(guild, f"membre{i}", rng.sample(all_roles, min(len(all_roles), 5)),
+                                        administrator=i < 5, bot=i % 1000 == 999))
+    return guild
@@ -0,0 +1,245 @@
+"""
+Offline benchmarks of the bot, run against an in-memory guild (see `benchmarks.fake_discord`).
+For each scenario, the real command code is run and the wall time, the number of calls to the
+simulated discord API, the number of 429 responses and the peak memory are reported.
+
+Usage: ::
+    python -m benchmarks.run
+    python -m benchmarks.run --members 2000 --only add_all_ues,get_roles
+    python -m benchmarks.run --output baseline.json
+    python -m benchmarks.run --baseline baseline.json --tolerance 0.2  # exit code 1 on regression
+    python -m benchmarks.run --only '' --memory  # memory of the member cache against the compact snapshot
+
+All the rate limit periods (of the simulated API and of the bot) are multiplied by `--time-scale`,
+so that a run takes seconds instead of hours while keeping the proportions of the real buckets.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import tracemalloc
+import types
+
+
+def _install_env() -> None:
+    """
+    The benchmarks never connect to discord : provide placeholder credentials if `ressources/env.py` is absent.
+    """
+    try:
+        import ressources.env  # noqa: F401
+    except ImportError:
+        import ressources
+        env = types.ModuleType('ressources.env')
+        env.BOT_TOKEN = ''
+        env.ADMIN_CHANNEL_ID = 0
+        env.BOT_URL = 'http://localhost'
+        env.INVITATION_LINK = 'http://localhost'
+        sys.modules['ressources.env'] = ressources.env = env
+
+
+_install_env()
+
+import discord  # noqa: E402
+from discord.state import ConnectionState  # noqa: E402
+
+from assign_from_web import EtuMember, etu_to_discord  # noqa: E402
+from benchmarks.fake_discord import (FakeCategory, FakeContext, FakeGuild, FakeServer, FakeTextChannel,  # noqa: E402
+                                     build_guild)
+from DiscordBot.aux_files import overwrites  # noqa: E402
+from DiscordBot.aux_files.catalogue import catalogue  # noqa: E402
+from DiscordBot.aux_files.guild_index import drop_index  # noqa: E402
+from DiscordBot.aux_files.member_index import drop_member_index  # noqa: E402
+from DiscordBot.aux_files.member_snapshot import MemberSnapshot  # noqa: E402
+from DiscordBot.aux_files.ratelimit import DEFAULT_LIMITS, limiter  # noqa: E402
+from DiscordBot.aux_files.role_counts import drop_counter  # noqa: E402
+from DiscordBot.bot import bot  # noqa: E402
+from DiscordBot.commands.channel_management import _add_all_ues, _del_all_ues, _sync_perms  # noqa: E402
+from DiscordBot.commands.getters import _get_roles  # noqa: E402
+from DiscordBot.commands.role_management import _del_same_role, _kick_all  # noqa: E402
+
+METRICS = ('wall', 'calls', 'rate_limited', 'peak_mb')
+
+
+def populate_ues(guild: FakeGuild) -> None:
+    """
+    Create the categories, roles and channels of every UE of the catalogue, without any API call.
+    """
+    for category_name, ues in catalogue.as_dict().items():
+        category = FakeCategory(guild, category_name)
+        guild.channels.append(category)
+        for ue in ues:
+            if any(role.name == ue for role in guild.roles):
+                continue
+            role = guild.add_role(ue)
+            guild.channels.append(FakeTextChannel(guild, ue, category.id, overwrites.ue_channel_perms(guild, role)))
+
+
+def drift_permissions(guild: FakeGuild) -> None:
+    """
+    Create the UEs, then reset the permissions of one UE channel out of ten.
+    """
+    populate_ues(guild)
+    for channel in guild.text_channels[::10]:
+        channel._fake_overwrites = {}
+
+
+def add_duplicate_roles(guild: FakeGuild, names: int = 100, copies: int = 2) -> None:
+    for role in guild.roles[1:names + 1]:
+        for _ in range(copies):
+            guild.add_role(role.name)
+
+
+async def run_etu_logins(ctx: FakeContext, logins: int = 500) -> None:
+    guild = ctx.guild
+    bot.get_guild = lambda guild_id: guild if guild_id == guild.id else None
+    ues = catalogue.ues('ISI')
+    await asyncio.gather(*(
+        etu_to_discord(EtuMember("Jean", f"Dupont{i}", "3", "ISI", True), member.name, guild.id,
+                       f"dupont{i}", ues[i % len(ues):i % len(ues) + 3])
+        for i, member in enumerate(guild.members[:logins])
+    ))
+
+
+# name -> (preparation of the guild, measured coroutine)
+SCENARIOS = {
+    'add_all_ues': (lambda guild: None, lambda ctx: _add_all_ues.callback(ctx)),
+    'del_all_ues': (populate_ues, lambda ctx: _del_all_ues.callback(ctx)),
+    'sync_perms': (drift_permissions, lambda ctx: _sync_perms.callback(ctx)),
+    'get_roles': (lambda guild: None, lambda ctx: _get_roles.callback(ctx, '0')),
+    'del_same_role': (add_duplicate_roles, lambda ctx: _del_same_role.callback(ctx)),
+    'kick_all': (lambda guild: None, lambda ctx: _kick_all.callback(ctx)),
+    'etu_to_discord': (populate_ues, run_etu_logins),
+}
+
+
+def _reset_caches() -> None:
+    drop_index()
+    overwrites.drop_templates()
+    drop_counter()
+    drop_member_index()
+    limiter._buckets.clear()
+
+
+async def run_scenario(name: str, args) -> dict[str, float]:
+    prepare, run = SCENARIOS[name]
+    scaled = {route: (limit, per * args.time_scale) for route, (limit, per) in DEFAULT_LIMITS.items()}
+    limiter.limits.update(scaled)
+    server = FakeServer(scaled, args.latency)
+    guild = build_guild(server, args.members, args.roles, args.channels)
+    prepare(guild)
+    admin_channel = FakeTextChannel(guild, 'admin')
+    ctx = FakeContext(guild, admin_channel)
+    _reset_caches()
+    tracemalloc.start()
+    start = time.perf_counter()
+    await run(ctx)
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'wall': round(wall, 3),
+        'calls': server.total_calls,
+        'rate_limited': server.rate_limited,
+        'peak_mb': round(peak / 2 ** 20, 2),
+    }
+
+
+def member_memory(members: int, roles: int, roles_per_member: int = 5, seed: int = 0) -> dict[str, float]:
+    """
+    Measure the memory of the members of a guild kept as real `discord.Member` objects (the discord.py cache),
+    built offline from gateway payloads, against the same members kept in a `MemberSnapshot`.
+    The ids of the snapshot are shared with the members while both exist, and not counted by tracemalloc :
+    the estimation of `MemberSnapshot.nbytes` is the size of the snapshot alone.
+    """
+    rng = random.Random(seed)
+    state = ConnectionState(dispatch=lambda *args: None, handlers={}, hooks={}, http=None,
+                            intents=discord.Intents.all(), member_cache_flags=discord.MemberCacheFlags.all())
+    guild_id = 10 ** 18
+    role_ids = [str(guild_id)] + [str(10 ** 17 + i) for i in range(1, roles)]
+    guild = discord.Guild(state=state, data={
+        'id': str(guild_id), 'name': 'benchmark', 'member_count': members,
+        'roles': [{'id': role_id, 'name': f"role-{i}", 'permissions': '0', 'position': i, 'color': 0,
+                   'hoist': False, 'managed': False, 'mentionable': False} for i, role_id in enumerate(role_ids)],
+    })
+    payloads = [{
+        'user': {'id': str(2 * 10 ** 17 + i), 'username': f"membre{i}", 'discriminator': '0',
+                 'global_name': f"Membre{i}", 'avatar': None},
+        'nick': None, 'roles': rng.sample(role_ids[1:], min(roles - 1, roles_per_member)),
+        'joined_at': '2024-01-01T00:00:00+00:00', 'deaf': False, 'mute': False, 'flags': 0,
+    } for i in range(members)]
+
+    tracemalloc.start()
+    for payload in payloads:
+        guild._add_member(discord.Member(data=payload, guild=guild, state=state))
+    cache = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    snapshot = MemberSnapshot(guild_id)
+    for member in guild.members:
+        snapshot.add(member)
+    compact = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        'cache_mb': round(cache / 2 ** 20, 2),
+        'snapshot_mb': round(compact / 2 ** 20, 2),
+        'snapshot_estimate_mb': round(snapshot.nbytes() / 2 ** 20, 2),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Return the list of the metrics worse than the baseline by more than the tolerance.
+    """
+    regressions = []
+    for name, measures in results.items():
+        for metric in METRICS:
+            reference = baseline.get(name, {}).get(metric)
+            if reference is not None and measures[metric] > reference * (1 + tolerance) + 1e-9:
+                regressions.append(f"{name}.{metric} : {measures[metric]} > {reference} (+{tolerance:.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the discord bot")
+    parser.add_argument('--members', type=int, default=10_000)
+    parser.add_argument('--roles', type=int, default=2_000)
+    parser.add_argument('--channels', type=int, default=1_000)
+    parser.add_argument('--latency', type=float, default=0.005, help="latency of an API call, in seconds")
+    parser.add_argument('--time-scale', type=float, default=0.002, help="multiplier of the rate limit periods")
+    parser.add_argument('--only', default=','.join(SCENARIOS), help="comma separated list of scenarios")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare the results to this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--memory', action='store_true',
+                        help="also compare the memory of the member cache and of the compact snapshot")
+    args = parser.parse_args()
+
+    results = {}
+    names = [name for name in args.only.split(',') if name]
+    if names:
+        print(f"{'scénario':<16}{'temps (s)':>12}{'appels':>10}{'429':>8}{'pic (Mo)':>10}")
+    for name in names:
+        results[name] = asyncio.run(run_scenario(name, args))
+        measures = results[name]
+        print(f"{name:<16}{measures['wall']:>12}{measures['calls']:>10}"
+              f"{measures['rate_limited']:>8}{measures['peak_mb']:>10}")
+    if args.memory:
+        memory = member_memory(args.members, args.roles)
+        print(f"{args.members} membres : {memory['cache_mb']} Mo dans le cache de discord.py, "
+              f"{memory['snapshot_mb']} Mo dans l'instantané compact (estimation {memory['snapshot_estimate_mb']} Mo)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"RÉGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
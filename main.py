@@ -1,3 +1,5 @@
+# first, so that the startup timer starts before discord.py and the modules of the bot are imported
+from DiscordBot.aux_files.startup import startup
 from DiscordBot.setup import start_bot
 
 
@@ -1,3 +1,6 @@
 from pathlib import Path
 
 UES_PATH = Path(__file__).resolve().absolute().parent / 'ues.json'
+GUILDS_PATH = Path(__file__).resolve().absolute().parent / 'guilds.json'
+STORE_PATH = Path(__file__).resolve().absolute().parent / 'guild_store.sqlite3'
+JOURNAL_PATH = Path(__file__).resolve().absolute().parent / 'journal.jsonl'
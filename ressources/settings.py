@@ -0,0 +1,75 @@
+"""
+Tunable settings of the bot.
+Every value can be overridden by defining a constant with the same name in `ressources/env.py`.
+"""
+from ressources import env
+
+# number of provisioning chains (role -> channel -> message) run at the same time
+PROVISIONING_CONCURRENCY: int = getattr(env, 'PROVISIONING_CONCURRENCY', 8)
+# {route: (requests, seconds)} overriding the defaults of DiscordBot.aux_files.ratelimit
+RATE_LIMITS: dict[str, tuple[int, float]] = getattr(env, 'RATE_LIMITS', {})
+# minimum delay in seconds between two edits of a progress message
+PROGRESS_INTERVAL: float = getattr(env, 'PROGRESS_INTERVAL', 3.0)
+# local HTTP endpoint of the bot (login submissions from the etu site)
+# if WEB_SOCKET is set, the endpoint listens on this unix socket instead of WEB_HOST:WEB_PORT
+WEB_HOST: str = getattr(env, 'WEB_HOST', '127.0.0.1')
+WEB_PORT: int = getattr(env, 'WEB_PORT', 8080)
+WEB_SOCKET: str | None = getattr(env, 'WEB_SOCKET', None)
+# number of workers applying the logins coming from the etu site
+LOGIN_WORKERS: int = getattr(env, 'LOGIN_WORKERS', 4)
+# when the members of the guilds are loaded :
+# 'startup' : before the bot is ready (discord.py default, slow restarts on big servers)
+# 'background' : in the background once the bot is ready
+# 'lazy' : only when a command needs them
+MEMBER_CHUNKING: str = getattr(env, 'MEMBER_CHUNKING', 'background')
+# members kept in memory :
+# 'full' : every member in the discord.py cache (discord.py default)
+# 'compact' : no member in the discord.py cache, the getters read a compact snapshot of ids, names and role ids
+# (see `DiscordBot.aux_files.member_snapshot`). 'startup' chunking is then done in the background.
+# The members are never loaded in the cache : @export and @resync read the paged member list of the API,
+# the bulk operations (@kickAll...) fetch each member, and the SQLite mirror is not kept.
+MEMBER_CACHE: str = getattr(env, 'MEMBER_CACHE', 'full')
+# seconds after which the member snapshot is rebuilt in 'compact' mode : discord.py drops the role changes
+# of the members absent from its cache, so this rebuild is the only refresh of the roles
+MEMBER_SNAPSHOT_TTL: float = getattr(env, 'MEMBER_SNAPSHOT_TTL', 600.0)
+# number of members handled at the same time by the bulk member operations (@kickAll, @removeAllFromRole...)
+BULK_CONCURRENCY: int = getattr(env, 'BULK_CONCURRENCY', 5)
+# maximum delay in seconds before the membership changes are written to the SQLite mirror
+STORE_FLUSH_INTERVAL: float = getattr(env, 'STORE_FLUSH_INTERVAL', 2.0)
+# roles allowed to export the members of their UEs with @export (the admins can export anything)
+EXPORT_ROLES: tuple[str, ...] = getattr(env, 'EXPORT_ROLES', ('Enseignant',))
+# seconds during which the pages of a long list can still be turned with the buttons
+PAGE_TIMEOUT: float = getattr(env, 'PAGE_TIMEOUT', 300.0)
+# seconds during which a rendered page is reused before being rendered again
+PAGE_CACHE_TTL: float = getattr(env, 'PAGE_CACHE_TTL', 60.0)
+# maximum number of welcome messages waiting to be sent, the next joins are not welcomed by DM
+DM_QUEUE_SIZE: int = getattr(env, 'DM_QUEUE_SIZE', 1000)
+# seconds during which a member who joins again is not sent the welcome message again
+DM_DEDUPE_WINDOW: float = getattr(env, 'DM_DEDUPE_WINDOW', 24 * 3600.0)
+# default channel in which the members whose private messages are closed are mentioned instead,
+# overridden per server by `welcome_channel` in `ressources/guilds.json`
+WELCOME_CHANNEL: str = getattr(env, 'WELCOME_CHANNEL', 'accueil')
+# join-flood firewall : length in seconds of the sliding windows the joins are counted in
+FIREWALL_WINDOW: int = getattr(env, 'FIREWALL_WINDOW', 60)
+# number of joins in a window above which the server is locked down
+FIREWALL_JOIN_LIMIT: int = getattr(env, 'FIREWALL_JOIN_LIMIT', 30)
+# {account age in seconds: number of joins of accounts younger than this in a window above which the server is locked}
+FIREWALL_AGE_LIMITS: dict[int, int] = getattr(env, 'FIREWALL_AGE_LIMITS', {3600: 5, 24 * 3600: 10, 7 * 24 * 3600: 20})
+# what is done to the members joining during a lockdown : 'kick', 'quarantine' (give FIREWALL_QUARANTINE_ROLE)
+# or 'report' (only warn the admins)
+FIREWALL_ACTION: str = getattr(env, 'FIREWALL_ACTION', 'quarantine')
+FIREWALL_QUARANTINE_ROLE: str = getattr(env, 'FIREWALL_QUARANTINE_ROLE', 'Quarantaine')
+# seconds without any limit crossed after which a lockdown ends by itself
+FIREWALL_LOCKDOWN_DURATION: float = getattr(env, 'FIREWALL_LOCKDOWN_DURATION', 600.0)
+# run the bot with discord.py's AutoShardedBot, to serve many servers from a single process
+SHARDED: bool = getattr(env, 'SHARDED', False)
+# answer only the slash commands : the messages are no longer parsed for prefix commands
+SLASH_ONLY: bool = getattr(env, 'SLASH_ONLY', False)
+# seconds between two writes of the completed steps to the journal of the mutating operations
+JOURNAL_FLUSH_INTERVAL: float = getattr(env, 'JOURNAL_FLUSH_INTERVAL', 0.5)
+# seconds a single callback can block the event loop before the watchdog logs its stack (0 to disable)
+WATCHDOG_THRESHOLD: float = getattr(env, 'WATCHDOG_THRESHOLD', 0.5)
+# seconds between two samples of the stack of the event loop by @profile
+PROFILE_INTERVAL: float = getattr(env, 'PROFILE_INTERVAL', 0.005)
+# seconds after which a profiling started by @profile stops by itself
+PROFILE_MAX_DURATION: float = getattr(env, 'PROFILE_MAX_DURATION', 600.0)
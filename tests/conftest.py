@@ -0,0 +1,33 @@
+"""
+The unit tests run against the in-memory guild of the benchmarks (see `benchmarks.fake_discord`),
+without connecting to discord.
+"""
+import pytest
+
+import benchmarks.run  # noqa: F401 : provides placeholder credentials if `ressources/env.py` is absent
+from benchmarks.fake_discord import FakeServer, build_guild
+from DiscordBot.aux_files.guild_index import drop_index
+from DiscordBot.aux_files.member_index import drop_member_index
+from DiscordBot.aux_files.ratelimit import DEFAULT_LIMITS, limiter
+
+
+@pytest.fixture
+def guild():
+    """
+    A guild of 20 members and 10 roles, whose API answers at once and never rate limits.
+    """
+    drop_index()
+    drop_member_index()
+    server = FakeServer({route: (10 ** 6, 1.0) for route in DEFAULT_LIMITS}, latency=0)
+    yield build_guild(server, members=20, roles=10, channels=3)
+    drop_index()
+    drop_member_index()
+
+
+@pytest.fixture
+def unlimited(monkeypatch):
+    """
+    Lift the rate limits of the bot itself, which would slow the tests down to the real pace of discord.
+    """
+    monkeypatch.setattr(limiter, 'limits', {route: (10 ** 6, 1.0) for route in DEFAULT_LIMITS})
+    monkeypatch.setattr(limiter, '_buckets', {})
@@ -0,0 +1,152 @@
+import asyncio
+import io
+
+import pytest
+
+import assign_from_web
+from assign_from_web import EtuMember, LoginQueue, LoginRequest, Resync, read_export
+from DiscordBot.aux_files.guild_index import drop_index
+
+
+def _login(username: str = "jean", add_roles=(), branch: str = "ISI", guild_id: int = 1) -> LoginRequest:
+    return LoginRequest(EtuMember("Jean", "Dupont", "3", branch, True), username, guild_id, "dupontje", add_roles)
+
+
+class _Site:
+    """
+    Stand-in for `etu_to_discord`, recording the logins applied and blocking them until released.
+    """
+
+    def __init__(self):
+        self.calls: list[tuple[str, set]] = []
+        self.release = asyncio.Event()
+
+    async def apply(self, etu_member, discord_username, guild_id, etu_name, add_roles) -> None:
+        self.calls.append((discord_username, set(add_roles)))
+        await self.release.wait()
+
+
+@pytest.fixture
+def site(monkeypatch):
+    site = _Site()
+    monkeypatch.setattr(assign_from_web, 'etu_to_discord', site.apply)
+    return site
+
+
+async def _drain(queue: LoginQueue) -> None:
+    await queue._queue.join()
+    for task in queue._tasks:
+        task.cancel()
+
+
+def test_burst_of_logins_is_applied_once(site):
+    async def scenario() -> LoginQueue:
+        queue = LoginQueue(workers=2)
+        queue.start()
+        for ue in ("LO07", "IF02", "NF04"):
+            queue.submit(_login(add_roles=[ue]))
+        site.release.set()
+        await _drain(queue)
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert site.calls == [("jean", {"LO07", "IF02", "NF04"})]
+    assert (queue.submitted, queue.merged, queue.applied) == (3, 2, 1)
+
+
+def test_login_arriving_while_applied_waits_and_merges(site):
+    async def scenario() -> None:
+        queue = LoginQueue(workers=2)
+        queue.start()
+        queue.submit(_login(add_roles=["LO07"]))
+        await asyncio.sleep(0)  # a worker starts applying the first login
+        queue.submit(_login(add_roles=["IF02"]))
+        queue.submit(_login(add_roles=["NF04"]))
+        await asyncio.sleep(0.01)
+        assert len(site.calls) == 1  # the second worker does not apply the same user concurrently
+        site.release.set()
+        await _drain(queue)
+
+    asyncio.run(scenario())
+    assert site.calls == [("jean", {"LO07"}), ("jean", {"LO07", "IF02", "NF04"})]
+
+
+def test_logins_of_different_users_are_not_merged(site):
+    async def scenario() -> None:
+        queue = LoginQueue(workers=2)
+        queue.start()
+        queue.submit(_login("jean", ["LO07"]))
+        queue.submit(_login("JEAN", ["IF02"]))  # the same user : usernames are case insensitive, the newer wins
+        queue.submit(_login("marie", ["NF04"]))
+        site.release.set()
+        await _drain(queue)
+
+    asyncio.run(scenario())
+    assert sorted(site.calls) == [("JEAN", {"LO07", "IF02"}), ("marie", {"NF04"})]
+
+
+def test_read_export_jsonl():
+    lines = io.StringIO('{"first_name": "Jean", "last_name": "Dupont", "semester": 3, "branch": "ISI", '
+                        '"is_student": true, "discord_username": "jean", "etu_name": "dupontje", '
+                        '"add_roles": ["LO07"]}\n\n')
+    [login] = read_export(lines, 'jsonl', 42)
+    assert login.key == (42, "jean")
+    assert login.etu_member.semester == "3"
+    assert login.add_roles == {"LO07"}
+
+
+def test_read_export_csv():
+    lines = io.StringIO("first_name,last_name,semester,branch,is_student,discord_username,etu_name,add_roles\n"
+                        "Jean,Dupont,3,ISI,oui,jean,dupontje,LO07;IF02\n"
+                        "Marie,Curie,1,TC,0,marie,curiema,\n")
+    jean, marie = read_export(lines, 'csv', 42)
+    assert jean.etu_member.is_student and jean.add_roles == {"LO07", "IF02"}
+    assert not marie.etu_member.is_student and marie.add_roles == set()
+
+
+@pytest.mark.parametrize('line', ['{"first_name": "Jean"}', '[1, 2]', '12'])
+def test_read_export_rejects_invalid_accounts(line):
+    with pytest.raises(ValueError):
+        list(read_export([line], 'jsonl', 42))
+
+
+def test_resync_edit_replaces_the_branch_and_keeps_the_other_roles(guild):
+    drop_index()
+    old_branch, new_branch = guild.add_role("GI"), guild.add_role("ISI")
+    ue, student, club = guild.add_role("LO07"), guild.add_role("Etudiant"), guild.add_role("Club photo")
+    member = guild.members[0]
+    member.roles = [guild.default_role, old_branch, club]
+    member.nick = "Jean DUPONT - GI2"
+
+    edit = Resync(guild)._edit(member, _login(member.name, ["LO07", "XX99"]))
+    assert edit['nick'] == "Jean DUPONT - ISI3"
+    assert set(edit['roles']) == {new_branch, ue, student, club}  # XX99 is not in the catalogue
+
+
+def test_resync_edit_is_empty_when_nothing_changed(guild):
+    drop_index()
+    roles = [guild.add_role(name) for name in ("ISI", "LO07", "Etudiant")]
+    member = guild.members[0]
+    member.roles = [guild.default_role, *roles]
+    member.nick = "Jean DUPONT - ISI3"
+    assert Resync(guild)._edit(member, _login(member.name, ["LO07"])) == {}
+
+
+def test_logins_submitted_before_start_wait_for_the_workers(site):
+    async def scenario() -> None:
+        queue = LoginQueue(workers=2)
+        queue.submit(_login(add_roles=["LO07"]))
+        queue.submit(_login(add_roles=["IF02"]))
+        queue.start()
+        site.release.set()
+        await _drain(queue)
+
+    asyncio.run(scenario())
+    assert site.calls == [("jean", {"LO07", "IF02"})]
+
+
+def test_read_export_csv_with_missing_cells():
+    lines = io.StringIO("first_name,last_name,semester,branch,discord_username,etu_name,is_student\n"
+                        "Jean,Dupont,3,ISI,jean,dupontje\n")
+    [login] = read_export(lines, 'csv', 42)  # the missing cells are None, not empty strings
+    assert not login.etu_member.is_student and login.add_roles == set()
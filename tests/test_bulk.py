@@ -0,0 +1,101 @@
+import asyncio
+
+import discord
+import pytest
+
+from benchmarks.fake_discord import FakeContext, FakeTextChannel, _Response
+from DiscordBot.aux_files import bulk
+from DiscordBot.aux_files.bulk import BulkOperation, running_operations
+from DiscordBot.aux_files.journal import Journal
+
+pytestmark = pytest.mark.usefixtures('unlimited')
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    journal = Journal(tmp_path / 'journal.jsonl')
+    monkeypatch.setattr(bulk, 'journal', journal)
+    return journal
+
+
+@pytest.fixture
+def ctx(guild):
+    return FakeContext(guild, FakeTextChannel(guild, 'admin'))
+
+
+def test_kick_skips_the_admins_and_the_members_gone(ctx, guild, journal):
+    ids = [member.id for member in guild.members] + [123]  # 123 left the server
+    operation = BulkOperation.from_action(ctx, "Expulsion", ids, 'kick', reason="test")
+    asyncio.run(operation.run())
+    # the 5 first members of the fake guild are admins
+    assert (operation.succeeded, operation.skipped, operation.missing) == (len(ids) - 6, 5, 1)
+    assert guild.server.calls['member_kick'] == operation.succeeded
+    assert running_operations(guild.id) == []
+    assert asyncio.run(journal.unfinished(guild.id)) == []  # ended
+
+
+def test_failures_are_counted_and_the_others_go_on(ctx, guild, journal):
+    failing = guild.members[2].id
+
+    async def operation(member) -> None:
+        if member.id == failing:
+            raise discord.HTTPException(_Response(500, 'Internal Server Error'), 'boom')
+
+    ids = [member.id for member in guild.members]
+    bulk_operation = BulkOperation(ctx, "Test", ids, operation, 'member_role')
+    asyncio.run(bulk_operation.run())
+    assert bulk_operation.succeeded == len(ids) - 1
+    assert [member_id for member_id, _ in bulk_operation.failures] == [failing]
+
+
+def test_failed_fetch_is_a_failure_of_its_member(ctx, guild, journal, monkeypatch):
+    monkeypatch.setattr(bulk, 'MEMBER_CACHE', 'compact')
+    cached, uncached = guild.members[10], 456
+
+    async def fetch_member(member_id):
+        raise discord.HTTPException(_Response(503, 'Service Unavailable'), 'down')
+
+    monkeypatch.setattr(guild, 'fetch_member', fetch_member)
+    operation = BulkOperation.from_action(ctx, "Expulsion", [uncached, cached.id], 'kick', reason="test")
+    asyncio.run(operation.run())
+    assert operation.succeeded == 1
+    assert [member_id for member_id, _ in operation.failures] == [uncached]
+    assert "1 réussi(s), 1 échec(s)" in ctx.sent[0].content  # the summary is still sent
+    assert asyncio.run(journal.unfinished(guild.id)) == []
+
+
+def test_cancelled_operation_stops_and_is_ended(ctx, guild, journal):
+    role = guild.roles[1]
+    ids = [member.id for member in guild.members if role in member.roles]
+    operation = BulkOperation.from_action(ctx, "Retrait", ids, 'remove_role', role=role.id, reason="test")
+    operation.concurrency = 1
+
+    async def cancelled() -> None:
+        original = operation.operation
+
+        async def remove(member) -> None:
+            await original(member)
+            operation.cancel()  # like @cancel, while the first member is handled
+
+        operation.operation = remove
+        await operation.run()
+
+    asyncio.run(cancelled())
+    assert operation.cancelled and operation.succeeded == 1
+    assert ":stop_sign:" in operation.summary()
+    assert asyncio.run(journal.unfinished(guild.id)) == []  # a cancelled operation is not resumed
+
+
+def test_deleted_role_is_refused_up_front(ctx):
+    with pytest.raises(ValueError):
+        BulkOperation.from_action(ctx, "Retrait", [], 'remove_role', role=789, reason="test")
+
+
+def test_strip_roles_needs_one_edit_per_member(ctx, guild, journal):
+    stripped = [role.id for role in guild.roles[1:4]]
+    ids = [member.id for member in guild.members]
+    operation = BulkOperation.from_action(ctx, "Fin de semestre", ids, 'strip_roles', roles=stripped, reason="test")
+    asyncio.run(operation.run())
+    holders = len(ids) - operation.skipped
+    assert operation.succeeded == guild.server.calls['member_edit'] == holders
+    assert all(role.id not in stripped for member in guild.members for role in member.roles)
@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+from DiscordBot.aux_files.catalogue import UeCatalogue
+
+
+def _write(path, data, mtime: float) -> None:
+    path.write_text(data if isinstance(data, str) else json.dumps(data), encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'ues.json'
+    _write(path, {'ISI': ['LO07', 'NF04'], 'A2I': ['lo07']}, 1000)
+    return path
+
+
+def test_lookups_are_case_insensitive(path):
+    catalogue = UeCatalogue(path)
+    assert catalogue.canonical('lo07') == 'LO07'
+    assert catalogue.categories_of('Lo07') == ['ISI', 'A2I']
+    assert catalogue.ues('isi') == ['LO07', 'NF04']
+    assert catalogue.all_ues() == ['LO07', 'NF04']
+    assert 'nf04' in catalogue and 'XX99' not in catalogue
+
+
+def test_modified_file_is_reloaded(path):
+    catalogue = UeCatalogue(path, check_interval=0)
+    assert catalogue.ues('ISI') == ['LO07', 'NF04']
+    _write(path, {'ISI': ['LO07', 'IF02']}, 2000)
+    assert catalogue.ues('ISI') == ['LO07', 'IF02']
+
+
+def test_file_is_checked_once_per_interval(path):
+    catalogue = UeCatalogue(path, check_interval=3600)
+    catalogue.refresh()
+    _write(path, {'ISI': ['IF02']}, 2000)
+    assert catalogue.ues('ISI') == ['LO07', 'NF04']  # not checked again yet
+
+
+@pytest.mark.parametrize('content', ['{"ISI": ', '{"ISI": "LO07"}', '["LO07"]'])
+def test_invalid_file_keeps_the_previous_catalogue(path, content):
+    catalogue = UeCatalogue(path, check_interval=0)
+    catalogue.refresh()
+    _write(path, content, 2000)
+    assert catalogue.ues('ISI') == ['LO07', 'NF04']
+
+
+def test_removed_file_keeps_the_previous_catalogue(path):
+    catalogue = UeCatalogue(path, check_interval=0)
+    catalogue.refresh()
+    path.unlink()
+    assert catalogue.ues('ISI') == ['LO07', 'NF04']
+    _write(path, {'ISI': ['IF02']}, 2000)
+    assert catalogue.ues('ISI') == ['IF02']
+
+
+def test_invalid_or_missing_file_fails_the_first_load(tmp_path):
+    with pytest.raises(OSError):
+        UeCatalogue(tmp_path / 'ues.json').refresh()
+    _write(tmp_path / 'ues.json', '{"ISI": ', 1000)
+    with pytest.raises(ValueError):
+        UeCatalogue(tmp_path / 'ues.json').refresh()
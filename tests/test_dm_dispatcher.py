@@ -0,0 +1,75 @@
+import asyncio
+
+import discord
+import pytest
+
+from benchmarks.fake_discord import FakeTextChannel, _Response
+from DiscordBot.aux_files import dm_dispatcher as dm_dispatcher_module
+from DiscordBot.aux_files.dm_dispatcher import DmDispatcher
+from DiscordBot.aux_files.metrics import Metrics
+
+pytestmark = pytest.mark.usefixtures('unlimited')
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(dm_dispatcher_module, 'metrics', metrics)
+    return metrics
+
+
+async def _send(dispatcher: DmDispatcher, *members) -> list[bool]:
+    dispatcher.start()
+    queued = [dispatcher.submit(member, "Bienvenue", "bienvenue !") for member in members]
+    await dispatcher._queue.join()
+    dispatcher._worker.cancel()
+    return queued
+
+
+def test_member_is_sent_one_message_per_window(guild, metrics):
+    member, other = guild.members[:2]
+    queued = asyncio.run(_send(DmDispatcher(dedupe_window=60), member, member, other))
+    assert queued == [True, False, True]
+    assert metrics.dm_results == {'sent': 2, 'deduplicated': 1}
+    assert metrics.dm_latency.count == 2
+
+
+def test_messages_beyond_the_queue_size_are_dropped(guild, metrics):
+    queued = asyncio.run(_send(DmDispatcher(maxsize=2), *guild.members[:4]))
+    assert queued == [True, True, False, False]
+    assert metrics.dm_results == {'sent': 2, 'dropped': 2}
+
+
+def test_nothing_is_queued_before_start(guild, metrics):
+    assert not DmDispatcher().submit(guild.members[0], "Bienvenue", "bienvenue !")
+    assert metrics.dm_results == {'dropped': 1}
+
+
+def test_closed_private_messages_fall_back_to_the_welcome_channel(guild, metrics, monkeypatch):
+    welcome = FakeTextChannel(guild, 'accueil')
+    guild.channels.append(welcome)
+    member = guild.members[0]
+    sent = []
+
+    async def closed(content=None, **kwargs):
+        raise discord.Forbidden(_Response(403, 'Forbidden'), 'Cannot send messages to this user')
+
+    async def send(content=None, **kwargs):
+        sent.append(content)
+
+    monkeypatch.setattr(member, 'send', closed)
+    monkeypatch.setattr(welcome, 'send', send)
+    asyncio.run(_send(DmDispatcher(), member))
+    assert sent == [f"{member.mention}, bienvenue !"]
+    assert metrics.dm_results == {'fallback': 1}
+
+
+def test_failed_message_does_not_stop_the_worker(guild, metrics, monkeypatch):
+    member, other = guild.members[:2]
+
+    async def broken(content=None, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(member, 'send', broken)
+    asyncio.run(_send(DmDispatcher(), member, other))
+    assert metrics.dm_results == {'failed': 1, 'sent': 1}
@@ -0,0 +1,38 @@
+import discord
+
+from benchmarks.fake_discord import FakeTextChannel, _Value
+from DiscordBot.commands.role_management import _duplicate_groups, _parse_duplicate_options
+
+
+def test_duplicates_are_grouped_by_name_the_most_used_first(guild):
+    first, second, third = guild.add_role("GE21"), guild.add_role("ge21"), guild.add_role("Ge21")
+    guild.add_role("GE22")
+    counts = {first.id: 1, second.id: 5, third.id: 0}
+    assert _duplicate_groups(guild, counts) == [[second, first, third]]
+
+
+def test_role_used_in_a_channel_is_kept_first(guild):
+    used, crowded = guild.add_role("NF04"), guild.add_role("NF04")
+    guild.channels.append(FakeTextChannel(guild, "nf04", None, {used: discord.PermissionOverwrite(read_messages=True)}))
+    assert _duplicate_groups(guild, {crowded.id: 50}) == [[used, crowded]]
+
+
+def test_colour_and_permissions_split_the_groups(guild):
+    red, blue = guild.add_role("LO07"), guild.add_role("LO07")
+    red.colour, blue.colour = _Value(0xff0000), _Value(0x0000ff)
+    assert len(_duplicate_groups(guild, {})) == 1
+    assert _duplicate_groups(guild, {}, by_colour=True) == []
+    assert len(_duplicate_groups(guild, {}, by_permissions=True)) == 1
+
+
+def test_managed_roles_are_never_duplicates(guild):
+    guild.add_role("Bot")
+    managed = guild.add_role("Bot")
+    managed.managed = True
+    assert _duplicate_groups(guild, {}) == []
+
+
+def test_options():
+    assert _parse_duplicate_options(("Couleur", "--plan")) == (True, False)
+    assert _parse_duplicate_options(("permissions",)) == (False, True)
+    assert _parse_duplicate_options(("rouge",)) is None
@@ -0,0 +1,61 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from DiscordBot.aux_files.export import GzipParts, gzip_parts, member_rows, parse_nickname
+
+
+@pytest.mark.parametrize('nickname, parts', [
+    ("Jean DUPONT - ISI3", {'first_name': "Jean", 'last_name': "DUPONT", 'branch': "ISI", 'semester': "3"}),
+    ("Jean Marc DE LA TOUR - A2I", {'first_name': "Jean Marc", 'last_name': "DE LA TOUR", 'branch': "A2I",
+                                    'semester': ""}),
+    ("jean", {}),
+    (None, {}),
+])
+def test_parse_nickname(nickname, parts):
+    assert parse_nickname(nickname) == parts
+
+
+def test_member_rows(guild):
+    member = guild.members[0]
+    member.nick = "Jean DUPONT - ISI3"
+    [row] = member_rows([member])
+    assert (row['id'], row['username'], row['first_name'], row['semester']) == (member.id, str(member), "Jean", "3")
+    assert row['roles'] == [role.name for role in member.roles[1:]]
+
+
+def _rows(count: int):
+    return ({'id': i, 'username': f"membre{i}", 'nickname': '', 'first_name': '', 'last_name': '', 'branch': '',
+             'semester': '', 'roles': [f"UE{i % 7}", "Etudiant"]} for i in range(count))
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'jsonl'])
+def test_parts_fit_the_limit_and_hold_every_row(export_format):
+    parts = list(gzip_parts(_rows(5000), export_format, 20000))
+    assert len(parts) > 1
+    assert all(len(part) <= 20000 for part in parts)
+    texts = [gzip.decompress(part).decode() for part in parts]
+    if export_format == 'csv':
+        files = [list(csv.reader(io.StringIO(text))) for text in texts]
+        assert all(rows[0][0] == 'id' for rows in files)  # each part can be read alone
+        ids = [int(row[0]) for rows in files for row in rows[1:]]
+    else:
+        ids = [json.loads(line)['id'] for text in texts for line in text.splitlines()]
+    assert ids == list(range(5000))
+
+
+def test_no_row_gives_the_header_only():
+    [part] = gzip_parts([], 'csv', 20000)
+    assert gzip.decompress(part).decode().startswith("id,username")
+    [part] = gzip_parts([], 'jsonl', 20000)
+    assert gzip.decompress(part) == b''
+
+
+def test_writer_gives_the_same_parts_as_the_generator():
+    parts = GzipParts('csv', 20000)
+    written = [part for part in map(parts.write, _rows(5000)) if part is not None] + [parts.close()]
+    assert [gzip.decompress(part) for part in written] == \
+        [gzip.decompress(part) for part in gzip_parts(_rows(5000), 'csv', 20000)]
@@ -0,0 +1,108 @@
+import asyncio
+import time
+import types
+
+import pytest
+
+from benchmarks.fake_discord import FakeServer, FakeTextChannel, build_guild
+from DiscordBot.aux_files import dm_dispatcher as dm_dispatcher_module
+from DiscordBot.aux_files.dm_dispatcher import DmDispatcher
+from DiscordBot.aux_files.firewall import DISCORD_EPOCH, JoinMonitor, SlidingWindow, _monitors
+from DiscordBot.aux_files.guild_index import drop_index
+from DiscordBot.aux_files.metrics import Metrics
+from DiscordBot.aux_files.ratelimit import DEFAULT_LIMITS
+from ressources.settings import FIREWALL_JOIN_LIMIT, FIREWALL_WINDOW
+
+pytestmark = pytest.mark.usefixtures('unlimited')
+
+
+@pytest.fixture
+def crowd():
+    """
+    A guild with more members than the join limit, who all just joined.
+    """
+    drop_index()
+    server = FakeServer({route: (10 ** 6, 1.0) for route in DEFAULT_LIMITS}, latency=0)
+    guild = build_guild(server, members=FIREWALL_JOIN_LIMIT + 10, roles=3, channels=1)
+    yield guild
+    _monitors.pop(guild.id, None)
+    drop_index()
+
+
+def _account(created: float, bot: bool = False):
+    return types.SimpleNamespace(id=int(created * 1000 - DISCORD_EPOCH) << 22, bot=bot)
+
+
+def test_sliding_window_forgets_the_old_events():
+    window = SlidingWindow(10)
+    for second in (100, 100.5, 105, 109.9):
+        window.add(second)
+    assert window.count(109.9) == 4
+    assert window.count(110) == 2  # the events of second 100 left the window
+    assert window.count(115) == 1
+    assert window.count(1000) == 0
+    window.add(1000)
+    assert window.count(1000) == 1
+
+
+def test_join_limit_locks_once(crowd):
+    monitor = JoinMonitor(crowd)
+    now = time.time()
+    reasons = [monitor.record(member, now) for member in crowd.members[:FIREWALL_JOIN_LIMIT + 1]]
+    assert reasons[:-1] == [None] * FIREWALL_JOIN_LIMIT
+    assert reasons[-1] == f"{FIREWALL_JOIN_LIMIT + 1} arrivées en {FIREWALL_WINDOW} s"
+    monitor.locked_since = now
+    assert monitor.record(crowd.members[-1], now) is None  # already locked
+    assert monitor.record(crowd.members[-2], now + 2 * FIREWALL_WINDOW) is None  # calm again
+
+
+def test_new_accounts_have_their_own_limit(crowd):
+    monitor = JoinMonitor(crowd)
+    now = time.time()
+    reasons = [monitor.record(_account(now - 60), now) for _ in range(6)]
+    assert reasons[-1] == f"6 comptes de moins de 1 h arrivés en {FIREWALL_WINDOW} s"
+    assert monitor.rates(now)["comptes de moins de 1 h"] == (6, 5)
+
+
+def test_lockdown_kicks_the_raid_then_the_next_joins(crowd):
+    admin = FakeTextChannel(crowd, 'admin')
+    # the 5 first members are admins, which a raid would not include
+    raid, late = crowd.members[5:FIREWALL_JOIN_LIMIT + 6], crowd.members[-2:]
+
+    async def scenario(monitor: JoinMonitor) -> None:
+        reason = None
+        for member in raid:
+            reason = monitor.record(member) or reason
+        assert reason is not None
+        await monitor.lockdown(admin, reason, 'kick')
+        await monitor._executor
+        for member in late:
+            monitor.record(member)
+            monitor.handle(member)
+        await monitor._executor
+        await monitor.release("test")
+
+    monitor = JoinMonitor(crowd)
+    asyncio.run(scenario(monitor))
+    assert not monitor.locked
+    assert monitor.handled == len(raid) + len(late)
+    assert all(crowd.get_member(member.id) is None for member in raid + late)
+    assert len(crowd.members) == 5 + 2
+
+
+def test_no_welcome_message_during_a_lockdown(crowd, monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(dm_dispatcher_module, 'metrics', metrics)
+    monitor = _monitors[crowd.id] = JoinMonitor(crowd)
+    monitor.locked_since = time.time()
+
+    async def scenario() -> None:
+        dispatcher = DmDispatcher()
+        dispatcher.start()
+        dispatcher.submit(crowd.members[0], "Bienvenue", "bienvenue !")
+        await dispatcher._queue.join()
+        dispatcher._worker.cancel()
+
+    asyncio.run(scenario())
+    assert metrics.dm_results == {'locked': 1}
+    assert crowd.server.calls['message_send'] == 0
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from DiscordBot.aux_files.guild_config import GuildConfigStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    (tmp_path / 'ues_autre.json').write_text(json.dumps({'ISI': ['LO07']}), encoding='utf-8')
+    path = tmp_path / 'guilds.json'
+    path.write_text(json.dumps({'1': {'admin_channel_id': 42, 'ues_path': 'ues_autre.json',
+                                      'welcome_channel': 'bienvenue'},
+                                '2': {'student_role': 'Élève'}}), encoding='utf-8')
+    return path
+
+
+def test_missing_keys_take_the_default_values(path):
+    store = GuildConfigStore(path)
+    first, second = store.get(1), store.get(2)
+    assert (first.guild_id, first.admin_channel_id, first.welcome_channel) == (1, 42, 'bienvenue')
+    assert first.catalogue.ues('ISI') == ['LO07']
+    assert first.bot_url == store.default.bot_url
+    assert second.student_role == 'Élève'
+    assert second.welcome_channel == store.default.welcome_channel
+    assert second.catalogue is store.default.catalogue
+
+
+def test_unknown_guild_and_missing_file_use_the_default(path, tmp_path):
+    assert GuildConfigStore(path).get(3).guild_id is None
+    assert GuildConfigStore(tmp_path / 'absent.json').get(1).guild_id is None
+
+
+@pytest.mark.parametrize('data', [[1], {'abc': {}}, {'1': {'inconnue': 1}}, {'1': {'admin_channel_id': '42'}}])
+def test_invalid_files_are_rejected(data):
+    with pytest.raises(ValueError):
+        GuildConfigStore.validate(data)
+
+
+def test_invalid_reload_keeps_the_previous_configuration(path):
+    store = GuildConfigStore(path)
+    assert store.get(1).admin_channel_id == 42
+    path.write_text('{"1": ', encoding='utf-8')
+    with pytest.raises(ValueError):
+        store.reload()
+    assert store.get(1).admin_channel_id == 42
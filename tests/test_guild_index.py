@@ -0,0 +1,58 @@
+from benchmarks.fake_discord import FakeCategory, FakeTextChannel
+from DiscordBot.aux_files.guild_index import GuildIndex, drop_index, get_index, peek_index
+
+
+def test_lookups_are_case_insensitive(guild):
+    role = guild.add_role("GE21")
+    index = GuildIndex(guild)
+    assert index.role("ge21") is role
+    assert index.role("Ge21") is role
+    assert index.role("XX99") is None
+    assert (index.hits, index.misses) == (2, 1)
+
+
+def test_first_of_the_homonyms_is_returned(guild):
+    first, second = guild.add_role("NF04"), guild.add_role("nf04")
+    index = GuildIndex(guild)
+    assert index.role("NF04") is first
+    index.remove_role(first)
+    assert index.role("NF04") is second
+    index.remove_role(second)
+    assert index.role("NF04") is None and "nf04" not in index.roles._entries
+
+
+def test_renamed_role_is_found_under_its_new_name(guild):
+    role = guild.add_role("LO07")
+    index = GuildIndex(guild)
+    role.name = "LO07R"
+    index.remove_role(role, "LO07")  # the old name, as given by on_guild_role_update
+    index.add_role(role)
+    assert index.role("LO07") is None
+    assert index.role("lo07r") is role
+
+
+def test_added_twice_keeps_one_entry(guild):
+    role = guild.add_role("IF02")
+    index = GuildIndex(guild)
+    size = len(index.roles)
+    index.add_role(role)
+    assert len(index.roles) == size
+
+
+def test_categories_are_also_channels(guild):
+    category = FakeCategory(guild, "ISI")
+    channel = FakeTextChannel(guild, "lo07", category.id)
+    guild.channels += [category, channel]
+    index = GuildIndex(guild)
+    assert index.category("isi") is category and index.channel("isi") is category
+    assert index.channel("LO07") is channel and index.category("lo07") is None
+    index.remove_channel(category)
+    assert index.category("isi") is None and index.channel("isi") is None
+
+
+def test_index_is_built_once_per_guild(guild):
+    assert peek_index(guild.id) is None
+    index = get_index(guild)
+    assert get_index(guild) is index and peek_index(guild.id) is index
+    drop_index(guild.id)
+    assert peek_index(guild.id) is None
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from DiscordBot.aux_files.journal import Journal
+
+
+async def _record(journal: Journal) -> tuple[str, str]:
+    finished = await journal.begin(1, "Suppression", 'plan', {'stages': []})
+    journal.done(finished, 0)
+    journal.end(finished)
+    interrupted = await journal.begin(1, "Expulsion", 'bulk', {'member_ids': [10, 11, 12]})
+    journal.done(interrupted, 10)
+    journal.done(interrupted, 11)
+    await journal.flush()
+    return finished, interrupted
+
+
+def test_replay_keeps_the_interrupted_operations(tmp_path):
+    journal = Journal(tmp_path / 'journal.jsonl')
+    _, interrupted = asyncio.run(_record(journal))
+    # read back by a new process
+    entries = asyncio.run(Journal(journal.path).unfinished(1))
+    assert [entry.op for entry in entries] == [interrupted]
+    assert entries[0].done == {10, 11}
+    assert entries[0].payload == {'member_ids': [10, 11, 12]}
+    assert asyncio.run(Journal(journal.path).unfinished(2)) == []
+
+
+def test_replay_skips_a_line_cut_by_a_crash(tmp_path):
+    journal = Journal(tmp_path / 'journal.jsonl')
+    _, interrupted = asyncio.run(_record(journal))
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "' + interrupted + '", "type": "do')
+    entries = asyncio.run(journal.unfinished(1))
+    assert entries[0].done == {10, 11}
+
+
+def test_resuming_operation_ends_the_interrupted_one(tmp_path):
+    journal = Journal(tmp_path / 'journal.jsonl')
+
+    async def resume() -> str:
+        _, interrupted = await _record(journal)
+        return await journal.begin(1, "Expulsion", 'bulk', {'member_ids': [12]}, resumes=interrupted)
+
+    resumed = asyncio.run(resume())
+    assert [entry.op for entry in asyncio.run(journal.unfinished(1))] == [resumed]
+
+
+def test_compact_keeps_only_the_unfinished_operations(tmp_path):
+    journal = Journal(tmp_path / 'journal.jsonl')
+    _, interrupted = asyncio.run(_record(journal))
+    journal.compact()
+    lines = journal.path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 3  # the begin line and the two done lines of the interrupted operation
+    entries = asyncio.run(journal.unfinished(1))
+    assert [entry.op for entry in entries] == [interrupted]
+    assert entries[0].done == {10, 11}
+
+
+def test_failed_flush_keeps_the_lines(tmp_path):
+    journal = Journal(tmp_path / 'missing' / 'journal.jsonl')
+    with pytest.raises(OSError):
+        asyncio.run(journal.begin(1, "Création", 'plan', {}))
+    assert journal._pending == []  # an operation which could not be recorded does not start
+    journal.done('op', 1)
+    with pytest.raises(OSError):
+        asyncio.run(journal.flush())
+    assert len(journal._pending) == 1
+    journal.path.parent.mkdir()
+    asyncio.run(journal.flush())
+    assert journal._pending == []
+    assert journal.path.read_text(encoding='utf-8') == '{"op": "op", "type": "done", "item": 1}\n'
@@ -0,0 +1,51 @@
+import asyncio
+
+from DiscordBot.aux_files import member_index
+from DiscordBot.aux_files.member_index import MemberIndex
+
+
+def test_members_are_found_by_id_username_and_global_name(guild):
+    member = guild.members[3]
+    member.global_name = "Jean Dupont"
+    index = MemberIndex(guild)
+    assert index.get(member.id) is member
+    assert index.get(str(member.id)) is member
+    assert index.get(member.name.upper()) is member
+    assert index.get(member.global_name) is member
+    assert index.get(member.global_name, username_only=True) is None
+    assert (index.hits, index.misses) == (4, 1)
+
+
+def test_uncached_member_is_queried_once_then_indexed(guild):
+    member = guild.members[-1]
+    index = MemberIndex(guild, guild.members[:-1])
+    assert asyncio.run(index.resolve(guild, member.name)) is member
+    assert asyncio.run(index.resolve(guild, member.name)) is member
+    assert guild.server.calls['query_members'] == 1
+    assert (index.fallbacks, index.fallbacks_found) == (1, 1)
+
+
+def test_unknown_member_is_not_found(guild):
+    index = MemberIndex(guild)
+    assert asyncio.run(index.resolve(guild, 123)) is None
+    assert (index.fallbacks, index.fallbacks_found) == (1, 0)
+
+
+def test_compact_cache_keeps_the_index_empty(guild, monkeypatch):
+    monkeypatch.setattr(member_index, 'MEMBER_CACHE', 'compact')
+    member = guild.members[0]
+    index = MemberIndex(guild, [])
+    assert asyncio.run(index.resolve(guild, member.id)) is member
+    assert len(index) == 0
+
+
+def test_renamed_member_is_found_under_its_new_name(guild):
+    member = guild.members[0]
+    member.global_name = "Jean Dupont"
+    index = MemberIndex(guild)
+    before = type('Before', (), {'id': member.id, 'name': member.name, 'discriminator': '0',
+                                 'global_name': member.global_name})()
+    member.name = "nouveau.nom"
+    index.rename(before, member)
+    assert index.get(before.name) is None
+    assert index.get("Nouveau.Nom") is member
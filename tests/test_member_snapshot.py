@@ -0,0 +1,53 @@
+from DiscordBot.aux_files.member_snapshot import MemberSnapshot
+
+
+def _snapshot(guild) -> MemberSnapshot:
+    snapshot = MemberSnapshot(guild.id)
+    for member in guild.members:
+        snapshot.add(member)
+    return snapshot
+
+
+def _assert_consistent(snapshot: MemberSnapshot, guild) -> None:
+    assert len(snapshot.ids) == len(snapshot.names) == len(snapshot.bots) == len(snapshot.roles)
+    for member_id, position in snapshot._positions.items():
+        assert snapshot.ids[position] == member_id
+        member = guild.get_member(member_id)
+        assert snapshot.names[position] == member.name
+        assert list(snapshot.roles[position]) == [role.id for role in member.roles if not role.is_default()]
+
+
+def test_remove_moves_the_last_member_into_the_hole(guild):
+    snapshot = _snapshot(guild)
+    removed, last = guild.members[3], guild.members[-1]
+    snapshot.remove(removed.id)
+    assert removed.id not in snapshot
+    assert len(snapshot) == len(guild.members) - 1
+    assert snapshot._positions[last.id] == 3
+    _assert_consistent(snapshot, guild)
+
+
+def test_remove_last_and_unknown_members(guild):
+    snapshot = _snapshot(guild)
+    snapshot.remove(guild.members[-1].id)
+    snapshot.remove(12345)  # not in the snapshot : nothing happens
+    assert len(snapshot) == len(guild.members) - 1
+    _assert_consistent(snapshot, guild)
+
+
+def test_remove_every_member(guild):
+    snapshot = _snapshot(guild)
+    for member in guild.members:
+        snapshot.remove(member.id)
+    assert len(snapshot) == 0
+    assert snapshot.role_counts() == {}
+
+
+def test_removed_member_is_no_longer_counted(guild):
+    snapshot = _snapshot(guild)
+    member = guild.members[0]
+    role_id = member.roles[1].id
+    before = snapshot.role_counts()[role_id]
+    snapshot.remove(member.id)
+    assert snapshot.role_counts()[role_id] == before - 1
+    assert member.id not in snapshot.members_with(role_id)
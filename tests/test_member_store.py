@@ -0,0 +1,50 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from DiscordBot.aux_files.member_store import MemberStore
+
+
+def test_synced_guild_answers_the_counts(tmp_path, guild):
+    async def scenario(store: MemberStore) -> tuple[bool, bool, int, dict[int, int]]:
+        before = await store.has_guild(guild.id)
+        await store.sync_guild(guild)
+        role = guild.members[0].roles[1]
+        return before, await store.has_guild(guild.id), await store.role_count(guild.id, role.id), \
+            await store.role_counts(guild.id)
+
+    before, after, count, counts = asyncio.run(scenario(MemberStore(tmp_path / 'store.db')))
+    role = guild.members[0].roles[1]
+    assert (before, after) == (False, True)
+    assert count == counts[role.id] == len([member for member in guild.members if role in member.roles])
+    assert counts[guild.id] == len(guild.members)  # @everyone
+
+
+def test_mirror_survives_a_restart(tmp_path, guild):
+    asyncio.run(MemberStore(tmp_path / 'store.db').sync_guild(guild))
+    assert asyncio.run(MemberStore(tmp_path / 'store.db').has_guild(guild.id))
+
+
+def test_member_roles_are_role_ids_kept_up_to_date(tmp_path, guild):
+    member = guild.members[0]
+
+    async def scenario(store: MemberStore):
+        await store.sync_guild(guild)
+        member.roles = [guild.default_role, guild.roles[1]]
+        store.member_updated(member)
+        roles = await store.member_roles(guild.id, member.id)
+        store.member_removed(member)
+        return roles, await store.member_roles(guild.id, member.id)
+
+    roles, after_removal = asyncio.run(scenario(MemberStore(tmp_path / 'store.db')))
+    assert roles == [guild.roles[1].id]
+    assert after_removal is None
+
+
+def test_failed_write_is_kept(tmp_path, guild):
+    store = MemberStore(tmp_path / 'missing' / 'store.db')
+    store.member_added(guild.members[0])
+    with pytest.raises(sqlite3.Error):
+        asyncio.run(store.flush())
+    assert store.failing and store._pending
@@ -0,0 +1,92 @@
+import asyncio
+import types
+
+import discord
+
+from benchmarks.fake_discord import _Response
+from DiscordBot.aux_files import metrics as metrics_module
+from DiscordBot.aux_files.metrics import Histogram, Metrics, _on_request_end, instrument_bot
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1, float('inf')))
+    for value in (0.05, 0.5, 0.7, 5):
+        histogram.observe(value)
+    assert histogram.prometheus("t", 'a="b"') == [
+        't_bucket{a="b",le="0.1"} 1', 't_bucket{a="b",le="1"} 3', 't_bucket{a="b",le="+Inf"} 4',
+        't_sum{a="b"} 6.25', 't_count{a="b"} 4',
+    ]
+    assert histogram.max == 5 and histogram.mean == 6.25 / 4
+
+
+def test_prometheus_exposes_every_measure():
+    metrics = Metrics()
+    metrics.observe_command("getNb", 0.2)
+    metrics.observe_http("GET /guilds/{guild_id}/roles", 200, 0.1)
+    metrics.rate_limited['global'] += 1
+    metrics.dm_results['locked'] += 2
+    text = metrics.prometheus()
+    assert 'discord_bot_command_seconds_count{command="getNb"} 1' in text
+    assert 'discord_bot_http_responses_total{route="GET /guilds/{guild_id}/roles",status="200"} 1' in text
+    assert 'discord_bot_rate_limited_total{route="global"} 1' in text
+    assert 'discord_bot_dm_total{result="locked"} 2' in text
+    assert text.endswith("\n")
+    # every sample belongs to a declared metric
+    declared = {line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")}
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            name = line.split('{')[0].split()[0]
+            assert any(name == metric or name.startswith(metric + "_") for metric in declared), name
+
+
+class _Bot:
+    """
+    The parts of a bot instrumented by `instrument_bot`, whose requests answer with the given status.
+    """
+
+    def __init__(self, status: int):
+        self.status = status
+        self.http = types.SimpleNamespace(request=self._request)
+
+    async def _request(self, route, **kwargs):
+        # what the rate limit trace does when aiohttp receives the response
+        response = types.SimpleNamespace(status=self.status, headers={'Retry-After': '1.5'})
+        await _on_request_end(None, None, types.SimpleNamespace(response=response))
+        if self.status >= 400:
+            raise discord.HTTPException(_Response(self.status, 'Error'), 'error')
+        return {}
+
+    def before_invoke(self, coroutine):
+        return coroutine
+
+    after_invoke = before_invoke
+
+
+def test_calls_are_counted_with_their_status(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(metrics_module, 'metrics', metrics)
+    route = discord.http.Route('DELETE', '/guilds/{guild_id}/roles/{role_id}', guild_id=1, role_id=2)
+    for status in (204, 404):
+        bot = _Bot(status)
+        instrument_bot(bot)
+        try:
+            asyncio.run(bot.http.request(route))
+        except discord.HTTPException:
+            pass
+    name = "DELETE /guilds/{guild_id}/roles/{role_id}"
+    assert metrics.http_status == {(name, 204): 1, (name, 404): 1}
+    assert metrics.http[name].count == 2
+
+
+def test_429_responses_are_counted_per_route(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(metrics_module, 'metrics', metrics)
+    bot = _Bot(429)
+    instrument_bot(bot)
+    route = discord.http.Route('POST', '/guilds/{guild_id}/roles', guild_id=1)
+    try:
+        asyncio.run(bot.http.request(route))
+    except discord.HTTPException:
+        pass
+    assert metrics.rate_limited == {"POST /guilds/{guild_id}/roles": 1}
+    assert metrics.retry_after == 1.5
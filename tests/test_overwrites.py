@@ -0,0 +1,40 @@
+import discord
+
+from benchmarks.fake_discord import FakeTextChannel
+from DiscordBot.aux_files import overwrites
+
+
+def _ue_channel(guild):
+    role = guild.add_role('NF04')
+    expected = overwrites.template(overwrites.TEXT_TEMPLATE, guild, role)
+    channel = FakeTextChannel(guild, 'nf04', None, dict(expected))
+    return channel, role, expected
+
+
+def test_channel_of_the_template_has_not_drifted(guild):
+    channel, _, expected = _ue_channel(guild)
+    assert not overwrites.has_drifted(channel, expected)
+
+
+def test_overwrites_added_by_hand_are_not_a_drift(guild):
+    channel, _, expected = _ue_channel(guild)
+    channel._fake_overwrites[guild.members[0]] = discord.PermissionOverwrite(manage_messages=True)
+    assert not overwrites.has_drifted(channel, expected)
+
+
+def test_changed_or_missing_template_target_is_a_drift(guild):
+    channel, role, expected = _ue_channel(guild)
+    channel._fake_overwrites[role] = discord.PermissionOverwrite(read_messages=False)
+    assert overwrites.has_drifted(channel, expected)
+    del channel._fake_overwrites[role]
+    assert overwrites.has_drifted(channel, expected)
+
+
+def test_merged_keeps_the_other_targets(guild):
+    channel, role, expected = _ue_channel(guild)
+    professor = guild.members[0]
+    channel._fake_overwrites[professor] = discord.PermissionOverwrite(manage_messages=True)
+    channel._fake_overwrites[role] = discord.PermissionOverwrite()
+    merged = overwrites.merged(channel, expected)
+    assert merged[role] == expected[role]
+    assert merged[professor].manage_messages
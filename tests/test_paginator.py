@@ -0,0 +1,66 @@
+import asyncio
+
+from benchmarks.fake_discord import FakeContext, FakeTextChannel
+from DiscordBot.aux_files.paginator import MAX_LENGTH, Paginator
+
+
+class _Interaction:
+    """
+    A click on a button, whose answer edits the message of the paginator.
+    """
+
+    def __init__(self, message):
+        self.response = self
+        self.message = message
+
+    async def edit_message(self, content: str | None = None, **kwargs) -> None:
+        self.message.content = content
+
+
+def _paginator(guild, items, **kwargs) -> Paginator:
+    return Paginator(FakeContext(guild, FakeTextChannel(guild, 'admin')), "Titre", items, **kwargs)
+
+
+def test_single_page_has_no_header_nor_buttons(guild):
+    paginator = _paginator(guild, ["a", "b"])
+    asyncio.run(paginator.send())
+    assert paginator.message.content == "Titre\na\nb"
+    assert paginator.message.view is None
+
+
+def test_pages_are_cut_and_numbered(guild):
+    paginator = _paginator(guild, list(range(45)), per_page=20)
+    assert paginator.pages == 3
+    assert paginator.render(2) == "Titre (page 3/3)\n40\n41\n42\n43\n44"
+
+
+def test_long_page_is_truncated(guild):
+    paginator = _paginator(guild, ["x" * 500] * 10, per_page=10)
+    text = paginator.render(0)
+    assert len(text) <= MAX_LENGTH + 2 and text.endswith("\n…")
+
+
+def test_rendered_page_is_reused_until_the_ttl(guild):
+    items = ["avant"]
+    paginator = _paginator(guild, items, ttl=3600)
+    paginator.render(0)
+    items[0] = "après"
+    assert paginator.render(0) == "Titre\navant"
+    paginator.ttl = 0
+    assert paginator.render(0) == "Titre\naprès"
+
+
+def test_buttons_turn_the_pages_both_ways(guild):
+    async def scenario() -> list[str]:
+        paginator = _paginator(guild, list(range(30)), per_page=10)
+        await paginator.send()
+        assert paginator.message.view is not None
+        shown = []
+        for step in (1, 1, 1, -1):
+            await paginator.turn(_Interaction(paginator.message), step)
+            shown.append(paginator.message.content.splitlines()[0])
+        await paginator.close()
+        assert paginator.message.view is None
+        return shown
+
+    assert asyncio.run(scenario()) == ["Titre (page 2/3)", "Titre (page 3/3)", "Titre (page 1/3)", "Titre (page 3/3)"]
@@ -0,0 +1,50 @@
+import asyncio
+import sys
+import time
+
+from DiscordBot.aux_files.profiler import LoopWatchdog, SamplingProfiler, _collapse
+
+
+def _busy(duration: float) -> None:
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_collapse_lists_the_frames_outermost_first():
+    stack = _collapse(sys._getframe())
+    assert stack.endswith("test_profiler.py:test_collapse_lists_the_frames_outermost_first")
+    assert stack.count(';') >= 1
+
+
+def test_stop_and_top_aggregate_the_stacks():
+    profiler = SamplingProfiler()
+    profiler.stacks.update({"main.py:run;getters.py:_get_roles": 3, "main.py:run;bulk.py:_worker": 5,
+                            "main.py:other;getters.py:_get_roles": 4})
+    assert profiler.samples == 12
+    assert profiler.stop().splitlines() == ["main.py:run;bulk.py:_worker 5", "main.py:other;getters.py:_get_roles 4",
+                                            "main.py:run;getters.py:_get_roles 3"]
+    assert profiler.top(1) == [("getters.py:_get_roles", 7)]
+
+
+def test_sampler_records_the_blocking_code():
+    profiler = SamplingProfiler(interval=0.005, max_duration=5)
+    profiler.start()
+    _busy(0.2)
+    profiler.stop()
+    assert not profiler.running
+    assert profiler.samples > 0
+    assert "test_profiler.py:_busy" in dict(profiler.top())
+
+
+def test_watchdog_counts_a_stall_once():
+    watchdog = LoopWatchdog(threshold=0.1)
+
+    async def scenario() -> None:
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.4)  # blocks the loop
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert watchdog.stalls == 1
@@ -0,0 +1,51 @@
+import asyncio
+
+from benchmarks.fake_discord import FakeContext, FakeTextChannel
+from DiscordBot.aux_files.provisioning import (AVERAGE_LATENCY, Plan, Step, describe, estimate_duration,
+                                               execute_plan, plan_creation)
+from DiscordBot.aux_files.ratelimit import limiter
+
+
+def _role_plan(count: int) -> Plan:
+    plan = Plan()
+    plan.add_stage().extend([Step('create_role', name=f"UE{i}")] for i in range(count))
+    return plan
+
+
+def test_creation_skips_the_existing_objects(guild):
+    guild.add_role("LO07")
+    plan = plan_creation(guild, {'ISI': ["LO07", "NF04"], 'A2I': ["nf04"]})
+    kinds = [step.kind for step in plan.steps()]
+    # the ISI and A2I categories, the NF04 role, the channels of both UEs and their messages; NF04 once only
+    assert kinds.count('create_category') == 2
+    assert kinds.count('create_role') == 1
+    assert kinds.count('create_text_channel') == kinds.count('send_message') == 2
+
+
+def test_estimate_is_bound_by_the_slowest_bucket(guild):
+    limit, per = limiter.limits['role_create']
+    assert estimate_duration(guild, _role_plan(limit), concurrency=5) == limit * AVERAGE_LATENCY / 5
+    assert estimate_duration(guild, _role_plan(limit + 10), concurrency=100) == 10 * per / limit
+
+
+def test_describe_counts_the_calls_per_kind(guild):
+    summary, details = describe(guild, plan_creation(guild, {'ISI': ["LO07", "NF04"]}))
+    assert summary.startswith("Plan : 7 appel(s) à l'API")
+    assert "- Rôles à créer : 2" in summary
+    assert "Rôles à créer (2) :\nLO07, NF04" in details
+
+
+def test_json_round_trip_skips_the_done_steps():
+    plan = _role_plan(3)
+    plan.add_stage().append([Step('create_category', name="ISI")])
+    resumed = Plan.from_json(plan.to_json(), skip={0, 3})
+    assert [step.params['name'] for step in resumed.steps()] == ["UE1", "UE2"]
+    assert len(resumed.stages) == 2 and resumed.stages[1] == []
+
+
+def test_dry_run_makes_no_call(guild):
+    ctx = FakeContext(guild, FakeTextChannel(guild, 'admin'))
+    assert asyncio.run(execute_plan(ctx, _role_plan(3), "Création", dry_run=True)) is None
+    assert len(guild.roles) == 11  # the 10 roles of the guild and @everyone
+    assert guild.server.calls['role_create'] == 0
+    assert ctx.sent[0].content.startswith("Plan : 3 appel(s)")
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from DiscordBot.aux_files.ratelimit import Bucket, RateLimiter
+
+
+def _duration(coroutine) -> float:
+    start = time.monotonic()
+    asyncio.run(coroutine)
+    return time.monotonic() - start
+
+
+def test_bucket_allows_a_burst_then_waits():
+    async def calls(count: int) -> None:
+        bucket = Bucket(3, 0.3)
+        for _ in range(count):
+            await bucket.acquire()
+
+    assert _duration(calls(3)) < 0.05
+    # the 4th and 5th calls wait for a token each : 0.1 s per token
+    assert _duration(calls(5)) >= 0.18
+
+
+def test_routes_are_limited_per_major_parameter():
+    limiter = RateLimiter({'global': (100, 1.0), 'member_kick': (2, 0.4)})
+
+    async def kicks() -> None:
+        await asyncio.gather(*(limiter.acquire('member_kick', guild_id) for guild_id in (1, 1, 2, 2)))
+
+    # two calls per guild fit in the burst of each bucket
+    assert _duration(kicks()) < 0.05
+    assert limiter.bucket('member_kick', 1) is not limiter.bucket('member_kick', 2)
+
+
+def test_global_bucket_is_shared_by_every_route():
+    limiter = RateLimiter({'global': (2, 0.4), 'member_kick': (100, 1.0), 'role_delete': (100, 1.0)})
+
+    async def calls() -> None:
+        await limiter.acquire('member_kick', 1)
+        await limiter.acquire('role_delete', 2)
+        await limiter.acquire('member_kick', 3)  # waits for the global bucket
+
+    assert _duration(calls()) >= 0.18
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_discord import FakeContext, FakeTextChannel
+from DiscordBot.aux_files import bulk, provisioning
+from DiscordBot.aux_files.journal import Journal
+from DiscordBot.aux_files.provisioning import Plan, Step
+from DiscordBot.commands import resume
+from DiscordBot.commands.resume import _resume
+
+pytestmark = pytest.mark.usefixtures('unlimited')
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    journal = Journal(tmp_path / 'journal.jsonl')
+    for module in (bulk, provisioning, resume):
+        monkeypatch.setattr(module, 'journal', journal)
+    return journal
+
+
+@pytest.fixture
+def ctx(guild):
+    return FakeContext(guild, FakeTextChannel(guild, 'admin'))
+
+
+def _interrupt(journal: Journal, guild_id: int, title: str, kind: str, payload: dict, done=()) -> str:
+    async def record() -> str:
+        op = await journal.begin(guild_id, title, kind, payload)
+        for item in done:
+            journal.done(op, item)
+        await journal.flush()
+        return op
+
+    return asyncio.run(record())
+
+
+def test_interrupted_kick_resumes_with_the_remaining_members(ctx, guild, journal):
+    kicked, left, *remaining = guild.members[5:10]
+    _interrupt(journal, guild.id, "Expulsion", 'bulk',
+               {'action': 'kick', 'params': {'reason': "test"},
+                'member_ids': [kicked.id, left.id] + [member.id for member in remaining]}, done=[kicked.id])
+    guild.remove_member(left)
+    asyncio.run(_resume.callback(ctx))
+    assert guild.server.calls['member_kick'] == len(remaining)
+    assert all(guild.get_member(member.id) is None for member in remaining)
+    assert guild.get_member(kicked.id) is kicked  # recorded as done : not kicked again
+    assert asyncio.run(journal.unfinished(guild.id)) == []
+
+
+def test_interrupted_plan_skips_the_steps_already_done(ctx, guild, journal):
+    plan = Plan()
+    plan.add_stage().extend([Step('create_role', name=name)] for name in ("LO07", "NF04", "IF02"))
+    _interrupt(journal, guild.id, "Création des UEs", 'plan', {'stages': plan.to_json()}, done=[0])
+    guild.add_role("LO07")
+    guild.add_role("NF04")  # created just before the crash, not recorded
+    asyncio.run(_resume.callback(ctx))
+    assert guild.server.calls['role_create'] == 1
+    assert [role.name for role in guild.roles].count("NF04") == 1
+    assert asyncio.run(journal.unfinished(guild.id)) == []
+
+
+def test_plan_flag_changes_nothing(ctx, guild, journal):
+    member = guild.members[10]
+    _interrupt(journal, guild.id, "Expulsion", 'bulk',
+               {'action': 'kick', 'params': {'reason': "test"}, 'member_ids': [member.id]})
+    asyncio.run(_resume.callback(ctx, '--plan'))
+    assert ctx.sent[0].content == "Reprise : Expulsion : 1 membre(s) restant(s)"
+    assert guild.get_member(member.id) is member
+    assert len(asyncio.run(journal.unfinished(guild.id))) == 1
+
+
+def test_removal_of_a_deleted_role_is_abandoned(ctx, guild, journal):
+    _interrupt(journal, guild.id, "Retrait du rôle", 'bulk',
+               {'action': 'remove_role', 'params': {'role': 789, 'reason': "test"}, 'member_ids': [1, 2]})
+    asyncio.run(_resume.callback(ctx))
+    assert ctx.sent[0].content.startswith(":warning: Reprise : Retrait du rôle abandonnée")
+    assert asyncio.run(journal.unfinished(guild.id)) == []
+
+
+def test_nothing_to_resume(ctx, journal):
+    asyncio.run(_resume.callback(ctx))
+    assert ctx.sent[0].content == "Aucune opération interrompue"
@@ -0,0 +1,46 @@
+import copy
+
+from DiscordBot.aux_files.role_counts import RoleCounter
+
+
+def _assert_exact(counter: RoleCounter, guild) -> None:
+    for role in guild.roles:
+        holders = guild.members if role.is_default() else [member for member in guild.members if role in member.roles]
+        assert counter.count(role.id) == len(holders)
+    histogram = {}
+    for role_id, count in counter.counts.items():
+        histogram.setdefault(count, set()).add(role_id)
+    assert counter.histogram == histogram
+
+
+def test_counts_match_a_full_scan(guild):
+    counter = RoleCounter(guild)
+    _assert_exact(counter, guild)
+    assert counter.count(guild.default_role.id) == len(guild.members)
+
+
+def test_member_events_keep_the_counts_exact(guild):
+    counter = RoleCounter(guild)
+    member = guild.members[0]
+    before = copy.copy(member)
+    member.roles = [guild.default_role, guild.roles[1], guild.roles[2]]
+    counter.member_updated(before, member)
+    _assert_exact(counter, guild)
+    guild.members.remove(member)
+    counter.member_removed(member)
+    _assert_exact(counter, guild)
+    guild.members.append(member)
+    counter.member_added(member)
+    _assert_exact(counter, guild)
+
+
+def test_roles_between_and_role_events(guild):
+    counter = RoleCounter(guild)
+    role = guild.add_role("vide")
+    counter.role_created(role)
+    assert role.id in counter.roles_with(0)
+    assert role.id in counter.roles_between(0, 1)
+    assert guild.default_role.id not in counter.roles_between(0, len(guild.members) - 1)
+    counter.role_deleted(role)
+    assert counter.count(role.id) == 0 and role.id not in counter.roles_between(0, 1)
+    _assert_exact(counter, guild)
@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.fake_discord import FakeContext, FakeTextChannel
+from DiscordBot.aux_files import bulk
+from DiscordBot.aux_files.catalogue import UeCatalogue
+from DiscordBot.aux_files.guild_config import GuildConfig
+from DiscordBot.aux_files.journal import Journal
+from DiscordBot.commands import role_management
+from DiscordBot.commands.role_management import _rollover
+
+pytestmark = pytest.mark.usefixtures('unlimited')
+
+
+@pytest.fixture
+def semester(guild, tmp_path, monkeypatch):
+    """
+    A guild whose students follow UEs of the catalogue, and have a branch and a club role.
+    """
+    (tmp_path / 'ues.json').write_text(json.dumps({'ISI': ["LO07", "NF04"], 'TC': ["MT01"]}), encoding='utf-8')
+    config = GuildConfig(guild.id, 0, UeCatalogue(tmp_path / 'ues.json'), "https://etu", "https://invitation")
+    monkeypatch.setattr(role_management, 'get_config', lambda guild: config)
+    monkeypatch.setattr(bulk, 'journal', Journal(tmp_path / 'journal.jsonl'))
+    roles = {name: guild.add_role(name) for name in ("Etudiant", "ISI", "LO07", "NF04", "MT01", "Club")}
+    for i, member in enumerate(guild.members):
+        member.roles = [guild.default_role, roles["Etudiant"], roles["ISI"], roles["Club"]]
+        if i % 2 == 0:
+            member.roles += [roles["LO07"], roles["NF04"]]
+    guild.members[1].roles.remove(roles["Etudiant"])  # a professor : not a student, keeps the UE roles
+    guild.members[1].roles.append(roles["MT01"])
+    return roles
+
+
+def test_plan_counts_the_students_and_changes_nothing(guild, semester):
+    ctx = FakeContext(guild, FakeTextChannel(guild, 'admin'))
+    asyncio.run(_rollover.callback(ctx, '--plan'))
+    students = len(guild.members) - 1
+    assert ctx.sent[0].content == (f"{len(guild.members) // 2} étudiant(s) sur {students} perdraient "
+                                   f"{len(guild.members)} rôle(s) d'UE parmi 3, en {len(guild.members) // 2} requête(s)")
+    assert guild.server.calls['member_edit'] == 0
+
+
+def test_rollover_strips_the_ue_roles_only(guild, semester):
+    ctx = FakeContext(guild, FakeTextChannel(guild, 'admin'))
+    asyncio.run(_rollover.callback(ctx))
+    ues = {semester[name] for name in ("LO07", "NF04", "MT01")}
+    for member in guild.members[2:]:
+        assert ues.isdisjoint(member.roles)
+        assert {semester["Etudiant"], semester["ISI"], semester["Club"]} <= set(member.roles)
+    assert semester["MT01"] in guild.members[1].roles
+    assert guild.server.calls['member_edit'] == len(guild.members) // 2  # one edit per student with UEs
+    assert ctx.message.reactions == ['✅']